@@ -1,9 +1,15 @@
 from django.contrib import admin
-from .models import CustomUser, Item, Category, ClaimAttempt, Message
+from .models import CustomUser, Item, Category, ClaimAttempt, Message, CampusLocation, BackgroundJob, MatchNotification, DashboardCounter, ThreadParticipant, Conversation
 
 # We are using the most basic registration possible to ensure it works.
 admin.site.register(CustomUser)
 admin.site.register(Category)
 admin.site.register(Item)
 admin.site.register(ClaimAttempt)
-admin.site.register(Message)
\ No newline at end of file
+admin.site.register(Message)
+admin.site.register(CampusLocation)
+admin.site.register(BackgroundJob)
+admin.site.register(MatchNotification)
+admin.site.register(DashboardCounter)
+admin.site.register(ThreadParticipant)
+admin.site.register(Conversation)
\ No newline at end of file
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+def user_channel(user_id):
+    return f"refind:events:user:{user_id}"
+
+def sse_frame(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+TICKET_SALT = 'refind.events.ticket'
+
+def issue_ticket(user_id):
+    """
+    A signed, short-lived credential that only opens the event stream.
+    EventSource cannot set headers, so it travels in the URL (and in access
+    logs) in place of the access token.
+    """
+    return signing.TimestampSigner(salt=TICKET_SALT).sign(str(user_id))
+
+def ticket_user_id(ticket):
+    """The user id a ticket was issued to, or None if it is forged or older than PUSH_TICKET_MAX_AGE."""
+    try:
+        return int(signing.TimestampSigner(salt=TICKET_SALT).unsign(ticket, max_age=settings.PUSH_TICKET_MAX_AGE))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+class InMemorySubscription:
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def deliver(self, payload):
+        # Called from whichever thread published; hand over to the subscriber's loop.
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, payload)
+
+    async def next(self, timeout):
+        """The next payload, or None if nothing arrived within ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InMemoryBroker:
+    """
+    Fan-out inside one process. Used by the tests and by single-process
+    deployments; several workers need the Redis broker.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+
+    async def subscribe(self, user_id):
+        subscription = InMemorySubscription(self, user_id)
+        with self.lock:
+            self.subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscribers[subscription.user_id]
+
+    def publish(self, user_id, payload):
+        with self.lock:
+            subscribers = list(self.subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.deliver(payload)
+            except RuntimeError:
+                # The subscriber's event loop is already closed.
+                self.unsubscribe(subscription)
+
+
+class RedisSubscription:
+    def __init__(self, client, pubsub):
+        self.client = client
+        self.pubsub = pubsub
+
+    async def next(self, timeout):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        return message['data'].decode() if message else None
+
+    async def close(self):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+class RedisBroker:
+    """Fan-out across every worker through Redis pub/sub."""
+
+    def __init__(self, url):
+        import redis
+
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+
+    async def subscribe(self, user_id):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(user_channel(user_id))
+        return RedisSubscription(client, pubsub)
+
+    def publish(self, user_id, payload):
+        self.client.publish(user_channel(user_id), payload)
+
+
+@lru_cache(maxsize=1)
+def get_broker():
+    if settings.PUSH_BROKER == 'redis':
+        return RedisBroker(settings.REDIS_URL)
+    return InMemoryBroker()
+
+def publish(user_id, event, data):
+    try:
+        get_broker().publish(user_id, sse_frame(event, data))
+    except Exception as e:
+        # Pushes are best effort; clients resync through the REST endpoints.
+        logger.error(f"Failed to push '{event}' event to user {user_id}: {str(e)}")
+
+def push_unread_count(user_id):
+    """Pushes the user's unread total, with the notification version it belongs to, once the transaction commits."""
+    from api.models import CustomUser
+
+    def send():
+        state = CustomUser.objects.filter(id=user_id).values('unread_message_count', 'notification_version').first()
+        if state is not None:
+            publish(user_id, 'unread', {
+                'unread_messages': state['unread_message_count'], 'version': state['notification_version'],
+            })
+
+    transaction.on_commit(send)
+
+def push_new_message(message):
+    """Sends a new message to both participants."""
+    from api.serializers import MessageSerializer
+
+    def send():
+        data = MessageSerializer(message).data
+        for user_id in {message.sender_id, message.receiver_id}:
+            publish(user_id, 'message', data)
+
+    transaction.on_commit(send)
@@ -0,0 +1,119 @@
+import io
+import logging
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+from api.models import Item
+
+logger = logging.getLogger(__name__)
+
+# size name -> longest side in pixels, largest first
+VARIANT_SIZES = {'large': 2048, 'medium': 1024, 'thumb': 320}
+# file extension -> (Pillow format, encoder options, Pillow feature it needs)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}, 'webp'),
+    'avif': ('AVIF', {'quality': 60, 'speed': 6}, 'avif'),
+}
+DERIVED_DIR = 'items/derived'
+# Difference hash grid: 8 comparisons per row, 8 rows, one 64-bit hash.
+HASH_SIZE = 8
+# Thumbnails whose grey levels span less than this carry no usable hash.
+FLAT_PHOTO_RANGE = 8
+
+
+def available_formats():
+    # Pillow wheels bundle libavif from 11.3 on; builds without it only get WebP.
+    return {ext: spec[:2] for ext, spec in VARIANT_FORMATS.items() if features.check(spec[2])}
+
+def load_photo(file):
+    image = Image.open(file)
+    # JPEGs decode straight at a reduced scale when the photo is far larger than needed.
+    image.draft('RGB', (max(VARIANT_SIZES.values()),) * 2)
+    # Bake the EXIF orientation into the pixels; the copies carry no metadata at all.
+    image = ImageOps.exif_transpose(image)
+    return image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+def difference_hash(image):
+    """
+    64-bit dHash of an upright photo: each bit says whether a pixel of the 9x8
+    greyscale thumbnail is brighter than its right neighbour. Re-encoding,
+    rescaling and small crops flip only a few bits. Returned as a signed
+    integer so it fits a BigIntegerField. Featureless photos (a blank wall, a
+    solid backdrop) get None, as they would all hash alike.
+    """
+    thumbnail = image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+    low, high = thumbnail.getextrema()
+    if high - low < FLAT_PHOTO_RANGE:
+        return None
+    pixels = list(thumbnail.getdata())
+    value = 0
+    for row in range(HASH_SIZE):
+        for column in range(HASH_SIZE):
+            offset = row * (HASH_SIZE + 1) + column
+            value = value << 1 | (pixels[offset] > pixels[offset + 1])
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def photo_hash(file):
+    """Perceptual hash of an uploaded photo, or None if it cannot be decoded or is featureless."""
+    try:
+        image = Image.open(file)
+        # JPEGs decode at 1/8 scale here; the hash only needs a tiny thumbnail.
+        image.draft('L', (64, 64))
+        return difference_hash(ImageOps.exif_transpose(image))
+    except Exception as e:
+        logger.warning(f"Could not hash photo {getattr(file, 'name', file)}: {str(e)}")
+        return None
+    finally:
+        file.seek(0)
+
+def generate_derivatives(item_id):
+    """
+    Writes the resized WebP (and, where Pillow supports it, AVIF) copies of an
+    item's photo and records them in ``Item.image_variants``. Background job
+    handler; raises to have the job retried.
+    """
+    item = Item.objects.filter(id=item_id).only('id', 'image', 'image_variants').first()
+    if item is None or not item.image:
+        return
+    source = item.image.name
+    previous = item.image_variants or {}
+    if previous.get('source') == source:
+        return
+
+    with item.image.open('rb') as file:
+        image = load_photo(file)
+    storage = item.image.storage
+    stem = PurePosixPath(source).stem
+    variants, written = {'source': source}, []
+    for size, longest_side in VARIANT_SIZES.items():
+        # Each size is scaled down from the previous one rather than from the full photo.
+        image.thumbnail((longest_side, longest_side), Image.LANCZOS)
+        variant = {'width': image.width, 'height': image.height}
+        for ext, (image_format, options) in available_formats().items():
+            buffer = io.BytesIO()
+            image.save(buffer, image_format, **options)
+            variant[ext] = storage.save(f"{DERIVED_DIR}/{item.id}/{stem}-{size}.{ext}", ContentFile(buffer.getvalue()))
+            written.append(variant[ext])
+        variants[size] = variant
+
+    # Only recorded if the photo was not replaced meanwhile; a newer job handles the new one.
+    if Item.objects.filter(id=item.id, image=source).update(image_variants=variants):
+        delete_files(storage, variant_paths(previous))
+        logger.info(f"Generated {len(written)} image variants for item {item.id}")
+    else:
+        delete_files(storage, written)
+
+def variant_paths(variants):
+    return [
+        path for size, variant in variants.items() if size != 'source'
+        for key, path in variant.items() if key not in ('width', 'height')
+    ]
+
+def delete_files(storage, paths):
+    for path in paths:
+        try:
+            storage.delete(path)
+        except Exception as e:
+            logger.warning(f"Could not delete image variant {path}: {str(e)}")
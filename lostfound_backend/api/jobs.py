@@ -0,0 +1,118 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from api.models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+# kind -> dotted path of a callable taking the item id. Handlers raise to request a retry.
+JOB_HANDLERS = {
+    'match_item': 'api.views.run_matching_in_background',
+    'reindex_item': 'chatbot.ann.reindex_item',
+    'send_match_emails': 'api.notifications.send_match_digests',
+    'image_derivatives': 'api.images.generate_derivatives',
+    'backfill_embeddings': 'chatbot.embeddings.backfill_embeddings',
+}
+
+
+def enqueue(kind, item=None, delay=0):
+    """
+    Queues a job, merging it into an existing pending job of the same kind for
+    the same item. Returns the pending job, or None in the unlikely case that
+    the queue kept changing under both attempts.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind '{kind}'")
+    run_after = timezone.now() + timedelta(seconds=delay)
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                job = BackgroundJob.objects.create(kind=kind, item=item, run_after=run_after)
+                logger.debug(f"Queued {kind} job {job.id} for item {getattr(item, 'id', None)}")
+                return job
+        except IntegrityError:
+            pending = BackgroundJob.objects.filter(kind=kind, item=item, status='pending').first()
+            if pending is not None:
+                logger.debug(f"Merged duplicate {kind} job for item {getattr(item, 'id', None)}")
+                return pending
+            # A worker claimed the conflicting job in between; queue a fresh one.
+    logger.warning(f"Could not queue {kind} job for item {getattr(item, 'id', None)}")
+    return None
+
+def claim_jobs(limit):
+    """
+    Marks up to ``limit`` due jobs as running and returns them. Each claim is a
+    conditional UPDATE, so concurrent workers never run the same job.
+    """
+    now = timezone.now()
+    candidate_ids = list(
+        BackgroundJob.objects.filter(status='pending', run_after__lte=now)
+        .order_by('run_after', 'id').values_list('id', flat=True)[:limit * 2]
+    )
+    claimed = []
+    for job_id in candidate_ids:
+        if len(claimed) >= limit:
+            break
+        updated = BackgroundJob.objects.filter(id=job_id, status='pending').update(
+            status='running', locked_at=now, attempts=F('attempts') + 1
+        )
+        if updated:
+            claimed.append(job_id)
+    return list(BackgroundJob.objects.filter(id__in=claimed).order_by('run_after', 'id'))
+
+def retry_delay(attempts):
+    return min(settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_SECONDS)
+
+def run_job(job):
+    try:
+        handler = import_string(JOB_HANDLERS[job.kind])
+        handler(job.item_id)
+    except Exception as e:
+        if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+            job.status = 'failed'
+            logger.error(f"Job {job.id} ({job.kind}) failed permanently after {job.attempts} attempts: {str(e)}")
+        else:
+            job.status = 'pending'
+            job.run_after = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+            logger.warning(f"Job {job.id} ({job.kind}) failed on attempt {job.attempts}, retrying at {job.run_after}: {str(e)}")
+        job.last_error = str(e)
+        job.locked_at = None
+        try:
+            job.save(update_fields=['status', 'run_after', 'last_error', 'locked_at', 'updated_at'])
+        except IntegrityError:
+            # A newer pending job for the same item was queued meanwhile; it supersedes this retry.
+            BackgroundJob.objects.filter(id=job.id).update(status='failed', last_error=str(e), locked_at=None)
+        return False
+    else:
+        BackgroundJob.objects.filter(id=job.id).update(status='done', locked_at=None, updated_at=timezone.now())
+        logger.info(f"Job {job.id} ({job.kind}) finished for item {job.item_id}")
+        return True
+
+def release_stale_jobs():
+    """Puts jobs back in the queue whose worker died while running them."""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    stale = BackgroundJob.objects.filter(status='running', locked_at__lt=cutoff)
+    released = 0
+    for job in stale:
+        try:
+            released += BackgroundJob.objects.filter(id=job.id, status='running').update(
+                status='pending', locked_at=None
+            )
+        except IntegrityError:
+            BackgroundJob.objects.filter(id=job.id).update(status='failed', last_error='Superseded after lock timeout')
+    if released:
+        logger.warning(f"Released {released} stale background jobs")
+    return released
+
+def run_pending(limit=100):
+    """Runs due jobs in the current thread; returns how many were processed."""
+    jobs = claim_jobs(limit)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
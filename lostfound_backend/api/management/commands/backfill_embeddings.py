@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from chatbot.embeddings import encode_missing
+
+
+class Command(BaseCommand):
+    help = "Stores the embeddings of open items that have none for the current backend, one batch at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help="Items encoded per backend call.")
+
+    def handle(self, *args, **options):
+        encoded = 0
+        while stored := encode_missing(options['batch_size']):
+            encoded += stored
+        self.stdout.write(f"Stored embeddings for {encoded} items")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from api.images import photo_hash
+from api.models import Item
+
+
+class Command(BaseCommand):
+    help = "Computes the perceptual hash of item photos uploaded before photos were hashed."
+
+    def handle(self, *args, **options):
+        hashed = 0
+        for item in Item.objects.exclude(image='').exclude(image=None).filter(image_hash=None).only('id', 'image').iterator():
+            try:
+                with item.image.open('rb') as file:
+                    image_hash = photo_hash(file)
+            except OSError as e:
+                self.stderr.write(f"Skipped item {item.id}: {str(e)}")
+                continue
+            if image_hash is not None:
+                hashed += Item.objects.filter(id=item.id, image=item.image.name).update(image_hash=image_hash)
+        self.stdout.write(f"Hashed {hashed} item photos")
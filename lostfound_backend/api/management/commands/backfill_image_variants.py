@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.jobs import enqueue
+from api.models import Item
+
+
+class Command(BaseCommand):
+    help = "Queues the resized WebP/AVIF copies of item photos that have none for their current photo."
+
+    def handle(self, *args, **options):
+        queued = 0
+        for item in Item.objects.exclude(image='').exclude(image=None).only('id', 'image', 'image_variants').iterator():
+            # Photos uploaded before derivatives existed, or replaced since their copies were made.
+            if (item.image_variants or {}).get('source') != item.image.name:
+                queued += enqueue('image_derivatives', item) is not None
+        self.stdout.write(f"Queued image variants for {queued} item photos")
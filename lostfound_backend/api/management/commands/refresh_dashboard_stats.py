@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from api import stats
+
+
+class Command(BaseCommand):
+    help = "Recounts the dashboard totals, e.g. after bulk imports or manual SQL that bypassed the model signals."
+
+    def handle(self, *args, **options):
+        counts = stats.refresh_counters()
+        for key, value in counts.items():
+            self.stdout.write(f"{key}: {value}")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import threads
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the conversation inbox and recounts unread messages, e.g. after bulk imports that bypassed the model signals."
+
+    def handle(self, *args, **options):
+        updated = threads.refresh_unread_counts()
+        self.stdout.write(f"Conversations and unread counts refreshed for {updated} users")
@@ -0,0 +1,71 @@
+import logging
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api import jobs, notifications
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Runs queued background jobs (item matching, re-embedding) with bounded concurrency."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.JOB_WORKER_CONCURRENCY,
+            help="Maximum number of jobs running at the same time.",
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL,
+            help="Seconds to sleep when the queue is empty.",
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Drain the jobs that are currently due, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        logger.info(f"Background worker started with concurrency {concurrency}")
+
+        running = set()
+        last_release = 0.0
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job') as executor:
+            while not self.stopping:
+                if time.monotonic() - last_release > 60:
+                    jobs.release_stale_jobs()
+                    notifications.release_stale_notifications()
+                    last_release = time.monotonic()
+                running = {future for future in running if not future.done()}
+                free_slots = concurrency - len(running)
+                claimed = jobs.claim_jobs(free_slots) if free_slots else []
+                for job in claimed:
+                    running.add(executor.submit(self.run, job))
+                if options['once'] and not claimed and not running:
+                    break
+                if claimed:
+                    continue
+                if running:
+                    wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                else:
+                    connection.close()
+                    time.sleep(options['poll_interval'])
+        logger.info("Background worker stopped")
+
+    def run(self, job):
+        try:
+            jobs.run_job(job)
+        finally:
+            connection.close()
+
+    def stop(self, signum, frame):
+        logger.info("Background worker stopping after running jobs finish")
+        self.stopping = True
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.9 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_message_is_read'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='embedding',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='embedding_model',
+            field=models.CharField(blank=True, default='', help_text='Model/version that produced the stored embedding.', max_length=200),
+        ),
+    ]
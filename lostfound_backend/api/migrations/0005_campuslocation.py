@@ -0,0 +1,21 @@
+# Generated by Django 5.0.9 on 2026-10-18 16:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_item_embedding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampusLocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('aliases', models.JSONField(blank=True, default=list, help_text='Other ways people write this location, e.g. ["lib", "main library"].')),
+            ],
+        ),
+    ]
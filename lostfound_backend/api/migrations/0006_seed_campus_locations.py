@@ -0,0 +1,32 @@
+from django.db import migrations
+
+DEFAULT_LOCATIONS = {
+    'Library': ['lib', 'main library', 'central library', 'reading room'],
+    'Cafeteria': ['canteen', 'cafe', 'food court', 'mess', 'dining hall'],
+    'Parking Lot': ['parking', 'car park', 'parking area', 'bike stand'],
+    'Auditorium': ['audi', 'seminar hall', 'main hall'],
+    'Gym': ['gymnasium', 'sports complex', 'fitness center'],
+    'Hostel': ['dorm', 'dormitory', 'residence hall', 'hall of residence'],
+}
+
+
+def seed_locations(apps, schema_editor):
+    CampusLocation = apps.get_model('api', 'CampusLocation')
+    for name, aliases in DEFAULT_LOCATIONS.items():
+        CampusLocation.objects.get_or_create(name=name, defaults={'aliases': aliases})
+
+
+def unseed_locations(apps, schema_editor):
+    CampusLocation = apps.get_model('api', 'CampusLocation')
+    CampusLocation.objects.filter(name__in=DEFAULT_LOCATIONS).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_campuslocation'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_locations, unseed_locations),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.9 on 2026-10-18 16:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('hint', models.CharField(max_length=200)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_notifications', to='api.item')),
+                ('matched_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.item')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'recipient'], name='notification_status_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='matchnotification',
+            constraint=models.UniqueConstraint(fields=('item', 'matched_item'), name='unique_match_notification'),
+        ),
+    ]
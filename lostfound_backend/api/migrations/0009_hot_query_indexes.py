@@ -0,0 +1,45 @@
+# Generated by Django 5.0.9 on 2026-10-18 16:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_matchnotification'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='claimattempt',
+            index=models.Index(fields=['item', '-created_at', '-id'], name='claim_item_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claimattempt',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='claim_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='claimattempt',
+            index=models.Index(condition=models.Q(('status', 'approved')), fields=['status'], name='claim_approved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('is_claimed', False)), fields=['status', '-created_at', '-id'], name='item_open_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='item_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['receiver', '-timestamp', '-id'], name='message_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['receiver', '-timestamp', '-id'], name='message_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['item', 'sender', 'receiver', '-timestamp', '-id'], name='message_thread_idx'),
+        ),
+    ]
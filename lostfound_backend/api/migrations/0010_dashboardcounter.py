@@ -0,0 +1,35 @@
+# Generated by Django 5.0.9 on 2026-10-18 17:00
+
+from django.db import migrations, models
+
+
+def count_existing(apps, schema_editor):
+    Item = apps.get_model('api', 'Item')
+    ClaimAttempt = apps.get_model('api', 'ClaimAttempt')
+    DashboardCounter = apps.get_model('api', 'DashboardCounter')
+    counts = {
+        'open_lost_items': Item.objects.filter(status='lost', is_claimed=False).count(),
+        'open_found_items': Item.objects.filter(status='found', is_claimed=False).count(),
+        'claim_attempts': ClaimAttempt.objects.count(),
+        'approved_claims': ClaimAttempt.objects.filter(status='approved').count(),
+    }
+    DashboardCounter.objects.bulk_create([DashboardCounter(key=k, value=v) for k, v in counts.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.9 on 2026-10-18 17:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_dashboardcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='notification_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.0.9 on 2026-10-18 17:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max, Min, Q
+
+
+def seed_read_cursors(apps, schema_editor):
+    # A cursor cannot express a read message after an unread one; such threads
+    # start from their oldest unread message.
+    Message = apps.get_model('api', 'Message')
+    ThreadParticipant = apps.get_model('api', 'ThreadParticipant')
+    CustomUser = apps.get_model('api', 'CustomUser')
+    threads = (
+        Message.objects.values('receiver_id', 'item_id', 'sender_id')
+        .annotate(newest=Max('id'), first_unread=Min('id', filter=Q(is_read=False)))
+    )
+    participants, totals = [], {}
+    for thread in threads:
+        key = {'receiver_id': thread['receiver_id'], 'item_id': thread['item_id'], 'sender_id': thread['sender_id']}
+        if thread['first_unread'] is None:
+            last_read, unread = thread['newest'], 0
+        else:
+            last_read = thread['first_unread'] - 1
+            unread = Message.objects.filter(**key, id__gt=last_read).count()
+        participants.append(ThreadParticipant(
+            user_id=thread['receiver_id'], item_id=thread['item_id'], counterpart_id=thread['sender_id'],
+            last_read_message_id=last_read, unread_count=unread,
+        ))
+        totals[thread['receiver_id']] = totals.get(thread['receiver_id'], 0) + unread
+    ThreadParticipant.objects.bulk_create(participants, batch_size=500)
+    for user_id, total in totals.items():
+        if total:
+            CustomUser.objects.filter(id=user_id).update(unread_message_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_customuser_notification_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThreadParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_message_id', models.PositiveBigIntegerField(default=0)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='unread_message_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='threadparticipant',
+            name='counterpart',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='threadparticipant',
+            name='item',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='thread_participants', to='api.item'),
+        ),
+        migrations.AddField(
+            model_name='threadparticipant',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='threads', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='threadparticipant',
+            constraint=models.UniqueConstraint(fields=('user', 'item', 'counterpart'), name='unique_thread_participant'),
+        ),
+        migrations.RunPython(seed_read_cursors, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='message',
+            name='message_unread_idx',
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read',
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.0.9 on 2026-10-18 17:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_conversations(apps, schema_editor):
+    Message = apps.get_model('api', 'Message')
+    Conversation = apps.get_model('api', 'Conversation')
+    ThreadParticipant = apps.get_model('api', 'ThreadParticipant')
+    latest = {}
+    for message in Message.objects.order_by('id').iterator():
+        latest[(message.item_id, *sorted((message.sender_id, message.receiver_id)))] = message
+    for (item_id, first_user_id, second_user_id), message in latest.items():
+        text = ' '.join(message.message.split())
+        conversation = Conversation.objects.create(
+            item_id=item_id, first_user_id=first_user_id, second_user_id=second_user_id,
+            last_message=message, last_sender_id=message.sender_id, last_message_at=message.timestamp,
+            last_message_snippet=text if len(text) <= 140 else text[:139] + '…',
+        )
+        for user_id, counterpart_id in {(first_user_id, second_user_id), (second_user_id, first_user_id)}:
+            ThreadParticipant.objects.update_or_create(
+                user_id=user_id, item_id=item_id, counterpart_id=counterpart_id,
+                defaults={'conversation': conversation, 'last_message_at': message.timestamp},
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_thread_read_cursors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='threadparticipant',
+            name='last_message_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_snippet', models.CharField(blank=True, max_length=200)),
+                ('last_message_at', models.DateTimeField()),
+                ('first_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations', to='api.item')),
+                ('last_message', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.message')),
+                ('last_sender', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('second_user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='threadparticipant',
+            name='conversation',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='api.conversation'),
+        ),
+        migrations.AddIndex(
+            model_name='threadparticipant',
+            index=models.Index(fields=['user', '-last_message_at', '-id'], name='thread_inbox_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('item', 'first_user', 'second_user'), name='unique_conversation'),
+        ),
+        migrations.RunPython(seed_conversations, migrations.RunPython.noop),
+    ]
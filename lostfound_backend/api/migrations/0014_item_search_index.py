@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from api import search
+
+    search.install(schema_editor)
+
+
+def uninstall_search_index(apps, schema_editor):
+    from api import search
+
+    search.uninstall(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_conversation_inbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
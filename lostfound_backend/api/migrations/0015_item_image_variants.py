@@ -0,0 +1,18 @@
+# Generated by Django 5.0.9 on 2026-10-18 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_item_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='image_variants',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.9 on 2026-10-18 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_item_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='image_hash',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
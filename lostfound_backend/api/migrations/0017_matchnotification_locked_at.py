@@ -0,0 +1,18 @@
+# Generated by Django 5.0.9 on 2026-10-18 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_item_image_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchnotification',
+            name='locked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
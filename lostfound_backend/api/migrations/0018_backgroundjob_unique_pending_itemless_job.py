@@ -0,0 +1,27 @@
+# Generated by Django 5.0.9 on 2026-10-18 18:08
+
+from django.db import migrations, models
+
+
+def merge_duplicate_jobs(apps, schema_editor):
+    # Duplicates queued before the constraint existed; the oldest one stays pending.
+    BackgroundJob = apps.get_model('api', 'BackgroundJob')
+    seen = set()
+    for job in BackgroundJob.objects.filter(status='pending', item__isnull=True).order_by('id'):
+        if job.kind in seen:
+            BackgroundJob.objects.filter(id=job.id).update(status='failed', last_error='Merged into an earlier pending job')
+        seen.add(job.kind)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_matchnotification_locked_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='backgroundjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('item__isnull', True), ('status', 'pending')), fields=('kind',), name='unique_pending_itemless_job'),
+        ),
+    ]
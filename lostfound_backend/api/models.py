@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
 
 class CustomUserManager(BaseUserManager):
@@ -37,6 +38,10 @@ class CustomUser(AbstractBaseUser):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     is_admin = models.BooleanField(default=False)
+    # Bumped whenever the unread message count may have changed; the notification summary's ETag.
+    notification_version = models.PositiveIntegerField(default=0, editable=False)
+    # Sum of the user's ThreadParticipant.unread_count, maintained by api.threads.
+    unread_message_count = models.PositiveIntegerField(default=0, editable=False)
 
     objects = CustomUserManager()
 
@@ -59,6 +64,37 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+class CampusLocation(models.Model):
+    # Canonical place on campus; reports mentioning any alias are treated as the same place.
+    name = models.CharField(max_length=100, unique=True)
+    aliases = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Other ways people write this location, e.g. [\"lib\", \"main library\"]."
+    )
+
+    def __str__(self):
+        return self.name
+
+class ItemQuerySet(models.QuerySet):
+    def with_latest_claim(self):
+        """
+        Annotates each item with its most recent claim (``latest_claim_*``) in the
+        same query, so listings do not look up claims item by item.
+        """
+        latest = ClaimAttempt.objects.filter(item=models.OuterRef('pk')).order_by('-created_at', '-id')
+        return self.annotate(
+            latest_claim_status=models.Subquery(latest.values('status')[:1]),
+            latest_claim_user_id=models.Subquery(latest.values('user_id')[:1]),
+            latest_claim_username=models.Subquery(latest.values('user__username')[:1]),
+            latest_claim_created_at=models.Subquery(latest.values('created_at')[:1]),
+            latest_claim_note=models.Subquery(latest.values('claim_note')[:1]),
+        )
+
+    def for_listing(self):
+        # Everything ItemSerializer reads, without the stored embedding bytes.
+        return self.select_related('category').defer('embedding').with_latest_claim()
+
 class Item(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
@@ -85,9 +121,80 @@ class Item(models.Model):
     )
     # --- We no longer need the 'matches' JSON field ---
 
+    # --- Cached semantic embedding (float32 bytes), see chatbot.embeddings ---
+    embedding = models.BinaryField(null=True, blank=True, editable=False)
+    embedding_model = models.CharField(
+        max_length=200,
+        blank=True,
+        default='',
+        help_text="Model/version that produced the stored embedding."
+    )
+    # Resized, EXIF-free copies of the photo written by api.images, with the image name they were made from.
+    image_variants = models.JSONField(null=True, blank=True, editable=False)
+    # Perceptual hash of the photo (see api.images.difference_hash), matched by Hamming distance.
+    image_hash = models.BigIntegerField(null=True, blank=True, editable=False)
+
+    objects = ItemQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Open items per partition, newest first: dashboard, counts, search index builds.
+            models.Index(
+                fields=['status', '-created_at', '-id'],
+                name='item_open_recent_idx',
+                condition=models.Q(is_claimed=False),
+            ),
+            # A user's items in keyset order (My Items, My Messages).
+            models.Index(fields=['user', '-created_at', '-id'], name='item_user_recent_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} ({self.status})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'title' in field_names and 'description' in field_names:
+            instance._loaded_text = (instance.title, instance.description)
+        if 'status' in field_names and 'is_claimed' in field_names:
+            instance._loaded_partition = instance.open_partition()
+        return instance
+
+    def open_partition(self):
+        """'lost' or 'found' while the item is still open, otherwise None."""
+        if self.is_claimed or self.status not in ('lost', 'found'):
+            return None
+        return self.status
+
+    def image_variant_urls(self):
+        """
+        ``{size: {'width', 'height', format: url}}`` for the current photo, or
+        None while its copies are still being generated.
+        """
+        variants = self.image_variants or {}
+        if not self.image or variants.get('source') != self.image.name:
+            return None
+        storage = self.image.storage
+        return {
+            size: {key: storage.url(value) if key not in ('width', 'height') else value for key, value in variant.items()}
+            for size, variant in variants.items() if size != 'source'
+        }
+
+    def embedding_is_stale(self):
+        loaded_text = getattr(self, '_loaded_text', None)
+        return loaded_text is not None and loaded_text != (self.title, self.description)
+
+    def save(self, *args, **kwargs):
+        # The stored embedding describes title + description, so drop it when either changes.
+        if self.embedding_is_stale():
+            self.embedding = None
+            self.embedding_model = ''
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'embedding', 'embedding_model'}
+        super().save(*args, **kwargs)
+        self._loaded_text = (self.title, self.description)
+
 class ClaimAttempt(models.Model):
     # The user trying to claim the item (the person who lost it)
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='claims_made')
@@ -104,18 +211,180 @@ class ClaimAttempt(models.Model):
     ]
     status = models.CharField(max_length=50, choices=STATUS_CHOICES, default='pending')
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'status' in field_names:
+            instance._loaded_status = instance.status
+        return instance
+
+    class Meta:
+        indexes = [
+            # Latest claim per item, and the pending claim lookup on approval.
+            models.Index(fields=['item', '-created_at', '-id'], name='claim_item_recent_idx'),
+            # A user's claims in keyset order (My Claims).
+            models.Index(fields=['user', '-created_at', '-id'], name='claim_user_recent_idx'),
+            # Approved claims for the dashboard totals; most claims are not approved.
+            models.Index(fields=['status'], name='claim_approved_idx', condition=models.Q(status='approved')),
+        ]
+
     def __str__(self):
         return f"Claim by {self.user.username} for '{self.item.title}'"
 
+class MessageQuerySet(models.QuerySet):
+    def with_read_state(self):
+        """
+        Annotates ``is_read``: whether the receiver's read cursor for the thread
+        has reached the message.
+        """
+        return self.annotate(is_read=models.Exists(
+            ThreadParticipant.objects.filter(
+                user=models.OuterRef('receiver'),
+                item=models.OuterRef('item'),
+                counterpart=models.OuterRef('sender'),
+                last_read_message_id__gte=models.OuterRef('id'),
+            )
+        ))
+
 class Message(models.Model):
     item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='messages')
     sender = models.ForeignKey(CustomUser, related_name='sent_messages', on_delete=models.CASCADE)
     receiver = models.ForeignKey(CustomUser, related_name='received_messages', on_delete=models.CASCADE)
     message = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
-    
-    # --- ADD THIS NEW FIELD ---
-    is_read = models.BooleanField(default=False)
+
+    objects = MessageQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Notification list, newest first.
+            models.Index(fields=['receiver', '-timestamp', '-id'], name='message_inbox_idx'),
+            # One conversation: both directions of a sender/receiver pair about an item.
+            models.Index(fields=['item', 'sender', 'receiver', '-timestamp', '-id'], name='message_thread_idx'),
+        ]
+
+    def __str__(self):
+        return f"Message from {self.sender.username} to {self.receiver.username} about '{self.item.title}'"
+
+class Conversation(models.Model):
+    # A chat thread (an item and a pair of users) with its latest message, kept current by api.threads.
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='conversations')
+    # The pair ordered by id, so each thread has exactly one row.
+    first_user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='+')
+    second_user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='+')
+    last_message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, related_name='+')
+    last_sender = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name='+')
+    last_message_snippet = models.CharField(max_length=200, blank=True)
+    last_message_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'first_user', 'second_user'], name='unique_conversation'),
+        ]
+
+    def __str__(self):
+        return f"Conversation about item {self.item_id} between {self.first_user_id} and {self.second_user_id}"
+
+class ThreadParticipant(models.Model):
+    # One user's side of a chat thread: how far they have read it and what is left (see api.threads).
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='threads')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='thread_participants')
+    counterpart = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='+')
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, null=True, related_name='participants')
+    last_read_message_id = models.PositiveBigIntegerField(default=0)
+    unread_count = models.PositiveIntegerField(default=0)
+    # Copy of conversation.last_message_at, so the inbox is one index range.
+    last_message_at = models.DateTimeField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # The inbox: a user's conversations, most recently active first.
+            models.Index(fields=['user', '-last_message_at', '-id'], name='thread_inbox_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'item', 'counterpart'], name='unique_thread_participant'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} reading item {self.item_id} with {self.counterpart_id} ({self.unread_count} unread)"
+
+class BackgroundJob(models.Model):
+    # Durable work queue drained by `python manage.py run_worker`, see api.jobs.
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    kind = models.CharField(max_length=50)
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+        constraints = [
+            # At most one queued job of each kind per item; repeated requests are merged.
+            models.UniqueConstraint(
+                fields=['kind', 'item'],
+                condition=models.Q(status='pending'),
+                name='unique_pending_job_per_item',
+            ),
+            # NULLs never collide above, so item-less jobs need their own constraint.
+            models.UniqueConstraint(
+                fields=['kind'],
+                condition=models.Q(status='pending', item__isnull=True),
+                name='unique_pending_itemless_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} job for item {self.item_id} ({self.status})"
+
+class MatchNotification(models.Model):
+    # Email outbox for match alerts, sent as per-user digests by api.notifications.
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    recipient = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='match_notifications')
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='match_notifications')
+    matched_item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    hint = models.CharField(max_length=200)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'recipient'], name='notification_status_idx'),
+        ]
+        constraints = [
+            # A pair of items is announced once, even if matching runs again.
+            models.UniqueConstraint(fields=['item', 'matched_item'], name='unique_match_notification'),
+        ]
+
+    def __str__(self):
+        return f"Match of item {self.matched_item_id} for {self.recipient} ({self.status})"
+
+class DashboardCounter(models.Model):
+    # Running dashboard totals, adjusted in the same transaction as the write (see api.stats).
+    key = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
 
     def __str__(self):
-        return f"Message from {self.sender.username} to {self.receiver.username} about '{self.item.title}'"
\ No newline at end of file
+        return f"{self.key} = {self.value}"
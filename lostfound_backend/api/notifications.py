@@ -0,0 +1,162 @@
+import logging
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F
+from django.utils import timezone
+
+from api.models import Item, MatchNotification
+
+logger = logging.getLogger(__name__)
+
+CONFIDENCE_THRESHOLD = 0.60
+
+
+def queue_match_notifications(item, matches):
+    """
+    Writes outbox rows for the owner of ``item`` and for the owners of the
+    matched items, then schedules a digest run.
+    """
+    from api.jobs import enqueue
+
+    confident = [m for m in matches if m['score'] >= CONFIDENCE_THRESHOLD and m['item_id'] != item.id]
+    if not confident:
+        return 0
+    matched_items = Item.objects.select_related('user').in_bulk([m['item_id'] for m in confident])
+
+    notifications = []
+    for match in confident:
+        matched_item = matched_items.get(match['item_id'])
+        if matched_item is None:
+            continue
+        if item.user.email:
+            notifications.append(MatchNotification(
+                recipient=item.user, item=item, matched_item=matched_item,
+                score=match['score'], hint=match['details']['title_hint'],
+            ))
+        if matched_item.user.email and matched_item.user.email != item.user.email:
+            notifications.append(MatchNotification(
+                recipient=matched_item.user, item=matched_item, matched_item=item,
+                score=match['score'], hint=item.title,
+            ))
+    if notifications:
+        # Pairs that were already announced are skipped by the unique constraint.
+        MatchNotification.objects.bulk_create(notifications, ignore_conflicts=True)
+        # The delay lets matches from items reported close together share one digest.
+        enqueue('send_match_emails', delay=settings.MATCH_EMAIL_DIGEST_DELAY)
+    return len(notifications)
+
+def build_digest(recipient, notifications) -> EmailMessage:
+    site_url = getattr(settings, 'SITE_URL', 'http://127.0.0.1:8000')
+    sections = []
+    for item, group in groupby(notifications, key=lambda n: n.item):
+        other = 'Found Item' if item.status == 'lost' else 'Lost Item'
+        lines = "\n".join(
+            f"- Potential Match: {other} (Hint: '{n.hint}'), Confidence: {n.score*100:.0f}%" for n in group
+        )
+        sections.append(f"Your {item.status} item '{item.title}':\n{lines}")
+
+    if len(sections) == 1:
+        subject = f"📩 Potential Match Found for Your {notifications[0].item.status.capitalize()} Item"
+    else:
+        subject = f"📩 Potential Matches Found for {len(sections)} of Your Items"
+    body = (
+        f"Dear {getattr(recipient, 'name', None) or recipient.username},\n\n"
+        f"Thank you for using Refind. Our matching system has identified potential matches for the items you reported.\n\n"
+        + "\n\n".join(sections) + "\n\n"
+        f"Please log in to your Refind dashboard to review these matches and start a chat to verify ownership.\n\n"
+        f"Access your dashboard: {site_url}/dashboard\n\n"
+        f"Best regards,\nThe Refind Team\nsupport@refind.com | {site_url}"
+    )
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [recipient.email])
+
+def send_match_digests(_item_id=None, batch_size=None):
+    """
+    Drains pending notifications as one digest per recipient over a single
+    SMTP connection. Raises if the connection cannot be opened so the job is
+    retried; a rejected message only affects its own recipient.
+    """
+    from api.jobs import enqueue
+
+    batch_size = batch_size or settings.MATCH_EMAIL_BATCH_SIZE
+    recipient_ids = list(
+        MatchNotification.objects.filter(status='pending')
+        .order_by('recipient_id').values_list('recipient_id', flat=True).distinct()[:batch_size + 1]
+    )
+    if not recipient_ids:
+        return 0
+    has_more = len(recipient_ids) > batch_size
+
+    sent = failed = 0
+    # Opened before anything is claimed, so an unreachable mail server leaves
+    # the outbox untouched and the job is simply retried.
+    with get_connection(fail_silently=False) as connection:
+        # One conditional UPDATE claims the whole batch, so an overlapping run
+        # cannot send it twice; the claim time tells this run's rows apart.
+        locked_at = timezone.now()
+        claimed = MatchNotification.objects.filter(
+            status='pending', recipient_id__in=recipient_ids[:batch_size]
+        ).update(status='sending', locked_at=locked_at)
+        if not claimed:
+            return 0
+        batch = MatchNotification.objects.filter(status='sending', locked_at=locked_at)
+        try:
+            for recipient, group in groupby(
+                batch.select_related('recipient', 'item', 'matched_item').order_by('recipient_id', 'item_id', '-score'),
+                key=lambda n: n.recipient,
+            ):
+                group = list(group)
+                ids = [n.id for n in group]
+                try:
+                    connection.send_messages([build_digest(recipient, group)])
+                except Exception as e:
+                    logger.error(f"Failed to send match digest to {recipient.email}: {str(e)}")
+                    requeue(ids, str(e))
+                    failed += 1
+                    continue
+                MatchNotification.objects.filter(id__in=ids).update(status='sent', locked_at=None, sent_at=timezone.now())
+                sent += 1
+                logger.info(f"Match digest with {len(group)} matches sent to {recipient.email}")
+        except Exception as e:
+            # Whatever this run still holds goes back to the outbox before the job retries.
+            requeue(list(batch.values_list('id', flat=True)), str(e))
+            raise
+
+    if has_more:
+        enqueue('send_match_emails')
+    elif failed:
+        enqueue('send_match_emails', delay=settings.JOB_RETRY_BASE_SECONDS)
+    return sent
+
+def requeue(ids, error):
+    """
+    Puts claimed notifications back in the outbox after a failed attempt;
+    those out of attempts are marked failed. Returns how many were put back.
+    """
+    requeued = MatchNotification.objects.filter(id__in=ids, status='sending').update(
+        status='pending', locked_at=None, attempts=F('attempts') + 1, last_error=error
+    )
+    MatchNotification.objects.filter(
+        id__in=ids, status='pending', attempts__gte=settings.JOB_MAX_ATTEMPTS
+    ).update(status='failed')
+    return requeued
+
+def release_stale_notifications():
+    """
+    Puts notifications back in the outbox whose digest run died while sending
+    them, and schedules a run for them. That counts as a failed attempt. Their
+    digest may already have gone out; sending it again beats never sending it.
+    """
+    from api.jobs import enqueue
+
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    stale = list(
+        MatchNotification.objects.filter(status='sending', locked_at__lt=cutoff).values_list('id', flat=True)
+    )
+    released = requeue(stale, 'Released after lock timeout') if stale else 0
+    if released:
+        logger.warning(f"Released {released} stale match notifications")
+        enqueue('send_match_emails')
+    return released
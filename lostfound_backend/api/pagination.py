@@ -0,0 +1,101 @@
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on ``(ordering_field, id)``, so every page is an
+    index range scan no matter how deep the client pages.
+
+    Pages stay plain JSON lists, which keeps existing clients working. The
+    cursor for the next page is sent in the ``X-Next-Cursor`` and ``Link``
+    headers and is absent on the last page.
+    """
+    ordering_field = 'created_at'
+    descending = True
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, settings.API_PAGE_SIZE))
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: "Page size must be a number."})
+        return max(1, min(page_size, settings.API_MAX_PAGE_SIZE))
+
+    def encode_cursor(self, obj):
+        value = getattr(obj, self.ordering_field)
+        position = [value.isoformat() if hasattr(value, 'isoformat') else value, obj.pk]
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if self.ordering_field != 'id':
+                value = parse_datetime(value)
+            if value is None or not isinstance(pk, int):
+                raise ValueError(cursor)
+        except (TypeError, ValueError):
+            raise ValidationError({self.cursor_query_param: "Invalid cursor."})
+        return value, pk
+
+    def order(self, queryset):
+        prefix = '-' if self.descending else ''
+        if self.ordering_field == 'id':
+            return queryset.order_by(f'{prefix}id')
+        return queryset.order_by(f'{prefix}{self.ordering_field}', f'{prefix}id')
+
+    def after(self, queryset, value, pk):
+        op = 'lt' if self.descending else 'gt'
+        if self.ordering_field == 'id':
+            return queryset.filter(**{f'id__{op}': pk})
+        return queryset.filter(
+            Q(**{f'{self.ordering_field}__{op}': value}) | Q(**{self.ordering_field: value, f'id__{op}': pk})
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = self.order(queryset)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = self.after(queryset, *self.decode_cursor(cursor))
+        page = list(queryset[:page_size + 1])
+        self.has_next = len(page) > page_size
+        page = page[:page_size]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_headers(self):
+        if self.next_cursor is None:
+            return {}
+        return {'X-Next-Cursor': self.next_cursor, 'Link': f'<{self.get_next_link()}>; rel="next"'}
+
+    def get_paginated_response(self, data):
+        return Response(data, headers=self.get_headers())
+
+
+class TimestampKeysetPagination(KeysetPagination):
+    ordering_field = 'timestamp'
+
+
+class ConversationKeysetPagination(KeysetPagination):
+    ordering_field = 'last_message_at'
+
+
+class IdKeysetPagination(KeysetPagination):
+    ordering_field = 'id'
+    descending = False
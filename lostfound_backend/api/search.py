@@ -0,0 +1,131 @@
+import logging
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+# Only word characters reach the query syntax of either backend.
+TERM_PATTERN = re.compile(r"\w+")
+MAX_TERMS = 8
+
+# SQLite: an FTS5 index over api_item, kept in sync by triggers, so bulk writes
+# and raw SQL are covered too. Column weights for bm25() follow the column order.
+SQLITE_INSTALL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS api_item_fts USING fts5(
+        title, description, location,
+        content='api_item', content_rowid='id', tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_item_fts_insert AFTER INSERT ON api_item BEGIN
+        INSERT INTO api_item_fts(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_item_fts_delete AFTER DELETE ON api_item BEGIN
+        INSERT INTO api_item_fts(api_item_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_item_fts_update AFTER UPDATE OF title, description, location ON api_item BEGIN
+        INSERT INTO api_item_fts(api_item_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+        INSERT INTO api_item_fts(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END
+    """,
+    "INSERT INTO api_item_fts(api_item_fts) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS api_item_fts_insert",
+    "DROP TRIGGER IF EXISTS api_item_fts_delete",
+    "DROP TRIGGER IF EXISTS api_item_fts_update",
+    "DROP TABLE IF EXISTS api_item_fts",
+]
+SQLITE_WEIGHTS = (10.0, 2.0, 5.0)
+
+# Postgres: a generated, weighted tsvector column with a GIN index; the database keeps it current.
+POSTGRES_INSTALL = [
+    """
+    ALTER TABLE api_item ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(location, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS api_item_search_idx ON api_item USING GIN (search_vector)",
+]
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS api_item_search_idx",
+    "ALTER TABLE api_item DROP COLUMN IF EXISTS search_vector",
+]
+
+_fts_available = {}
+
+
+def install(schema_editor):
+    """Creates the full-text index for the database in use; safe to run again."""
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_INSTALL, 'postgresql': POSTGRES_INSTALL}.get(vendor, [])
+    try:
+        for statement in statements:
+            schema_editor.execute(statement)
+    except Exception as e:
+        if vendor != 'sqlite':
+            raise
+        # SQLite builds without FTS5 fall back to substring matching.
+        logger.warning(f"Full-text search index not installed: {str(e)}")
+
+def uninstall(schema_editor):
+    vendor = schema_editor.connection.vendor
+    for statement in {'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRES_UNINSTALL}.get(vendor, []):
+        schema_editor.execute(statement)
+
+def fts_available():
+    if connection.alias not in _fts_available:
+        _fts_available[connection.alias] = (
+            connection.vendor == 'postgresql' or 'api_item_fts' in connection.introspection.table_names()
+        )
+    return _fts_available[connection.alias]
+
+def terms(text):
+    return TERM_PATTERN.findall((text or '').lower())[:MAX_TERMS]
+
+def search_items(queryset, text):
+    """
+    Narrows an Item queryset to the items matching every term of ``text``,
+    each as a prefix, and annotates ``search_rank`` (higher is better). The
+    match and the ranking run inside the one SELECT on the full-text index.
+    """
+    words = terms(text)
+    if not words:
+        return queryset.annotate(search_rank=Value(0.0)).none()
+    if connection.vendor == 'postgresql':
+        query = ' & '.join(f"{word}:*" for word in words)
+        return queryset.filter(
+            RawSQL("api_item.search_vector @@ to_tsquery('english', %s)", [query], output_field=BooleanField())
+        ).annotate(
+            search_rank=RawSQL("ts_rank(api_item.search_vector, to_tsquery('english', %s))", [query], output_field=FloatField())
+        )
+    if not fts_available():
+        matches = Q()
+        for word in words:
+            matches &= Q(title__icontains=word) | Q(description__icontains=word) | Q(location__icontains=word)
+        return queryset.filter(matches).annotate(search_rank=Value(0.0))
+    query = ' '.join(f'"{word}"*' for word in words)
+    weights = ', '.join(str(w) for w in SQLITE_WEIGHTS)
+    # Joined, not filtered with a subquery, so the index is searched once and
+    # bm25() is read from that same MATCH.
+    return queryset.extra(
+        tables=['api_item_fts'],
+        where=['api_item_fts MATCH %s', 'api_item_fts.rowid = api_item.id'],
+        params=[query],
+        # bm25() is lower for better matches.
+        select={'search_rank': f"-bm25(api_item_fts, {weights})"},
+    )
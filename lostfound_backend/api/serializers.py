@@ -1,6 +1,6 @@
 from rest_framework import serializers
-from api.models import Item, Category, ClaimAttempt, Message, CustomUser
-from chatbot.matching import match_items
+from api.models import Item, Category, ClaimAttempt, Message, CustomUser, ThreadParticipant
+from chatbot.matching import mask_text
 import logging
 
 logger = logging.getLogger(__name__)
@@ -26,6 +26,13 @@ class RegisterSerializer(serializers.ModelSerializer):
         )
         return user
 
+class RecipientSerializer(serializers.ModelSerializer):
+    # Just enough to address a message; no contact details.
+    class Meta:
+        model = CustomUser
+        fields = ['id', 'username', 'name']
+        read_only_fields = fields
+
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomUser
@@ -39,26 +46,54 @@ class CategorySerializer(serializers.ModelSerializer):
 class ItemSerializer(serializers.ModelSerializer):
     claim_status = serializers.SerializerMethodField()
     category_name = serializers.CharField(source='category.name', read_only=True)
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Item
         fields = [
             'id', 'user', 'title', 'description', 'location', 'category', 'category_name',
-            'created_at', 'status', 'is_claimed', 'private_note', 'image', 'claim_status'
+            'created_at', 'status', 'is_claimed', 'private_note', 'image', 'image_variants', 'claim_status'
         ]
         read_only_fields = ['id', 'user', 'is_claimed', 'created_at', 'category_name']
         extra_kwargs = {'category': {'write_only': True}}
 
     def get_claim_status(self, obj):
-        claim = ClaimAttempt.objects.filter(item=obj).order_by('-created_at').first()
-        if claim:
-            return {
+        if hasattr(obj, 'latest_claim_status'):
+            # Annotated by Item.objects.with_latest_claim(), no extra queries.
+            if obj.latest_claim_status is None:
+                return None
+            claim_status = {
+                'status': obj.latest_claim_status,
+                'claimer_id': obj.latest_claim_user_id,
+                'claimer_username': obj.latest_claim_username,
+                'created_at': obj.latest_claim_created_at.isoformat(),
+            }
+            note = obj.latest_claim_note
+        else:
+            claim = ClaimAttempt.objects.filter(item=obj).select_related('user').order_by('-created_at', '-id').first()
+            if not claim:
+                return None
+            claim_status = {
                 'status': claim.status,
                 'claimer_id': claim.user_id,
                 'claimer_username': claim.user.username,
                 'created_at': claim.created_at.isoformat(),
             }
-        return None
+            note = claim.claim_note
+        if self.context.get('include_claim_note'):
+            claim_status['claim_note'] = note
+        return claim_status
+
+    def get_image_variants(self, obj):
+        variants = obj.image_variant_urls()
+        request = self.context.get('request')
+        if variants is None or request is None:
+            return variants
+        # Absolute, like the ``image`` URL next to it.
+        return {
+            size: {key: request.build_absolute_uri(value) if isinstance(value, str) else value for key, value in variant.items()}
+            for size, variant in variants.items()
+        }
 
     def to_internal_value(self, data):
         logger.debug(f"ItemSerializer raw input data: {data}")
@@ -83,6 +118,8 @@ class ItemSerializer(serializers.ModelSerializer):
             raise
 
     def get_matches(self, obj):
+        from chatbot.matching import match_items
+
         try:
             search_text = f"{obj.title} {obj.description} {obj.location}"
             matches = match_items(search_text)
@@ -118,6 +155,32 @@ class ItemSerializer(serializers.ModelSerializer):
         validated_data['user'] = user
         return super().create(validated_data)
 
+def masked_item(item):
+    # What another user's item reveals: enough to recognise it, not enough to claim it.
+    return {
+        'id': item.id,
+        'title': mask_text(item.title),
+        'description': "Description is hidden for privacy. Please chat with the user for more details.",
+        'location': mask_text(item.location),
+        'status': item.status,
+        'category': item.category.name if item.category else 'N/A',
+        'image': item.image.url if item.image else None,
+        'image_variants': item.image_variant_urls(),
+        'user': item.user_id,
+    }
+
+class ItemSearchSerializer(ItemSerializer):
+    # Search covers everyone's items: the finder's secret detail stays out, and
+    # other users' items get the same masked view as /api/view-item/.
+    class Meta(ItemSerializer.Meta):
+        fields = [field for field in ItemSerializer.Meta.fields if field != 'private_note']
+
+    def to_representation(self, instance):
+        request = self.context.get('request')
+        if request is None or instance.user_id != request.user.id:
+            return masked_item(instance)
+        return super().to_representation(instance)
+
 class ClaimAttemptSerializer(serializers.ModelSerializer):
     class Meta:
         model = ClaimAttempt
@@ -128,8 +191,28 @@ class MessageSerializer(serializers.ModelSerializer):
     sender_username = serializers.CharField(source='sender.username', read_only=True)
     receiver = serializers.PrimaryKeyRelatedField(queryset=CustomUser.objects.all())
     item = serializers.PrimaryKeyRelatedField(queryset=Item.objects.all())
+    # Annotated by Message.objects.with_read_state(); a message just sent is unread.
+    is_read = serializers.BooleanField(read_only=True, default=False)
 
     class Meta:
         model = Message
         fields = ['id', 'sender', 'sender_username', 'receiver', 'item', 'message', 'timestamp', 'is_read']
-        read_only_fields = ['id', 'sender', 'sender_username', 'timestamp', 'is_read']
\ No newline at end of file
+        read_only_fields = ['id', 'sender', 'sender_username', 'timestamp', 'is_read']
+
+class ConversationSerializer(serializers.ModelSerializer):
+    # One inbox row: the signed-in user's side of a conversation.
+    conversation = serializers.IntegerField(source='conversation_id', read_only=True)
+    item_title = serializers.CharField(source='item.title', read_only=True)
+    item_status = serializers.CharField(source='item.status', read_only=True)
+    counterpart_username = serializers.CharField(source='counterpart.username', read_only=True)
+    last_message_id = serializers.IntegerField(source='conversation.last_message_id', read_only=True)
+    last_message = serializers.CharField(source='conversation.last_message_snippet', read_only=True)
+    last_sender = serializers.IntegerField(source='conversation.last_sender_id', read_only=True)
+
+    class Meta:
+        model = ThreadParticipant
+        fields = [
+            'conversation', 'item', 'item_title', 'item_status', 'counterpart', 'counterpart_username',
+            'last_message_id', 'last_message', 'last_sender', 'last_message_at', 'unread_count',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,60 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api import events, stats, threads
+from api.models import ClaimAttempt, Item, Message, ThreadParticipant
+
+
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and set(update_fields) <= {'embedding', 'embedding_model'}):
+        return
+    before = None if created else getattr(instance, '_loaded_partition', None)
+    after = instance.open_partition()
+    if before != after:
+        if before:
+            stats.adjust(stats.PARTITION_COUNTERS[before], -1)
+        if after:
+            stats.adjust(stats.PARTITION_COUNTERS[after], 1)
+    instance._loaded_partition = after
+    stats.invalidate_recent_items()
+
+@receiver(post_delete, sender=Item)
+def item_deleted(sender, instance, **kwargs):
+    partition = instance.open_partition()
+    if partition:
+        stats.adjust(stats.PARTITION_COUNTERS[partition], -1)
+    stats.invalidate_recent_items()
+
+@receiver(post_save, sender=ClaimAttempt)
+def claim_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        stats.adjust('claim_attempts', 1)
+    was_approved = not created and getattr(instance, '_loaded_status', None) == 'approved'
+    is_approved = instance.status == 'approved'
+    if was_approved != is_approved:
+        stats.adjust('approved_claims', 1 if is_approved else -1)
+    instance._loaded_status = instance.status
+    # The dashboard lists show each item's latest claim.
+    stats.invalidate_recent_items()
+
+@receiver(post_delete, sender=ClaimAttempt)
+def claim_deleted(sender, instance, **kwargs):
+    stats.adjust('claim_attempts', -1)
+    if instance.status == 'approved':
+        stats.adjust('approved_claims', -1)
+    stats.invalidate_recent_items()
+
+@receiver(post_save, sender=Message)
+def message_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        events.push_new_message(instance)
+        threads.message_created(instance)
+
+@receiver(post_delete, sender=ThreadParticipant)
+def thread_participant_deleted(sender, instance, **kwargs):
+    # Threads go away with their item or users; their unread messages leave the total too.
+    if instance.unread_count:
+        threads.unread_changed(instance.user_id, -instance.unread_count)
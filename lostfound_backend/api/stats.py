@@ -0,0 +1,61 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from api.models import ClaimAttempt, DashboardCounter, Item
+
+logger = logging.getLogger(__name__)
+
+# counter key -> how to recount it from scratch
+COUNTERS = {
+    'open_lost_items': lambda: Item.objects.filter(status='lost', is_claimed=False).count(),
+    'open_found_items': lambda: Item.objects.filter(status='found', is_claimed=False).count(),
+    'claim_attempts': lambda: ClaimAttempt.objects.count(),
+    'approved_claims': lambda: ClaimAttempt.objects.filter(status='approved').count(),
+}
+PARTITION_COUNTERS = {'lost': 'open_lost_items', 'found': 'open_found_items'}
+RECENT_ITEMS_KEY = 'dashboard:recent:{status}'
+
+
+def adjust(key, delta):
+    """Adds ``delta`` to a counter inside the caller's transaction."""
+    if not delta:
+        return
+    if not DashboardCounter.objects.filter(key=key).update(value=F('value') + delta):
+        refresh_counters()
+
+def refresh_counters():
+    """Recounts every total; fixes drift from bulk writes that bypass the signals."""
+    with transaction.atomic():
+        counts = {key: count() for key, count in COUNTERS.items()}
+        for key, value in counts.items():
+            DashboardCounter.objects.update_or_create(key=key, defaults={'value': value})
+    logger.info(f"Dashboard counters refreshed: {counts}")
+    return counts
+
+def get_counters():
+    counts = dict(DashboardCounter.objects.values_list('key', 'value'))
+    if set(counts) != set(COUNTERS):
+        counts = refresh_counters()
+    return counts
+
+def recent_items(status):
+    """Serialized five newest open items of a partition, cached until the next write."""
+    from api.serializers import ItemSerializer
+
+    key = RECENT_ITEMS_KEY.format(status=status)
+    data = cache.get(key)
+    if data is None:
+        items = Item.objects.filter(status=status, is_claimed=False).for_listing().order_by('-created_at', '-id')[:5]
+        data = list(ItemSerializer(items, many=True, context={'skip_matches': True}).data)
+        cache.set(key, data, settings.DASHBOARD_CACHE_TTL)
+    return data
+
+def invalidate_recent_items():
+    # After commit, so a concurrent request cannot re-cache the old rows.
+    transaction.on_commit(
+        lambda: cache.delete_many([RECENT_ITEMS_KEY.format(status=s) for s in PARTITION_COUNTERS])
+    )
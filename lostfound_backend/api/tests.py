@@ -1,3 +1,1117 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from PIL import Image
+from api import events, images, jobs, stats, threads
+from api.models import (
+    BackgroundJob, Category, ClaimAttempt, Conversation, CustomUser, DashboardCounter, Item, MatchNotification,
+    Message, ThreadParticipant,
+)
+from api.notifications import queue_match_notifications, release_stale_notifications, send_match_digests
+from chatbot.bktree import hamming
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+class StartupImportTests(SimpleTestCase):
+    """Every gunicorn worker and manage.py command pays for what these imports pull in."""
+
+    # Generous enough for slow CI machines; a spaCy or scikit-learn import alone blows it.
+    IMPORT_BUDGET_SECONDS = 2.0
+    HEAVY_MODULES = ('spacy', 'sklearn', 'groq', 'rapidfuzz', 'fuzzywuzzy', 'sentence_transformers', 'torch')
+
+    def measure(self, module):
+        script = (
+            "import json, sys, time\n"
+            "started = time.perf_counter()\n"
+            f"import {module}\n"
+            "elapsed = time.perf_counter() - started\n"
+            f"print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {self.HEAVY_MODULES!r} if m in sys.modules]}}))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, '-W', 'ignore', '-c', script],
+            cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def test_wsgi_import_is_within_budget(self):
+        report = self.measure('lostfound.wsgi')
+        self.assertEqual(report['loaded'], [])
+        self.assertLess(report['elapsed'], self.IMPORT_BUDGET_SECONDS)
+
+    def test_url_conf_does_not_load_heavy_stacks(self):
+        # Resolving the URLconf imports every view module, like the first request does.
+        report = self.measure('lostfound.wsgi, lostfound.urls')
+        self.assertEqual(report['loaded'], [])
+
+
+@override_settings(JOB_MAX_ATTEMPTS=3, JOB_RETRY_BASE_SECONDS=10, JOB_RETRY_MAX_SECONDS=25)
+class BackgroundJobTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='owner@example.com', username='owner', name='Owner', student_id='S1', password='password123'
+        )
+        self.item = Item.objects.create(user=self.user, title='Wallet', description='black', status='lost')
+        self.handler = mock.Mock()
+        patcher = mock.patch('api.jobs.import_string', return_value=self.handler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_duplicate_pending_jobs_are_merged(self):
+        first = jobs.enqueue('match_item', self.item)
+        second = jobs.enqueue('match_item', self.item)
+        self.assertEqual(first.id, second.id)
+        jobs.enqueue('reindex_item', self.item)
+        self.assertEqual(BackgroundJob.objects.count(), 2)
+
+    def test_itemless_jobs_are_merged_by_the_database(self):
+        first = jobs.enqueue('send_match_emails')
+        self.assertEqual(jobs.enqueue('send_match_emails').id, first.id)
+        # A concurrent enqueue that missed the pending job cannot insert a second one.
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BackgroundJob.objects.create(kind='send_match_emails')
+        self.assertEqual(BackgroundJob.objects.filter(kind='send_match_emails').count(), 1)
+
+    def test_job_claimed_during_a_merge_is_queued_again(self):
+        claimed = jobs.enqueue('match_item', self.item)
+        jobs.claim_jobs(1)
+        # The insert hit the pending job, which a worker claimed before it was read back.
+        create = BackgroundJob.objects.create
+        conflicts = [IntegrityError('unique_pending_job_per_item')]
+
+        def conflict_once(**kwargs):
+            if conflicts:
+                raise conflicts.pop()
+            return create(**kwargs)
+
+        with mock.patch.object(BackgroundJob.objects, 'create', side_effect=conflict_once):
+            job = jobs.enqueue('match_item', self.item)
+        self.assertNotEqual(job.id, claimed.id)
+        self.assertEqual(job.status, 'pending')
+
+    def test_due_jobs_run_once(self):
+        jobs.enqueue('match_item', self.item)
+        jobs.enqueue('reindex_item', self.item, delay=60)
+
+        self.assertEqual(jobs.run_pending(), 1)
+        self.handler.assert_called_once_with(self.item.id)
+        self.assertEqual(jobs.run_pending(), 0)
+        self.assertEqual(BackgroundJob.objects.get(kind='match_item').status, 'done')
+        # Finished jobs no longer block a new one for the same item.
+        self.assertEqual(jobs.enqueue('match_item', self.item).status, 'pending')
+
+    def test_failures_back_off_then_give_up(self):
+        self.handler.side_effect = RuntimeError('model unavailable')
+        job = jobs.enqueue('match_item', self.item)
+
+        delays = []
+        for _ in range(3):
+            BackgroundJob.objects.filter(id=job.id).update(run_after=timezone.now())
+            started = timezone.now()
+            self.assertEqual(jobs.run_pending(), 1)
+            job.refresh_from_db()
+            delays.append((job.run_after - started).total_seconds())
+
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.attempts, 3)
+        self.assertEqual(job.last_error, 'model unavailable')
+        self.assertAlmostEqual(delays[0], 10, delta=1)
+        self.assertAlmostEqual(delays[1], 20, delta=1)
+
+    def test_stale_running_jobs_are_released(self):
+        job = jobs.enqueue('match_item', self.item)
+        jobs.claim_jobs(1)
+        BackgroundJob.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(jobs.release_stale_jobs(), 1)
+        self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('done', 2))
+
+
+class CountingEmailBackend(EmailBackend):
+    """Local stand-in for the SMTP backend that counts opened connections."""
+
+    opened = 0
+    reject = set()
+    unreachable = False
+
+    def open(self):
+        if self.unreachable:
+            raise ConnectionRefusedError('mail server unreachable')
+        CountingEmailBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if set(message.to) & self.reject:
+                raise ConnectionError('recipient refused')
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='api.tests.CountingEmailBackend', MATCH_EMAIL_BATCH_SIZE=10, JOB_MAX_ATTEMPTS=2
+)
+class MatchNotificationTests(TestCase):
+    def setUp(self):
+        CountingEmailBackend.opened = 0
+        CountingEmailBackend.reject = set()
+        CountingEmailBackend.unreachable = False
+        self.users = [
+            CustomUser.objects.create_user(
+                email=f'user{i}@example.com', username=f'user{i}', name=f'User {i}',
+                student_id=f'S{i}', password='password123',
+            )
+            for i in range(3)
+        ]
+        self.found = [
+            Item.objects.create(user=self.users[1], title=f'Black wallet {i}', description='leather', status='found')
+            for i in range(2)
+        ]
+
+    def match(self, item, score=0.9):
+        return {'item_id': item.id, 'score': score, 'details': {'title_hint': 'Bl*** w*****'}}
+
+    def test_matches_for_one_user_become_one_digest(self):
+        lost = [
+            Item.objects.create(user=self.users[0], title=f'Wallet {i}', description='black', status='lost')
+            for i in range(2)
+        ]
+        for item in lost:
+            with CaptureQueriesContext(connection) as queries:
+                queue_match_notifications(item, [self.match(found) for found in self.found] + [self.match(item)])
+            # All matched items and their owners come from a single query.
+            self.assertEqual(sum('FROM "api_item"' in q['sql'] for q in queries.captured_queries), 1)
+        queue_match_notifications(lost[0], [self.match(self.found[0])])  # re-run of the same match
+        self.assertEqual(MatchNotification.objects.count(), 8)
+
+        self.assertEqual(send_match_digests(), 2)
+        self.assertEqual(CountingEmailBackend.opened, 1)
+        by_recipient = {message.to[0]: message for message in mail.outbox}
+        self.assertEqual(set(by_recipient), {'user0@example.com', 'user1@example.com'})
+        self.assertIn('2 of Your Items', by_recipient['user0@example.com'].subject)
+        self.assertEqual(by_recipient['user1@example.com'].body.count('Potential Match: Lost Item'), 4)
+        self.assertFalse(MatchNotification.objects.exclude(status='sent').exists())
+
+        self.assertEqual(send_match_digests(), 0)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_low_scores_and_own_items_are_not_announced(self):
+        lost = Item.objects.create(user=self.users[1], title='Wallet', description='black', status='lost')
+        queue_match_notifications(lost, [self.match(self.found[0]), self.match(self.found[1], score=0.4)])
+        self.assertEqual(list(MatchNotification.objects.values_list('recipient_id', flat=True)), [self.users[1].id])
+        self.assertTrue(BackgroundJob.objects.filter(kind='send_match_emails', status='pending').exists())
+
+    def test_refused_recipient_is_retried_without_blocking_others(self):
+        CountingEmailBackend.reject = {'user1@example.com'}
+        lost = Item.objects.create(user=self.users[0], title='Wallet', description='black', status='lost')
+        queue_match_notifications(lost, [self.match(self.found[0])])
+
+        self.assertEqual(send_match_digests(), 1)
+        self.assertEqual([message.to for message in mail.outbox], [['user0@example.com']])
+        refused = MatchNotification.objects.get(recipient=self.users[1])
+        self.assertEqual((refused.status, refused.attempts), ('pending', 1))
+
+        send_match_digests()
+        refused.refresh_from_db()
+        self.assertEqual(refused.status, 'failed')
+
+
+    def test_batch_is_claimed_at_once_and_stale_claims_are_released(self):
+        lost = [
+            Item.objects.create(user=self.users[i], title='Wallet', description='black', status='lost')
+            for i in (0, 2)
+        ]
+        for item in lost:
+            queue_match_notifications(item, [self.match(self.found[0])])
+        # user2's rows are mid-send in another run; user0's were left by a run that crashed.
+        MatchNotification.objects.filter(recipient=self.users[2]).update(status='sending', locked_at=timezone.now())
+        MatchNotification.objects.filter(recipient=self.users[0]).update(
+            status='sending', locked_at=timezone.now() - timedelta(hours=1)
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(send_match_digests(), 1)
+        claims = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE') and "'sending'" in q['sql']]
+        self.assertEqual(len(claims), 1)
+        self.assertEqual([message.to for message in mail.outbox], [['user1@example.com']])
+
+        BackgroundJob.objects.all().delete()
+        self.assertEqual(release_stale_notifications(), 1)
+        self.assertTrue(BackgroundJob.objects.filter(kind='send_match_emails', status='pending').exists())
+        self.assertEqual(send_match_digests(), 1)
+        self.assertEqual(mail.outbox[-1].to, ['user0@example.com'])
+        self.assertEqual(MatchNotification.objects.get(recipient=self.users[2]).status, 'sending')
+
+    def test_unreachable_mail_server_leaves_the_outbox_untouched(self):
+        lost = Item.objects.create(user=self.users[0], title='Wallet', description='black', status='lost')
+        queue_match_notifications(lost, [self.match(self.found[0])])
+        CountingEmailBackend.unreachable = True
+        with self.assertRaises(ConnectionRefusedError):
+            send_match_digests()
+        self.assertEqual(set(MatchNotification.objects.values_list('status', 'attempts')), {('pending', 0)})
+
+        CountingEmailBackend.unreachable = False
+        self.assertEqual(send_match_digests(), 2)
+
+    def test_stale_claims_count_as_attempts(self):
+        lost = Item.objects.create(user=self.users[0], title='Wallet', description='black', status='lost')
+        queue_match_notifications(lost, [self.match(self.found[0])])
+        for attempts in (1, 2):
+            MatchNotification.objects.update(status='sending', locked_at=timezone.now() - timedelta(hours=1))
+            self.assertEqual(release_stale_notifications(), 2)
+            self.assertEqual(set(MatchNotification.objects.values_list('attempts', flat=True)), {attempts})
+        # JOB_MAX_ATTEMPTS is 2: a run that keeps dying gives up instead of looping.
+        self.assertEqual(set(MatchNotification.objects.values_list('status', flat=True)), {'failed'})
+
+
+class ItemListingQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = CustomUser.objects.create_user(
+            email='owner@example.com', username='owner', name='Owner', student_id='S1', password='password123'
+        )
+        self.claimer = CustomUser.objects.create_user(
+            email='claimer@example.com', username='claimer', name='Claimer', student_id='S2', password='password123'
+        )
+        category = Category.objects.create(name='Wallets')
+        self.items = Item.objects.bulk_create([
+            Item(user=self.owner, title=f'Item {i}', status='found', category=category) for i in range(40)
+        ])
+        ClaimAttempt.objects.bulk_create([
+            ClaimAttempt(user=self.claimer, item=item, claim_note='older', status='rejected') for item in self.items[::2]
+        ])
+        ClaimAttempt.objects.bulk_create([
+            ClaimAttempt(user=self.claimer, item=item, claim_note='newest') for item in self.items[::2]
+        ])
+
+    def get(self, url, queries):
+        api_client = APIClient()
+        api_client.force_authenticate(self.owner)
+        with self.assertNumQueries(queries):
+            response = api_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_my_items_use_one_query(self):
+        data = self.get('/api/my-items/', 1)
+        self.assertEqual(len(data), 40)
+        claimed = {row['id']: row['claim_status'] for row in data}
+        self.assertEqual(claimed[self.items[0].id]['status'], 'pending')
+        self.assertEqual(claimed[self.items[0].id]['claim_note'], 'newest')
+        self.assertEqual(claimed[self.items[0].id]['claimer_username'], 'claimer')
+        self.assertIsNone(claimed[self.items[1].id])
+        self.assertEqual(data[0]['category_name'], 'Wallets')
+
+    def test_dashboard_and_message_items_do_not_query_per_item(self):
+        # Counters plus the two recent-item lists; afterwards the lists come from the cache.
+        data = self.get('/api/dashboard/', 3)
+        self.get('/api/dashboard/', 1)
+        claims = [row['claim_status'] for row in data['found_items'] if row['claim_status']]
+        self.assertTrue(claims)
+        self.assertTrue(all(claim['status'] == 'pending' and 'claim_note' not in claim for claim in claims))
+
+        ClaimAttempt.objects.filter(item=self.items[0]).update(status='approved')
+        api_client = APIClient()
+        api_client.force_authenticate(self.claimer)
+        with self.assertNumQueries(1):
+            response = api_client.get('/api/my-messages/items/')
+        self.assertEqual([row['id'] for row in response.json()], [self.items[0].id])
+
+
+@override_settings(API_PAGE_SIZE=3, API_MAX_PAGE_SIZE=5)
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(
+            email='owner@example.com', username='owner', name='Owner', student_id='S1', password='password123'
+        )
+        self.other = CustomUser.objects.create_user(
+            email='other@example.com', username='other', name='Other', student_id='S2', password='password123'
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.owner)
+        # Identical timestamps make sure ties are broken by id instead of skipping rows.
+        now = timezone.now()
+        self.items = Item.objects.bulk_create([Item(user=self.owner, title=f'Item {i}') for i in range(7)])
+        Item.objects.update(created_at=now)
+
+    def walk(self, url):
+        pages = []
+        while url:
+            response = self.api.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json())
+            url = response.headers.get('Link', '').partition('<')[2].partition('>')[0]
+        return pages
+
+    def test_pages_cover_every_row_once(self):
+        pages = self.walk('/api/my-items/')
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        ids = [row['id'] for page in pages for row in page]
+        self.assertEqual(ids, sorted((item.id for item in self.items), reverse=True))
+
+        response = self.api.get('/api/my-items/', {'page_size': 100})
+        self.assertEqual(len(response.json()), 5)
+        self.assertIn('X-Next-Cursor', response.headers)
+
+    def test_every_list_endpoint_pages_to_the_full_set(self):
+        # A client that reads only the first page would miss rows on each of these.
+        others = Item.objects.bulk_create([Item(user=self.other, title=f'Found {i}', status='found') for i in range(7)])
+        ClaimAttempt.objects.bulk_create([ClaimAttempt(item=item, user=self.owner) for item in others])
+        for i in range(7):
+            Message.objects.create(item=self.items[0], sender=self.other, receiver=self.owner, message=f'm{i}')
+        expected = {
+            '/api/my-items/': {item.id for item in self.items},
+            '/api/my-claims/': set(ClaimAttempt.objects.filter(user=self.owner).values_list('id', flat=True)),
+            '/api/my-messages/items/': {item.id for item in self.items},
+            '/api/notifications/?include_read=true': set(Message.objects.values_list('id', flat=True)),
+            f'/api/chat/?receiver_id={self.other.id}&item_id={self.items[0].id}': set(Message.objects.values_list('id', flat=True)),
+        }
+        for url, ids in expected.items():
+            with self.subTest(url=url):
+                pages = self.walk(url)
+                self.assertGreater(len(pages), 1)
+                rows = [row['id'] for page in pages for row in page]
+                self.assertEqual(len(rows), len(ids))
+                self.assertEqual(set(rows), ids)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.api.get('/api/my-items/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_notifications_mark_threads_read_as_they_are_delivered(self):
+        for i in range(2):
+            Message.objects.create(item=self.items[1], sender=self.other, receiver=self.owner, message=f'old{i}')
+        # A thread with more unread messages than fit on a page.
+        for i in range(7):
+            Message.objects.create(item=self.items[0], sender=self.other, receiver=self.owner, message=f'new{i}')
+        thread = ThreadParticipant.objects.get(user=self.owner, item=self.items[0], counterpart=self.other)
+
+        pages = [self.api.get('/api/notifications/')]
+        self.assertEqual([m['message'] for m in pages[0].json()], ['old0', 'old1', 'new0'])
+        thread.refresh_from_db()
+        self.assertEqual(thread.unread_count, 6)
+        while 'X-Next-Cursor' in pages[-1].headers:
+            pages.append(self.api.get('/api/notifications/', {'cursor': pages[-1].headers['X-Next-Cursor']}))
+        self.assertEqual(
+            [m['message'] for page in pages for m in page.json()],
+            ['old0', 'old1'] + [f'new{i}' for i in range(7)],
+        )
+
+        thread.refresh_from_db()
+        newest = Message.objects.filter(item=self.items[0]).latest('id')
+        self.assertEqual((thread.unread_count, thread.last_read_message_id), (0, newest.id))
+        self.assertFalse(Message.objects.with_read_state().filter(is_read=False).exists())
+        self.owner.refresh_from_db()
+        self.assertEqual(self.owner.unread_message_count, 0)
+
+    def test_chat_pages_go_back_in_time_in_reading_order(self):
+        Message.objects.bulk_create([
+            Message(item=self.items[0], sender=self.other, receiver=self.owner, message=f'm{i}') for i in range(5)
+        ])
+        url = f'/api/chat/?receiver_id={self.other.id}&item_id={self.items[0].id}'
+        pages = self.walk(url)
+        self.assertEqual([[m['message'] for m in page] for page in pages], [['m2', 'm3', 'm4'], ['m0', 'm1']])
+
+
+class QueryPlanTests(TestCase):
+    """
+    Runs the hot endpoints, EXPLAINs every SELECT they issue and fails if one
+    of them reads a table front to back. Plans are checked on whatever database
+    the suite runs against; run it with DEBUG=False and DATABASE_URL pointing
+    at a local Postgres to check the production planner as well.
+    """
+
+    # Fixed-size tables that are meant to be read whole.
+    BOUNDED_TABLES = {'api_dashboardcounter'}
+
+    def setUp(self):
+        cache.clear()
+        self.owner = CustomUser.objects.create_user(
+            email='owner@example.com', username='owner', name='Owner', student_id='S1', password='password123'
+        )
+        self.other = CustomUser.objects.create_user(
+            email='other@example.com', username='other', name='Other', student_id='S2', password='password123'
+        )
+        category = Category.objects.create(name='Keys')
+        self.item = Item.objects.create(user=self.owner, title='Keys', status='found', category=category)
+        lost = Item.objects.create(user=self.other, title='Keys', status='lost')
+        ClaimAttempt.objects.create(user=self.other, item=self.item, claim_note='red keyring')
+        ClaimAttempt.objects.create(user=self.owner, item=lost, claim_note='blue keyring', status='approved')
+        Message.objects.create(item=self.item, sender=self.other, receiver=self.owner, message='Mine?')
+        Message.objects.create(item=self.item, sender=self.owner, receiver=self.other, message='Describe it')
+
+    def endpoints(self):
+        return [
+            '/api/my-items/',
+            '/api/my-claims/',
+            '/api/dashboard/',
+            '/api/my-messages/items/',
+            '/api/conversations/',
+            '/api/items/search/?q=key&status=found',
+            f'/api/my-messages/recipients/{self.item.id}/?q=o',
+            '/api/notifications/summary/',
+            '/api/notifications/?include_read=true',
+            f'/api/chat/?receiver_id={self.other.id}&item_id={self.item.id}',
+            f'/api/chat/?receiver_id={self.other.id}&item_id={self.item.id}&since_id=0',
+        ]
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Tiny test tables are cheaper to scan; ask whether an index could be used at all.
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute(f'EXPLAIN {sql}')
+            else:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [str(row[-1]) for row in cursor.fetchall()]
+
+    def full_scans(self, plan):
+        pattern = r'Seq Scan on (\w+)' if connection.vendor == 'postgresql' else r'^SCAN (\w+)$'
+        scans = [match.group(1) for line in plan if (match := re.search(pattern, line.strip()))]
+        return [table for table in scans if table not in self.BOUNDED_TABLES]
+
+    def test_hot_endpoints_use_indexes(self):
+        api_client = APIClient()
+        # A real token rather than force_authenticate: the notification summary is a plain Django view.
+        api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.owner).access_token}')
+        for url in self.endpoints():
+            with self.subTest(url=url), CaptureQueriesContext(connection) as queries:
+                self.assertEqual(api_client.get(url).status_code, 200)
+                for query in queries.captured_queries:
+                    if query['sql'].lstrip().upper().startswith('SELECT'):
+                        plan = self.explain(query['sql'])
+                        self.assertEqual(self.full_scans(plan), [], f"{query['sql']}\n" + "\n".join(plan))
+
+    def test_search_index_catch_up_uses_indexes(self):
+        from chatbot.ann import registry
+
+        for status_ in ('lost', 'found'):
+            queryset = registry.open_items(status_).filter(id__gt=0).only('id', 'title').order_by('id')
+            with CaptureQueriesContext(connection) as queries:
+                list(queryset)
+            plan = self.explain(queries.captured_queries[0]['sql'])
+            self.assertEqual(self.full_scans(plan), [], "\n".join(plan))
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = CustomUser.objects.create_user(
+            email='owner@example.com', username='owner', name='Owner', student_id='S1', password='password123'
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.owner)
+
+    def dashboard(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            pass
+        return self.api.get('/api/dashboard/').json()
+
+    def assertCountersMatchTables(self):
+        expected = {key: count() for key, count in stats.COUNTERS.items()}
+        self.assertEqual(dict(DashboardCounter.objects.values_list('key', 'value')), expected)
+
+    def test_counters_follow_item_and_claim_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            lost = Item.objects.create(user=self.owner, title='Umbrella', status='lost')
+            found = Item.objects.create(user=self.owner, title='Keys', status='found')
+        data = self.dashboard()
+        self.assertEqual((data['total_lost_items'], data['total_found_items']), (1, 1))
+        self.assertEqual([row['title'] for row in data['found_items']], ['Keys'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            claim = ClaimAttempt.objects.create(user=self.owner, item=found, claim_note='red ring')
+            claim.status = 'approved'
+            claim.save()
+            found.is_claimed = True
+            found.status = 'claimed'
+            found.save()
+            lost.status = 'found'
+            lost.save()
+        data = self.dashboard()
+        self.assertEqual((data['total_lost_items'], data['total_found_items']), (0, 1))
+        self.assertEqual((data['total_ai_matches'], data['success_ratio']), (1, 100.0))
+        self.assertEqual([row['title'] for row in data['found_items']], ['Umbrella'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Item.objects.get(id=lost.id).delete()
+            Item.objects.get(id=found.id).delete()
+        self.assertEqual(self.dashboard()['lost_items'], [])
+        self.assertCountersMatchTables()
+
+    def test_dashboard_cost_does_not_depend_on_table_size(self):
+        Item.objects.bulk_create([Item(user=self.owner, title=f'Item {i}', status='lost') for i in range(30)])
+        stats.refresh_counters()
+        self.assertCountersMatchTables()
+        self.dashboard()
+        with self.assertNumQueries(1):
+            data = self.api.get('/api/dashboard/').json()
+        self.assertEqual(data['total_lost_items'], 30)
+        self.assertEqual(len(data['lost_items']), 5)
+
+
+@override_settings(PUSH_BROKER='memory', PUSH_HEARTBEAT_SECONDS=0.2)
+class EventStreamTests(TestCase):
+    def setUp(self):
+        events.get_broker.cache_clear()
+        self.addCleanup(events.get_broker.cache_clear)
+        self.owner = CustomUser.objects.create_user(
+            email='owner@example.com', username='owner', name='Owner', student_id='S1', password='password123'
+        )
+        self.finder = CustomUser.objects.create_user(
+            email='finder@example.com', username='finder', name='Finder', student_id='S2', password='password123'
+        )
+        self.item = Item.objects.create(user=self.owner, title='Keys', status='lost')
+        self.token = str(RefreshToken.for_user(self.owner).access_token)
+
+    async def open_stream(self, **params):
+        response = await AsyncClient().get('/api/events/', params)
+        return response, aiter(response.streaming_content)
+
+    async def next_frame(self, stream):
+        return (await asyncio.wait_for(anext(stream), 5)).decode()
+
+    def issue_ticket(self):
+        api_client = APIClient()
+        api_client.force_authenticate(self.owner)
+        response = api_client.post('/api/events/ticket/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['ticket']
+
+    def test_tickets_are_only_issued_to_signed_in_users(self):
+        self.assertEqual(APIClient().post('/api/events/ticket/').status_code, 401)
+        self.assertEqual(events.ticket_user_id(self.issue_ticket()), self.owner.id)
+
+    async def test_rejects_missing_or_invalid_credentials(self):
+        # The access token itself is not accepted in the URL, only a ticket.
+        for params in ({}, {'token': self.token}, {'ticket': 'garbage'}, {'ticket': f'{self.finder.id}:forged'}):
+            response = await AsyncClient().get('/api/events/', params)
+            self.assertEqual(response.status_code, 401)
+
+    async def test_rejects_expired_tickets(self):
+        ticket = await sync_to_async(self.issue_ticket)()
+        with override_settings(PUSH_TICKET_MAX_AGE=-1):
+            response = await AsyncClient().get('/api/events/', {'ticket': ticket})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_new_messages_and_unread_counts_are_pushed(self):
+        response, stream = await self.open_stream(ticket=await sync_to_async(self.issue_ticket)())
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertTrue((await self.next_frame(stream)).startswith('retry:'))
+        self.assertIn('"unread_messages": 0', await self.next_frame(stream))
+
+        def send_message():
+            with self.captureOnCommitCallbacks(execute=True):
+                Message.objects.create(item=self.item, sender=self.finder, receiver=self.owner, message='Are these yours?')
+        await sync_to_async(send_message)()
+
+        message = await self.next_frame(stream)
+        self.assertTrue(message.startswith('event: message\n'))
+        self.assertEqual(json.loads(message.split('data: ', 1)[1])['message'], 'Are these yours?')
+        self.assertEqual(await self.next_frame(stream), 'event: unread\ndata: {"unread_messages": 1, "version": 1}\n\n')
+
+        def read_thread():
+            api_client = APIClient()
+            api_client.force_authenticate(self.owner)
+            with self.captureOnCommitCallbacks(execute=True):
+                api_client.get('/api/chat/', {'receiver_id': self.finder.id, 'item_id': self.item.id})
+        await sync_to_async(read_thread)()
+        self.assertEqual(await self.next_frame(stream), 'event: unread\ndata: {"unread_messages": 0, "version": 2}\n\n')
+
+        # Idle streams get keep-alive comments. The server cancels the response
+        # when the client goes away, which must drop the subscription.
+        self.assertEqual(await self.next_frame(stream), ': keepalive\n\n')
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.05)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(events.get_broker().subscribers, {})
+
+
+@override_settings(PUSH_BROKER='memory', NOTIFICATION_LONG_POLL_SECONDS=5)
+class NotificationSummaryTests(TestCase):
+    def setUp(self):
+        events.get_broker.cache_clear()
+        self.addCleanup(events.get_broker.cache_clear)
+        self.owner = CustomUser.objects.create_user(
+            email='owner@example.com', username='owner', name='Owner', student_id='S1', password='password123'
+        )
+        self.finder = CustomUser.objects.create_user(
+            email='finder@example.com', username='finder', name='Finder', student_id='S2', password='password123'
+        )
+        self.item = Item.objects.create(user=self.owner, title='Keys', status='lost')
+        self.auth = {'Authorization': f'Bearer {RefreshToken.for_user(self.owner).access_token}'}
+
+    def send_message(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Message.objects.create(item=self.item, sender=self.finder, receiver=self.owner, message='Are these yours?')
+
+    async def summary(self, etag=None, **params):
+        headers = dict(self.auth, **{'If-None-Match': etag}) if etag else self.auth
+        return await AsyncClient().get('/api/notifications/summary/', params, headers=headers)
+
+    def test_unchanged_summary_is_not_modified_without_counting(self):
+        self.assertEqual(self.client.get('/api/notifications/summary/').status_code, 401)
+        response = self.client.get('/api/notifications/summary/', headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'unread_messages': 0})
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/notifications/summary/', headers=dict(self.auth, **{'If-None-Match': etag}))
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertTrue(queries.captured_queries)
+        self.assertFalse([q for q in queries.captured_queries if 'api_message' in q['sql']])
+
+        self.send_message()
+        response = self.client.get('/api/notifications/summary/', headers=dict(self.auth, **{'If-None-Match': etag}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'unread_messages': 1})
+        self.assertNotEqual(response['ETag'], etag)
+
+    async def test_reading_a_thread_changes_the_etag(self):
+        await sync_to_async(self.send_message)()
+        etag = (await self.summary())['ETag']
+
+        def read_thread():
+            api_client = APIClient()
+            api_client.force_authenticate(self.owner)
+            api_client.get('/api/chat/', {'receiver_id': self.finder.id, 'item_id': self.item.id})
+        await sync_to_async(read_thread)()
+        response = await self.summary(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'unread_messages': 0})
+
+    async def test_long_poll_returns_when_the_count_changes(self):
+        etag = (await self.summary())['ETag']
+        started = time.monotonic()
+        self.assertEqual((await self.summary(etag, wait=0.2)).status_code, 304)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+        # WhiteNoise is sync-only middleware, so a held request keeps the test's
+        # database thread busy; push the change the way a write would.
+        poll = asyncio.ensure_future(self.summary(etag, wait=5))
+        await asyncio.sleep(0.1)
+        self.assertFalse(poll.done())
+        events.publish(self.finder.id, 'unread', {'unread_messages': 7, 'version': 1})
+        events.publish(self.owner.id, 'unread', {'unread_messages': 1, 'version': 1})
+        response = await asyncio.wait_for(poll, 5)
+        # Answered from the push itself; the table has no unread messages.
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'unread_messages': 1})
+        self.assertEqual(response['ETag'], f'"{self.owner.id}-1"')
+        self.assertEqual(events.get_broker().subscribers, {})
+
+
+class ChatSyncTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = CustomUser.objects.create_user(
+            email='owner@example.com', username='owner', name='Owner', student_id='S1', password='password123'
+        )
+        self.finder = CustomUser.objects.create_user(
+            email='finder@example.com', username='finder', name='Finder', student_id='S2', password='password123'
+        )
+        self.item = Item.objects.create(user=self.owner, title='Keys', status='lost')
+        self.api = APIClient()
+        self.api.force_authenticate(self.owner)
+        self.first = Message.objects.create(item=self.item, sender=self.finder, receiver=self.owner, message='Hi')
+
+    def sync(self, since_id=None, **params):
+        params = {'receiver_id': self.finder.id, 'item_id': self.item.id, **params}
+        if since_id is not None:
+            params['since_id'] = since_id
+        return self.api.get('/api/chat/', params)
+
+    def test_idle_poll_is_a_single_query(self):
+        self.sync()
+        with self.assertNumQueries(1):
+            response = self.sync(since_id=self.first.id)
+        self.assertEqual(response.json(), [])
+
+    def test_delta_contains_only_new_messages_and_marks_them_read(self):
+        self.sync()
+        reply = Message.objects.create(item=self.item, sender=self.owner, receiver=self.finder, message='Which keys?')
+        answer = Message.objects.create(item=self.item, sender=self.finder, receiver=self.owner, message='Red ring')
+        Message.objects.create(item=self.item, sender=self.owner, receiver=self.owner, message='elsewhere')
+
+        response = self.sync(since_id=self.first.id)
+        self.assertEqual([m['id'] for m in response.json()], [reply.id, answer.id])
+        self.assertEqual([m['is_read'] for m in response.json()], [False, True])
+        self.assertFalse(
+            Message.objects.with_read_state().filter(receiver=self.owner, item=self.item, sender=self.finder, is_read=False).exists()
+        )
+
+    @override_settings(API_MAX_PAGE_SIZE=2)
+    def test_capped_delta_only_marks_returned_messages_read(self):
+        self.sync()
+        later = [
+            Message.objects.create(item=self.item, sender=self.finder, receiver=self.owner, message=f'Message {n}')
+            for n in range(3)
+        ]
+        response = self.sync(since_id=self.first.id)
+        self.assertEqual([m['id'] for m in response.json()], [later[0].id, later[1].id])
+        self.assertEqual([m['is_read'] for m in response.json()], [True, True])
+        thread = ThreadParticipant.objects.get(user=self.owner, item=self.item, counterpart=self.finder)
+        self.assertEqual((thread.last_read_message_id, thread.unread_count), (later[1].id, 1))
+        self.owner.refresh_from_db()
+        self.assertEqual(self.owner.unread_message_count, 1)
+
+        response = self.sync(since_id=later[1].id)
+        self.assertEqual([m['id'] for m in response.json()], [later[2].id])
+        thread.refresh_from_db()
+        self.assertEqual((thread.last_read_message_id, thread.unread_count), (later[2].id, 0))
+        self.owner.refresh_from_db()
+        self.assertEqual(self.owner.unread_message_count, 0)
+
+    def test_validation_errors(self):
+        self.assertEqual(self.sync(since_id='abc').status_code, 400)
+        self.assertEqual(self.sync(item_id=999).status_code, 404)
+        self.assertEqual(self.sync(receiver_id=999).status_code, 404)
+        self.assertEqual(self.sync(receiver_id=self.owner.id).status_code, 400)
+
+
+class ThreadReadStateTests(TestCase):
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(
+            email='owner@example.com', username='owner', name='Owner', student_id='S1', password='password123'
+        )
+        self.finder = CustomUser.objects.create_user(
+            email='finder@example.com', username='finder', name='Finder', student_id='S2', password='password123'
+        )
+        self.keys = Item.objects.create(user=self.owner, title='Keys', status='lost')
+        self.wallet = Item.objects.create(user=self.owner, title='Wallet', status='lost')
+        self.api = APIClient()
+        self.api.force_authenticate(self.owner)
+
+    def unread(self, item=None):
+        if item is None:
+            return CustomUser.objects.get(id=self.owner.id).unread_message_count
+        return ThreadParticipant.objects.get(user=self.owner, item=item, counterpart=self.finder).unread_count
+
+    def test_reading_a_thread_is_a_single_row_write(self):
+        for text in ('Are these yours?', 'Red ring'):
+            Message.objects.create(item=self.keys, sender=self.finder, receiver=self.owner, message=text)
+        Message.objects.create(item=self.wallet, sender=self.finder, receiver=self.owner, message='Brown wallet?')
+        self.assertEqual((self.unread(), self.unread(self.keys), self.unread(self.wallet)), (3, 2, 1))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get('/api/chat/', {'receiver_id': self.finder.id, 'item_id': self.keys.id})
+        self.assertEqual([m['is_read'] for m in response.json()], [True, True])
+        writes = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual([sql.split('"')[1] for sql in writes], ['api_threadparticipant', 'api_customuser'])
+        self.assertEqual((self.unread(), self.unread(self.keys), self.unread(self.wallet)), (1, 0, 1))
+
+        # Replies do not count against the sender, and new messages reopen the thread.
+        Message.objects.create(item=self.keys, sender=self.owner, receiver=self.finder, message='Yes!')
+        Message.objects.create(item=self.keys, sender=self.finder, receiver=self.owner, message='Come by')
+        self.assertEqual((self.unread(), self.unread(self.keys)), (2, 1))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                '/api/notifications/summary/',
+                headers={'Authorization': f'Bearer {RefreshToken.for_user(self.owner).access_token}'},
+            )
+        self.assertEqual(response.json(), {'unread_messages': 2})
+        self.assertFalse([q for q in queries.captured_queries if 'api_message' in q['sql']])
+
+    def test_refresh_fixes_drift_and_deleted_threads_leave_the_total(self):
+        Message.objects.bulk_create([
+            Message(item=self.keys, sender=self.finder, receiver=self.owner, message=f'm{i}') for i in range(3)
+        ])
+        self.assertEqual(self.unread(), 0)
+        threads.refresh_unread_counts()
+        self.assertEqual((self.unread(), self.unread(self.keys)), (3, 3))
+
+        Message.objects.create(item=self.wallet, sender=self.finder, receiver=self.owner, message='Brown wallet?')
+        self.keys.delete()
+        self.assertEqual(self.unread(), 1)
+
+
+class ConversationInboxTests(TestCase):
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(
+            email='owner@example.com', username='owner', name='Owner', student_id='S1', password='password123'
+        )
+        self.finder = CustomUser.objects.create_user(
+            email='finder@example.com', username='finder', name='Finder', student_id='S2', password='password123'
+        )
+        self.helper = CustomUser.objects.create_user(
+            email='helper@example.com', username='helper', name='Helper', student_id='S3', password='password123'
+        )
+        self.keys = Item.objects.create(user=self.owner, title='Keys', status='lost')
+        self.api = APIClient()
+        self.api.force_authenticate(self.owner)
+
+    def send(self, sender, receiver, text):
+        self.api.force_authenticate(sender)
+        response = self.api.post('/api/messages/', {'item': self.keys.id, 'receiver': receiver.id, 'message': text})
+        self.assertEqual(response.status_code, 201)
+        self.api.force_authenticate(self.owner)
+
+    def test_inbox_lists_latest_message_and_unread_count_per_thread(self):
+        self.send(self.finder, self.owner, 'Are these your keys?')
+        self.send(self.helper, self.owner, 'I saw keys at the library')
+        self.send(self.owner, self.finder, 'Yes!   They have a\nred ring')
+
+        with self.assertNumQueries(1):
+            response = self.api.get('/api/conversations/')
+        rows = response.json()
+        self.assertEqual([row['counterpart_username'] for row in rows], ['finder', 'helper'])
+        self.assertEqual(rows[0]['last_message'], 'Yes! They have a red ring')
+        self.assertEqual((rows[0]['last_sender'], rows[0]['unread_count']), (self.owner.id, 1))
+        self.assertEqual((rows[1]['last_message'], rows[1]['unread_count']), ('I saw keys at the library', 1))
+        self.assertEqual(rows[0]['item_title'], 'Keys')
+
+        self.api.force_authenticate(self.finder)
+        rows = self.api.get('/api/conversations/').json()
+        self.assertEqual([(row['counterpart_username'], row['unread_count']) for row in rows], [('owner', 1)])
+        self.assertEqual(rows[0]['conversation'], Conversation.objects.get(first_user=self.owner, second_user=self.finder).id)
+
+        self.api.force_authenticate(self.owner)
+        first = self.api.get('/api/conversations/', {'page_size': 1})
+        second = self.api.get('/api/conversations/', {'page_size': 1, 'cursor': first.headers['X-Next-Cursor']})
+        self.assertEqual([row['counterpart_username'] for row in first.json() + second.json()], ['finder', 'helper'])
+        self.assertNotIn('X-Next-Cursor', second.headers)
+
+    def test_recipients_are_the_item_participants(self):
+        stranger = CustomUser.objects.create_user(
+            email='stranger@example.com', username='stranger', name='Stranger', student_id='S4', password='password123'
+        )
+        ClaimAttempt.objects.create(user=self.helper, item=self.keys, claim_note='mine')
+        self.send(self.finder, self.owner, 'Are these your keys?')
+        url = f'/api/my-messages/recipients/{self.keys.id}/'
+
+        response = self.api.get(url)
+        self.assertEqual(response.json(), [
+            {'id': self.finder.id, 'username': 'finder', 'name': 'Finder'},
+            {'id': self.helper.id, 'username': 'helper', 'name': 'Helper'},
+        ])
+        self.assertEqual([row['username'] for row in self.api.get(url, {'q': 'HEL'}).json()], ['helper'])
+        self.assertIn('X-Next-Cursor', self.api.get(url, {'page_size': 1}).headers)
+
+        # Other people see the owner and their own correspondents, not the claimants.
+        self.api.force_authenticate(stranger)
+        self.assertEqual([row['username'] for row in self.api.get(url).json()], ['owner'])
+        self.api.force_authenticate(self.finder)
+        self.assertEqual([row['username'] for row in self.api.get(url).json()], ['owner'])
+        self.assertEqual(self.api.get('/api/my-messages/recipients/999/').status_code, 400)
+
+    def test_refresh_rebuilds_conversations_after_bulk_writes(self):
+        Message.objects.bulk_create([
+            Message(item=self.keys, sender=self.finder, receiver=self.owner, message=f'm{i}') for i in range(3)
+        ])
+        self.assertEqual(self.api.get('/api/conversations/').json(), [])
+        threads.refresh_unread_counts()
+        rows = self.api.get('/api/conversations/').json()
+        self.assertEqual([(row['last_message'], row['unread_count']) for row in rows], [('m2', 3)])
+
+
+class ItemSearchTests(TestCase):
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(
+            email='owner@example.com', username='owner', name='Owner', student_id='S1', password='password123'
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.owner)
+        self.keys = Item.objects.create(
+            user=self.owner, title='Car keys', description='Red ring', location='Library', status='lost',
+            private_note='Toyota fob',
+        )
+        self.pouch = Item.objects.create(
+            user=self.owner, title='Pouch', description='Small pouch with house keys', location='Gym', status='found',
+        )
+        self.wallet = Item.objects.create(user=self.owner, title='Leather wallet', location='Library', status='found')
+
+    def search(self, **params):
+        return [row['title'] for row in self.api.get('/api/items/search/', params).json()]
+
+    def test_ranked_prefix_search_with_filters(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api.get('/api/items/search/', {'q': 'keys'})
+        self.assertEqual(len(queries), 1)
+        if connection.vendor == 'sqlite':
+            # Matching and ranking share one MATCH; a per-row bm25() subquery is quadratic.
+            self.assertEqual(queries[0]['sql'].count('MATCH'), 1)
+        self.assertEqual([row['title'] for row in response.json()], ['Car keys', 'Pouch'])
+        self.assertNotIn('private_note', response.json()[0])
+
+        self.assertEqual(self.search(q='wall'), ['Leather wallet'])
+        self.assertEqual(self.search(q='lib'), ['Leather wallet', 'Car keys'])
+        self.assertEqual(self.search(q='keys library'), ['Car keys'])
+        self.assertEqual(self.search(q='keys', status='found'), ['Pouch'])
+        self.assertEqual(self.search(q='keys', page_size=1), ['Car keys'])
+        self.assertEqual(self.search(q='"*(); --'), [])
+        self.assertEqual(self.search(), [])
+
+    def test_other_users_items_are_masked(self):
+        other = CustomUser.objects.create_user(
+            email='other@example.com', username='other', name='Other', student_id='S2', password='password123'
+        )
+        found = Item.objects.create(
+            user=other, title='Blue backpack', description='Laptop inside, sticker of a fox', location='Room 204 shelf',
+            status='found',
+        )
+        ClaimAttempt.objects.create(item=found, user=self.owner, claim_note='It has my laptop')
+        detail = self.api.get(f'/api/view-item/{found.id}/').json()
+
+        rows = self.api.get('/api/items/search/', {'q': 'fox'}).json()
+        self.assertEqual(rows, [detail])
+        self.assertEqual(rows[0]['title'], 'Blue ***')
+        self.assertEqual(rows[0]['location'], 'Room ***')
+        self.assertNotIn('fox', rows[0]['description'])
+        self.assertNotIn('claim_status', rows[0])
+        # The caller's own items keep their full details.
+        self.assertEqual(self.api.get('/api/items/search/', {'q': 'red'}).json()[0]['description'], 'Red ring')
+
+    def test_index_follows_item_writes(self):
+        self.wallet.title = 'Brown purse'
+        self.wallet.save()
+        Item.objects.filter(id=self.pouch.id).update(description='Empty pouch')
+        self.keys.delete()
+        Item.objects.bulk_create([Item(user=self.owner, title='Spare keys', status='lost')])
+
+        self.assertEqual(self.search(q='wallet'), [])
+        self.assertEqual(self.search(q='purse'), ['Brown purse'])
+        self.assertEqual(self.search(q='keys'), ['Spare keys'])
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name, MEDIA_URL='/media/')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.owner = CustomUser.objects.create_user(
+            email='owner@example.com', username='owner', name='Owner', student_id='S1', password='password123'
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.owner)
+
+    def photo(self, name='photo.jpg'):
+        # A landscape sensor image tagged "rotate 90° clockwise", as phones write them.
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        buffer = io.BytesIO()
+        photo = Image.new('RGB', (3000, 1000), 'red')
+        photo.paste((0, 0, 255), (0, 0, 1000, 600))
+        photo.save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+    def test_upload_queues_derivatives(self):
+        response = self.api.post('/api/items/', {
+            'title': 'Umbrella', 'location': 'Library', 'status': 'found', 'image': self.photo(),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertIsNone(response.json()['image_variants'])
+        self.assertTrue(BackgroundJob.objects.filter(kind='image_derivatives', item_id=response.json()['id']).exists())
+
+    def test_variants_are_resized_upright_and_stripped(self):
+        item = Item.objects.create(user=self.owner, title='Umbrella', status='found', image=self.photo())
+        images.generate_derivatives(item.id)
+        item.refresh_from_db()
+
+        # The pinned Pillow ships with AVIF support.
+        self.assertEqual(set(images.available_formats()), {'webp', 'avif'})
+        self.assertEqual(item.image_variants['source'], item.image.name)
+        for size, longest_side in images.VARIANT_SIZES.items():
+            variant = item.image_variants[size]
+            self.assertEqual(variant['height'], longest_side)
+            self.assertLess(variant['width'], variant['height'])
+            for ext, (image_format, _options) in images.available_formats().items():
+                with item.image.storage.open(variant[ext]) as file, Image.open(file) as copy:
+                    self.assertEqual(copy.format, image_format)
+                    self.assertEqual(copy.size, (variant['width'], variant['height']))
+                    self.assertNotIn(0x0112, copy.getexif())
+
+        data = self.api.get(f'/api/items/{item.id}/').json()
+        self.assertTrue(data['image_variants']['thumb']['webp'].startswith('http://testserver/media/items/derived/'))
+        self.assertTrue(data['image'].endswith(item.image.name))
+
+    def test_photo_hash_survives_reencoding(self):
+        gradient = Image.linear_gradient('L').resize((800, 600)).convert('RGB')
+        gradient.paste((0, 0, 255), (100, 100, 300, 250))
+        hashes = []
+        for size, quality in (((800, 600), 95), ((400, 300), 40)):
+            buffer = io.BytesIO()
+            gradient.resize(size).save(buffer, 'JPEG', quality=quality)
+            buffer.seek(0)
+            hashes.append(images.photo_hash(buffer))
+        self.assertLessEqual(hamming(*hashes), 4)
+        self.assertIsNone(images.photo_hash(io.BytesIO(b'not an image')))
+        self.assertIsNone(images.difference_hash(Image.new('RGB', (50, 50), 'white')))
+
+        response = self.api.post('/api/items/', {
+            'title': 'Umbrella', 'location': 'Library', 'status': 'found', 'image': self.photo(),
+        }, format='multipart')
+        item = Item.objects.get(id=response.json()['id'])
+        self.assertIsNotNone(item.image_hash)
+        with item.image.open('rb') as file:
+            self.assertEqual(images.photo_hash(file), item.image_hash)
+
+    def test_backfill_queues_photos_without_current_variants(self):
+        done = Item.objects.create(user=self.owner, title='Umbrella', status='found', image=self.photo())
+        images.generate_derivatives(done.id)
+        old = Item.objects.create(user=self.owner, title='Scarf', status='found', image=self.photo('scarf.jpg'))
+        stale = Item.objects.create(
+            user=self.owner, title='Gloves', status='lost', image=self.photo('gloves.jpg'),
+            image_variants={'source': 'items/replaced.jpg'},
+        )
+        Item.objects.create(user=self.owner, title='Keys', status='lost')
+
+        out = io.StringIO()
+        call_command('backfill_image_variants', stdout=out)
+        self.assertIn('Queued image variants for 2 item photos', out.getvalue())
+        queued = BackgroundJob.objects.filter(kind='image_derivatives', status='pending')
+        self.assertEqual(set(queued.values_list('item_id', flat=True)), {old.id, stale.id})
+
+        # Running it again before the worker caught up merges into the pending jobs.
+        call_command('backfill_image_variants', stdout=io.StringIO())
+        self.assertEqual(queued.count(), 2)
+
+        jobs.run_pending()
+        old.refresh_from_db()
+        self.assertEqual(old.image_variants['source'], old.image.name)
+
+    def test_replaced_photo_hides_stale_variants(self):
+        item = Item.objects.create(user=self.owner, title='Umbrella', status='found', image=self.photo())
+        images.generate_derivatives(item.id)
+        item.refresh_from_db()
+        old_paths = images.variant_paths(item.image_variants)
+
+        response = self.api.patch(f'/api/items/{item.id}/', {'image': self.photo('second.jpg')}, format='multipart')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertIsNone(response.json()['image_variants'])
+        self.assertTrue(BackgroundJob.objects.filter(kind='image_derivatives', item=item, status='pending').exists())
+
+        images.generate_derivatives(item.id)
+        item.refresh_from_db()
+        self.assertIn('second', item.image_variants['large']['webp'])
+        self.assertFalse(any(item.image.storage.exists(path) for path in old_paths))
@@ -0,0 +1,121 @@
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from api import events
+from api.models import Conversation, CustomUser, Message, ThreadParticipant
+
+logger = logging.getLogger(__name__)
+
+# Characters of the latest message shown in the inbox.
+SNIPPET_LENGTH = 140
+
+
+def unread_changed(user_id, delta=0):
+    """
+    Moves the user's unread total by ``delta`` and bumps their notification
+    version in the caller's transaction; the new total is pushed on commit.
+    """
+    CustomUser.objects.filter(id=user_id).update(
+        unread_message_count=F('unread_message_count') + delta,
+        notification_version=F('notification_version') + 1,
+    )
+    events.push_unread_count(user_id)
+
+def message_created(message):
+    """
+    Records a new message on its conversation and on both sides of the thread;
+    the receiver's side gets one more unread message.
+    """
+    first_user_id, second_user_id = sorted((message.sender_id, message.receiver_id))
+    conversation, _ = Conversation.objects.update_or_create(
+        item_id=message.item_id, first_user_id=first_user_id, second_user_id=second_user_id,
+        defaults={
+            'last_message': message,
+            'last_sender_id': message.sender_id,
+            'last_message_snippet': snippet(message.message),
+            'last_message_at': message.timestamp,
+        },
+    )
+    sides = {(message.receiver_id, message.sender_id): 1}
+    sides.setdefault((message.sender_id, message.receiver_id), 0)
+    for (user_id, counterpart_id), unread in sides.items():
+        thread = ThreadParticipant.objects.filter(user_id=user_id, item_id=message.item_id, counterpart_id=counterpart_id)
+        changes = {'conversation': conversation, 'last_message_at': message.timestamp}
+        if thread.update(unread_count=F('unread_count') + unread, **changes):
+            continue
+        try:
+            with transaction.atomic():
+                ThreadParticipant.objects.create(
+                    user_id=user_id, item_id=message.item_id, counterpart_id=counterpart_id,
+                    unread_count=unread, **changes,
+                )
+        except IntegrityError:
+            # Created by a concurrent message to the same thread.
+            thread.update(unread_count=F('unread_count') + unread, **changes)
+    unread_changed(message.receiver_id, 1)
+
+def snippet(text):
+    text = ' '.join(text.split())
+    return text if len(text) <= SNIPPET_LENGTH else text[:SNIPPET_LENGTH - 1] + '…'
+
+def mark_read(user_id, item_id, counterpart_id, up_to_id, unread_count, still_unread=0):
+    """
+    Moves the user's read cursor for a thread to ``up_to_id``, a single-row
+    write; ``still_unread`` is the number of unread messages past it. Only
+    applies while the thread still has the ``unread_count`` unread messages
+    the caller saw, so a message arriving meanwhile stays unread. Returns
+    whether the cursor moved.
+    """
+    marked = ThreadParticipant.objects.filter(
+        user_id=user_id, item_id=item_id, counterpart_id=counterpart_id,
+        unread_count=unread_count, last_read_message_id__lt=up_to_id,
+    ).update(unread_count=still_unread, last_read_message_id=up_to_id)
+    if marked and unread_count != still_unread:
+        unread_changed(user_id, still_unread - unread_count)
+    return bool(marked)
+
+def refresh_unread_counts():
+    """
+    Rebuilds every conversation from its latest message and recounts each
+    thread and unread total from the messages past the read cursors; fixes
+    drift from bulk writes that bypass the model signals.
+    """
+    with transaction.atomic():
+        latest_ids = (
+            Message.objects.annotate(first_user=Least('sender', 'receiver'), second_user=Greatest('sender', 'receiver'))
+            .values('item', 'first_user', 'second_user').annotate(latest_id=Max('id')).values_list('latest_id', flat=True)
+        )
+        for message in Message.objects.filter(id__in=list(latest_ids)).iterator():
+            first_user_id, second_user_id = sorted((message.sender_id, message.receiver_id))
+            conversation, _ = Conversation.objects.update_or_create(
+                item_id=message.item_id, first_user_id=first_user_id, second_user_id=second_user_id,
+                defaults={
+                    'last_message': message,
+                    'last_sender_id': message.sender_id,
+                    'last_message_at': message.timestamp,
+                    'last_message_snippet': snippet(message.message),
+                },
+            )
+            for user_id, counterpart_id in {(message.sender_id, message.receiver_id), (message.receiver_id, message.sender_id)}:
+                ThreadParticipant.objects.update_or_create(
+                    user_id=user_id, item_id=message.item_id, counterpart_id=counterpart_id,
+                    defaults={'conversation': conversation, 'last_message_at': message.timestamp},
+                )
+        unread = Message.objects.filter(
+            receiver=OuterRef('user'), item=OuterRef('item'), sender=OuterRef('counterpart'),
+            id__gt=OuterRef('last_read_message_id'),
+        ).order_by().values('receiver').annotate(count=Count('id')).values('count')
+        ThreadParticipant.objects.update(unread_count=Coalesce(Subquery(unread), Value(0)))
+        totals = (
+            ThreadParticipant.objects.filter(user=OuterRef('pk')).order_by()
+            .values('user').annotate(total=Sum('unread_count')).values('total')
+        )
+        updated = CustomUser.objects.update(
+            unread_message_count=Coalesce(Subquery(totals), Value(0)),
+            notification_version=F('notification_version') + 1,
+        )
+    logger.info(f"Conversations and unread counts refreshed for {updated} users")
+    return updated
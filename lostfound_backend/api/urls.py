@@ -7,7 +7,8 @@ from .views import (
     MyItemsView,ClaimItemView, MyClaimsView, MyMessageItemsView,
     MessageRecipientsView, SendMessageView, ChatThreadView, DashboardView,
     AIMatchesView, UserProfileView, MaskedItemDetailView, NotificationSummaryView,
-    UnreadNotificationsView, ClaimApprovalView, ItemStatusUpdateView  # Added
+    UnreadNotificationsView, ClaimApprovalView, ItemStatusUpdateView,  # Added
+    EventStreamView, EventStreamTicketView, ConversationListView, ItemSearchView
 )
 
 def api_root(request):
@@ -25,6 +26,7 @@ def api_root(request):
             'items': {
                 'list_create': '/api/items/',
                 'detail': '/api/items/<id>/',
+                'search': '/api/items/search/?q=<terms>',
                 'my_items': '/api/my-items/',
                 'update_status': '/api/items/<id>/update-status/',  # Added
             },
@@ -38,6 +40,7 @@ def api_root(request):
                 'send': '/api/messages/',
                 'chat': '/api/chat/',
                 'my_message_items': '/api/my-messages/items/',
+                'inbox': '/api/conversations/',
                 'recipients': '/api/my-messages/recipients/<item_id>/',
             },
             'dashboard': '/api/dashboard/',
@@ -46,6 +49,8 @@ def api_root(request):
             'notifications': {
                 'summary': '/api/notifications/summary/',
                 'unread': '/api/notifications/',
+                'stream': '/api/events/?ticket=<ticket>',
+                'stream_ticket': '/api/events/ticket/',
             }
         }
     })
@@ -56,6 +61,7 @@ urlpatterns = [
     path('login/', LoginView.as_view(), name='login'),
     path('categories/', CategoryListView.as_view(), name='category-list'),
     path('items/', ItemListCreateView.as_view(), name='item-list-create'),
+    path('items/search/', ItemSearchView.as_view(), name='item-search'),
     path('items/<int:pk>/', ItemDetailView.as_view(), name='item-detail'),
     path('items/<int:pk>/update-status/', ItemStatusUpdateView.as_view(), name='item-status-update'),  # Added
     path('my-items/', MyItemsView.as_view(), name='my-items'),
@@ -64,6 +70,7 @@ urlpatterns = [
     path('my-claims/', MyClaimsView.as_view(), name='my-claims'),
     path('my-messages/items/', MyMessageItemsView.as_view(), name='my-message-items'),
     path('my-messages/recipients/<int:item_id>/', MessageRecipientsView.as_view(), name='message-recipients'),
+    path('conversations/', ConversationListView.as_view(), name='conversation-list'),
     path('messages/', SendMessageView.as_view(), name='send-message'),
     path('notifications/summary/', NotificationSummaryView.as_view(), name='notification-summary'),
     path('chat/', ChatThreadView.as_view(), name='chat-thread'),
@@ -72,6 +79,8 @@ urlpatterns = [
     path('notifications/', UnreadNotificationsView.as_view(), name='unread-notifications'),
     path('ai-matches/', AIMatchesView.as_view(), name='ai-matches'),
     path('profile/', UserProfileView.as_view(), name='user-profile'),
+    path('events/', EventStreamView.as_view(), name='event-stream'),
+    path('events/ticket/', EventStreamTicketView.as_view(), name='event-stream-ticket'),
     
 ]
 
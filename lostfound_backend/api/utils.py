@@ -1,8 +1,10 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from difflib import SequenceMatcher
 
 def cosine_text_similarity(a, b):
+    # scikit-learn is slow to import, so it is only loaded when a claim is verified.
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+
     vectorizer = TfidfVectorizer().fit([a, b])
     vectors = vectorizer.transform([a, b])
     return cosine_similarity(vectors[0], vectors[1])[0][0]
@@ -1,24 +1,35 @@
+import json
 import logging
-from django.contrib.auth import authenticate
-from django.core.mail import send_mail
-from threading import Thread
+import time
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.db.models import Q
+from django.contrib.auth import authenticate
+from django.http import HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.views import View
+from django.db.models import Exists, Q, Subquery
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.serializers import ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
-from fuzzywuzzy import fuzz
-from api.models import Item, Category, Message, CustomUser, ClaimAttempt
+from api.models import Item, Category, Message, CustomUser, ClaimAttempt, ThreadParticipant
 from api.serializers import (
     ItemSerializer, CategorySerializer, ClaimAttemptSerializer,
-    MessageSerializer, RegisterSerializer, UserProfileSerializer
+    MessageSerializer, RegisterSerializer, UserProfileSerializer, ConversationSerializer, RecipientSerializer,
+    ItemSearchSerializer, masked_item
 )
 from api.filters import ItemFilter
-from chatbot.matching import mask_text, match_items  # Updated import
+from api import events, images, search, stats, threads
+from api.pagination import ConversationKeysetPagination, IdKeysetPagination, KeysetPagination, TimestampKeysetPagination
+from api.jobs import enqueue
+from api.notifications import queue_match_notifications
+from chatbot.ann import registry as ann_registry
+from chatbot.embeddings import query_cache
+from chatbot.matching import match_items  # Updated import
 
 logger = logging.getLogger(__name__)
 
@@ -81,110 +92,18 @@ class CategoryListView(generics.ListAPIView):
 
 def run_matching_in_background(item_id):
     try:
-        item = Item.objects.get(id=item_id)
+        item = Item.objects.select_related('user').get(id=item_id)
         logger.info(f"Background task: Started for item ID {item.id} (Status: {item.status})")
         
         matches = match_items(item)
         logger.debug(f"Matches found for item {item.id}: {matches}")
+        ann_registry.sync_item(item)
         
         if matches:
-            high_confidence_matches = [m for m in matches if m['score'] >= 0.60]
-            if high_confidence_matches:
-                site_url = getattr(settings, 'SITE_URL', 'http://127.0.0.1:8000')
-                
-                # Email for the owner of the current item
-                if item.status == 'lost' and item.user.email:
-                    matches_summary = "\n".join(
-                        [f"- Potential Match: Found Item (Hint: '{m['details']['title_hint']}'), Confidence: {m['score']*100:.0f}%" for m in high_confidence_matches]
-                    )
-                    try:
-                        send_mail(
-                            subject="📩 Potential Match Found for Your Lost Item",
-                            message=(
-                                f"Dear {getattr(item.user, 'name', item.user.username)},\n\n"
-                                f"Thank you for using Refind. We are pleased to inform you that our advanced matching algorithm has identified potential matches for your lost item: '{item.title}'.\n\n"
-                                f"Match Details:\n{matches_summary}\n\n"
-                                f"Please log in to your Refind dashboard to review these matches and initiate a chat with the finders to verify ownership.\n\n"
-                                f"Access your dashboard: {site_url}/dashboard\n\n"
-                                f"Best regards,\nThe Refind Team\nsupport@refind.com | {site_url}"
-                            ),
-                            from_email=settings.DEFAULT_FROM_EMAIL,
-                            recipient_list=[item.user.email],
-                            fail_silently=False,
-                        )
-                        logger.info(f"Match notification email sent to {item.user.email} for lost item {item.id}")
-                    except Exception as e:
-                        logger.error(f"Failed to send email to {item.user.email} for lost item {item.id}: {str(e)}")
-                elif item.status == 'found' and item.user.email:
-                    matches_summary = "\n".join(
-                        [f"- Potential Match: Lost Item (Hint: '{m['details']['title_hint']}'), Confidence: {m['score']*100:.0f}%" for m in high_confidence_matches if m.get('item_id') != item_id]
-                    )
-                    if matches_summary:
-                        try:
-                            send_mail(
-                                subject="📩 Potential Match Found for Your Found Item",
-                                message=(
-                                    f"Dear {getattr(item.user, 'name', item.user.username)},\n\n"
-                                    f"Thank you for contributing to Refind. Our sophisticated matching system has detected potential matches for the item you reported as found: '{item.title}'.\n\n"
-                                    f"Match Details:\n{matches_summary}\n\n"
-                                    f"We kindly request you to log in to your Refind dashboard to review these matches and engage in a chat with the owner.\n\n"
-                                    f"Access your dashboard: {site_url}/dashboard\n\n"
-                                    f"Best regards,\nThe Refind Team\nsupport@refind.com | {site_url}"
-                                ),
-                                from_email=settings.DEFAULT_FROM_EMAIL,
-                                recipient_list=[item.user.email],
-                                fail_silently=False,
-                            )
-                            logger.info(f"Match notification email sent to {item.user.email} for found item {item.id}")
-                        except Exception as e:
-                            logger.error(f"Failed to send email to {item.user.email} for found item {item.id}: {str(e)}")
-
-                # Email for owners of matching items (both lost and found), excluding self
-                for match in high_confidence_matches:
-                    matched_item_id = match.get('item_id') or match.get('id')
-                    if matched_item_id and matched_item_id != item_id:
-                        matched_item = Item.objects.get(id=matched_item_id)
-                        if matched_item.user.email and matched_item.user.email != item.user.email:
-                            if matched_item.status == 'lost':
-                                matches_summary = f"- Potential Match: Found Item (Hint: '{item.title}'), Confidence: {match['score']*100:.0f}%"
-                                try:
-                                    send_mail(
-                                        subject="📩 Potential Match Found for Your Lost Item",
-                                        message=(
-                                            f"Dear {getattr(matched_item.user, 'name', matched_item.user.username)},\n\n"
-                                            f"Thank you for using Refind. We have identified a potential match for your lost item: '{matched_item.title}'.\n\n"
-                                            f"Match Details:\n{matches_summary}\n\n"
-                                            f"Please log in to your Refind dashboard to review this match and initiate a chat with the finder.\n\n"
-                                            f"Access your dashboard: {site_url}/dashboard\n\n"
-                                            f"Best regards,\nThe Refind Team\nsupport@refind.com | {site_url}"
-                                        ),
-                                        from_email=settings.DEFAULT_FROM_EMAIL,
-                                        recipient_list=[matched_item.user.email],
-                                        fail_silently=False,
-                                    )
-                                    logger.info(f"Match notification email sent to {matched_item.user.email} for lost item {matched_item.id}")
-                                except Exception as e:
-                                    logger.error(f"Failed to send email to {matched_item.user.email} for lost item {matched_item.id}: {str(e)}")
-                            elif matched_item.status == 'found':
-                                matches_summary = f"- Potential Match: Lost Item (Hint: '{item.title}'), Confidence: {match['score']*100:.0f}%"
-                                try:
-                                    send_mail(
-                                        subject="📩 Potential Match Found for Your Found Item",
-                                        message=(
-                                            f"Dear {getattr(matched_item.user, 'name', matched_item.user.username)},\n\n"
-                                            f"Thank you for contributing to Refind. A potential match has been detected for your found item: '{matched_item.title}'.\n\n"
-                                            f"Match Details:\n{matches_summary}\n\n"
-                                            f"Please log in to your Refind dashboard to review this match and engage with the owner.\n\n"
-                                            f"Access your dashboard: {site_url}/dashboard\n\n"
-                                            f"Best regards,\nThe Refind Team\nsupport@refind.com | {site_url}"
-                                        ),
-                                        from_email=settings.DEFAULT_FROM_EMAIL,
-                                        recipient_list=[matched_item.user.email],
-                                        fail_silently=False,
-                                    )
-                                    logger.info(f"Match notification email sent to {matched_item.user.email} for found item {matched_item.id}")
-                                except Exception as e:
-                                    logger.error(f"Failed to send email to {matched_item.user.email} for found item {matched_item.id}: {str(e)}")
+            # Emails go through the outbox and are sent as digests by the job worker.
+            queued = queue_match_notifications(item, matches)
+            if queued:
+                logger.info(f"Queued {queued} match notifications for item {item.id}")
             else:
                 logger.info(f"Matches found for item {item.id}, but none met the >60% confidence threshold.")
         else:
@@ -194,6 +113,7 @@ def run_matching_in_background(item_id):
         logger.error(f"Item {item_id} not found")
     except Exception as e:
         logger.error(f"Background task failed for item ID {item_id}: {str(e)}")
+        raise  # lets the job queue retry with backoff
 
 class ItemListCreateView(generics.CreateAPIView):
     serializer_class = ItemSerializer
@@ -201,11 +121,34 @@ class ItemListCreateView(generics.CreateAPIView):
     parser_classes = [MultiPartParser, FormParser]
 
     def perform_create(self, serializer):
-        item = serializer.save(user=self.request.user)
-        thread = Thread(target=run_matching_in_background, args=(item.id,))
-        thread.start()
+        image = serializer.validated_data.get('image')
+        item = serializer.save(user=self.request.user, image_hash=images.photo_hash(image) if image else None)
+        enqueue('match_item', item)
+        if item.image:
+            enqueue('image_derivatives', item)
         return item
 
+class ItemSearchView(generics.ListAPIView):
+    """
+    Keyword search over item titles, descriptions and locations: ``?q=`` terms
+    all have to match, each as a word prefix, and results come best first.
+    Takes the ItemFilter filters too (``status``, ``category``, ``location``).
+    One query on the database's full-text index.
+    """
+    serializer_class = ItemSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filterset_class = ItemFilter
+    pagination_class = None
+
+    def get_queryset(self):
+        return search.search_items(Item.objects.for_listing(), self.request.query_params.get('q'))
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # Ranked results are cut to one page; there is no stable cursor through a ranking.
+        page_size = KeysetPagination().get_page_size(self.request)
+        return queryset.order_by('-search_rank', '-created_at', '-id')[:page_size]
+
 class ItemDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ItemSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -215,11 +158,23 @@ class ItemDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def perform_update(self, serializer):
         logger.debug(f"Item update request data: {self.request.data}")
-        serializer.save(user=self.request.user)
+        extra = {}
+        if 'image' in serializer.validated_data:
+            image = serializer.validated_data['image']
+            extra['image_hash'] = images.photo_hash(image) if image else None
+        item = serializer.save(user=self.request.user, **extra)
+        ann_registry.sync_item(item)
+        if not item.embedding:
+            # Title or description changed, so the stored embedding was dropped on save.
+            enqueue('reindex_item', item)
+        if item.image and item.image_variant_urls() is None:
+            enqueue('image_derivatives', item)
 
     def perform_destroy(self, instance):
         logger.info(f"Deleting item {instance.id} by user {self.request.user.username}")
+        item_id = instance.id
         instance.delete()
+        ann_registry.remove_item(item_id)
 
 class ClaimItemView(generics.GenericAPIView):
     serializer_class = ClaimAttemptSerializer
@@ -242,6 +197,8 @@ class ClaimItemView(generics.GenericAPIView):
             if not actual_note or not user_note:
                 raise ValidationError("Both item note and claim note must contain text for matching.")
             
+            from rapidfuzz import fuzz
+
             score = fuzz.token_set_ratio(actual_note, user_note) / 100.0
             logger.debug(f"Fuzzy score for claim on item {item_id}: {score:.2f}")
             
@@ -274,6 +231,7 @@ class ClaimItemView(generics.GenericAPIView):
 class MyClaimsView(generics.ListAPIView):
     serializer_class = ClaimAttemptSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         return ClaimAttempt.objects.filter(user=self.request.user)
@@ -310,6 +268,7 @@ class ClaimApprovalView(APIView):
             item.is_claimed = True
             item.status = 'claimed'
             item.save()
+            ann_registry.remove_item(item.id)
             logger.debug(f"Claim approved for item {item_id} by user {request.user.username}")
             return Response({"detail": "Claim approved"}, status=status.HTTP_200_OK)
         except Item.DoesNotExist:
@@ -335,6 +294,7 @@ class ItemStatusUpdateView(APIView):
             if new_status == 'claimed':
                 item.is_claimed = True
             item.save()
+            ann_registry.sync_item(item)
             logger.info(f"Item {pk} status updated to {new_status} by user {request.user.username}")
             return Response(
                 {'detail': 'Item status updated'},
@@ -357,24 +317,14 @@ class MyItemsView(APIView):
 
     def get(self, request, *args, **kwargs):
         try:
-            items = Item.objects.filter(user=request.user).order_by('-created_at')
-            serializer = ItemSerializer(items, many=True, context={'skip_matches': True})
+            paginator = KeysetPagination()
+            items = paginator.paginate_queryset(Item.objects.filter(user=request.user).for_listing(), request)
+            serializer = ItemSerializer(items, many=True, context={'skip_matches': True, 'include_claim_note': True})
             items_data = serializer.data
-            for item_data in items_data:
-                item_id = item_data['id']
-                claim = ClaimAttempt.objects.filter(item_id=item_id).order_by('-created_at').first()
-                if claim:
-                    item_data['claim_status'] = {
-                        'status': claim.status,
-                        'claimer_id': claim.user_id,
-                        'claimer_username': claim.user.username,
-                        'created_at': claim.created_at.isoformat(),
-                        'claim_note': claim.claim_note
-                    }
-                else:
-                    item_data['claim_status'] = None
             logger.debug(f"Fetched {len(items_data)} items for user {request.user.username}")
-            return Response(items_data, status=status.HTTP_200_OK)
+            return paginator.get_paginated_response(items_data)
+        except ValidationError:
+            raise
         except Exception as e:
             logger.error(f"Error fetching items for {request.user.username}: {e}")
             return Response({"detail": "Failed to load items"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -384,23 +334,21 @@ class DashboardView(APIView):
 
     def get(self, request, *args, **kwargs):
         try:
-            lost_items = Item.objects.filter(status='lost', is_claimed=False).order_by('-created_at')[:5]
-            found_items = Item.objects.filter(status='found', is_claimed=False).order_by('-created_at')[:5]
-            total_lost_items = Item.objects.filter(status='lost', is_claimed=False).count()
-            total_found_items = Item.objects.filter(status='found', is_claimed=False).count()
-            total_ai_matches = ClaimAttempt.objects.filter(status='approved').count()
-            total_claim_attempts = ClaimAttempt.objects.count()
+            counters = stats.get_counters()
+            total_claim_attempts = counters['claim_attempts']
             success_ratio = (
-                (total_ai_matches / total_claim_attempts * 100)
+                (counters['approved_claims'] / total_claim_attempts * 100)
                 if total_claim_attempts > 0 else 0.0
             )
+            lost_items = stats.recent_items('lost')
+            found_items = stats.recent_items('found')
             data = {
-                'total_lost_items': total_lost_items,
-                'total_found_items': total_found_items,
-                'total_ai_matches': total_ai_matches,
+                'total_lost_items': counters['open_lost_items'],
+                'total_found_items': counters['open_found_items'],
+                'total_ai_matches': counters['approved_claims'],
                 'success_ratio': round(success_ratio, 2),
-                'lost_items': ItemSerializer(lost_items, many=True, context={'skip_matches': True}).data,
-                'found_items': ItemSerializer(found_items, many=True, context={'skip_matches': True}).data,
+                'lost_items': lost_items,
+                'found_items': found_items,
             }
             logger.debug(f"Dashboard data fetched for user {request.user.username}: {len(lost_items)} lost, {len(found_items)} found")
             return Response(data, status=status.HTTP_200_OK)
@@ -411,30 +359,59 @@ class DashboardView(APIView):
 class MyMessageItemsView(generics.ListAPIView):
     serializer_class = ItemSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         user = self.request.user
-        owned_items = Item.objects.filter(user=user)
-        claimed_items = Item.objects.filter(claimattempt__user=user, claimattempt__status='approved')
-        return (owned_items | claimed_items).distinct()
+        claimed_by_user = ClaimAttempt.objects.filter(user=user, status='approved').values('item_id')
+        return Item.objects.filter(Q(user=user) | Q(id__in=claimed_by_user)).for_listing()
+
+class ConversationListView(generics.ListAPIView):
+    """
+    The inbox: the user's conversations, most recently active first, each with
+    its latest message and unread count. One query on the denormalized
+    conversation rows; no thread is read.
+    """
+    serializer_class = ConversationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ConversationKeysetPagination
+
+    def get_queryset(self):
+        return (
+            ThreadParticipant.objects.filter(user=self.request.user, last_message_at__isnull=False)
+            .select_related('conversation', 'item', 'counterpart').defer('item__embedding')
+        )
 
 class MessageRecipientsView(generics.ListAPIView):
-    serializer_class = RegisterSerializer
+    """
+    People the user can message about an item: its owner, the people they
+    already talk to about it and, for the owner, everyone who claimed it.
+    ``?q=`` narrows the list to usernames starting with the given text.
+    """
+    serializer_class = RecipientSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = IdKeysetPagination
 
     def get_queryset(self):
         item_id = self.kwargs.get('item_id')
         user = self.request.user
         logger.debug(f"Fetching recipients for item {item_id} by user {user.username}")
-        try:
-            item = Item.objects.get(id=item_id)
-            recipients = CustomUser.objects.exclude(id=item.user.id).distinct()
-            logger.debug(f"Recipients for item {item_id}: {[u.username for u in recipients]}")
-            return recipients
-        except Item.DoesNotExist:
+        owner_id = Item.objects.filter(id=item_id).values_list('user_id', flat=True).first()
+        if owner_id is None:
             logger.error(f"Item {item_id} not found")
             raise ValidationError("Item not found.")
 
+        participants = Q(id=owner_id) | Q(
+            id__in=ThreadParticipant.objects.filter(user=user, item_id=item_id).values('counterpart_id')
+        )
+        if owner_id == user.id:
+            participants |= Q(id__in=ClaimAttempt.objects.filter(item_id=item_id).values('user_id'))
+        queryset = CustomUser.objects.filter(participants).exclude(id=user.id).only('id', 'username', 'name')
+        prefix = self.request.query_params.get('q', '').strip()
+        if prefix:
+            queryset = queryset.filter(username__istartswith=prefix)
+        return queryset
+
 class AIMatchesView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -454,6 +431,7 @@ class AIMatchesView(APIView):
             )
             matches = match_items(temp_lost_item)
             logger.info(f"User {request.user.username} fetched {len(matches)} AI matches for query: '{query}'")
+            logger.debug(f"Query embedding cache: {query_cache.stats()}")
             return Response(matches, status=status.HTTP_200_OK)
         except Exception as e:
             logger.error(f"Error fetching AI matches: {str(e)}")
@@ -465,45 +443,84 @@ class ChatThreadView(APIView):
     def get(self, request, *args, **kwargs):
         receiver_id = request.query_params.get("receiver_id")
         item_id = request.query_params.get("item_id")
+        since_id = request.query_params.get("since_id")
 
         if not receiver_id or not item_id:
             logger.error(f"Missing parameters: receiver_id={receiver_id}, item_id={item_id}")
             return Response({"error": "receiver_id and item_id are required."}, status=status.HTTP_400_BAD_REQUEST)
         
-        if not receiver_id.isdigit() or not item_id.isdigit():
-            logger.error(f"Invalid parameters: receiver_id={receiver_id}, item_id={item_id}")
-            return Response({"error": "receiver_id and item_id must be valid numbers."}, status=status.HTTP_400_BAD_REQUEST)
+        if not receiver_id.isdigit() or not item_id.isdigit() or (since_id is not None and not since_id.isdigit()):
+            logger.error(f"Invalid parameters: receiver_id={receiver_id}, item_id={item_id}, since_id={since_id}")
+            return Response({"error": "receiver_id, item_id and since_id must be valid numbers."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
             receiver_id = int(receiver_id)
             item_id = int(item_id)
 
-            if not Item.objects.filter(id=item_id).exists():
+            queryset = Message.objects.filter(
+                Q(sender=request.user, receiver_id=receiver_id) |
+                Q(sender_id=receiver_id, receiver=request.user),
+                item_id=item_id
+            )
+            read_state = ThreadParticipant.objects.filter(user=request.user, item_id=item_id, counterpart_id=receiver_id)
+            # Validation and the thread's state in one query, so idle polls stop here.
+            thread = Item.objects.filter(id=item_id).annotate(
+                receiver_exists=Exists(CustomUser.objects.filter(id=receiver_id)),
+                unread_count=Subquery(read_state.values('unread_count')[:1]),
+                latest_message_id=Subquery(queryset.order_by('-id').values('id')[:1]),
+            ).values('user_id', 'receiver_exists', 'unread_count', 'latest_message_id').first()
+
+            if thread is None:
                 logger.error(f"Item {item_id} not found")
                 return Response({"error": "Item not found."}, status=status.HTTP_404_NOT_FOUND)
-            if not CustomUser.objects.filter(id=receiver_id).exists():
+            if not thread['receiver_exists']:
                 logger.error(f"Receiver {receiver_id} not found")
                 return Response({"error": "Receiver not found."}, status=status.HTTP_404_NOT_FOUND)
-
-            item = Item.objects.get(id=item_id)
-            if item.user.id == request.user.id and receiver_id == request.user.id:
+            if thread['user_id'] == request.user.id and receiver_id == request.user.id:
                 logger.error(f"User {request.user.username} attempted to chat with themselves for item {item_id}")
                 return Response({"error": "You cannot chat with yourself."}, status=status.HTTP_400_BAD_REQUEST)
 
-            queryset = Message.objects.filter(
-                Q(sender=request.user, receiver_id=receiver_id) |
-                Q(sender_id=receiver_id, receiver=request.user),
-                item_id=item_id
-            ).order_by("timestamp")
-            queryset.filter(receiver=request.user, is_read=False).update(is_read=True)
-            serializer = MessageSerializer(queryset, many=True)
+            if since_id is not None:
+                # Incremental sync: only messages newer than the client's last one, oldest first.
+                since_id = int(since_id)
+                messages = []
+                if (thread['latest_message_id'] or 0) > since_id:
+                    messages = list(
+                        queryset.filter(id__gt=since_id).select_related('sender').with_read_state()
+                        .order_by('id')[:settings.API_MAX_PAGE_SIZE]
+                    )
+                # A full batch may stop short of the newest message; only what was returned is read.
+                up_to_id = messages[-1].id if len(messages) == settings.API_MAX_PAGE_SIZE else thread['latest_message_id']
+                if self.mark_read(request.user, item_id, receiver_id, thread, up_to_id, queryset):
+                    for message in messages:
+                        if message.receiver_id == request.user.id and message.id <= up_to_id:
+                            message.is_read = True
+                serializer = MessageSerializer(messages, many=True)
+                logger.debug(f"Fetched {len(messages)} new messages after {since_id} for user {request.user.username}, item {item_id}")
+                return Response(serializer.data, status=status.HTTP_200_OK)
+
+            self.mark_read(request.user, item_id, receiver_id, thread, thread['latest_message_id'], queryset)
+            # Pages walk back from the newest message; each page is returned oldest first.
+            paginator = TimestampKeysetPagination()
+            messages = paginator.paginate_queryset(queryset.select_related('sender').with_read_state(), request)
+            serializer = MessageSerializer(messages[::-1], many=True)
             logger.debug(f"Fetched {len(serializer.data)} messages for user {request.user.username}, item {item_id}, receiver {receiver_id}")
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return paginator.get_paginated_response(serializer.data)
 
+        except ValidationError:
+            raise
         except Exception as e:
             logger.error(f"Error fetching chat for item {item_id}, receiver {receiver_id}: {str(e)}")
             return Response({"error": "An error occurred while fetching the chat."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def mark_read(self, user, item_id, receiver_id, thread, up_to_id, queryset):
+        if not thread['unread_count'] or up_to_id is None:
+            return False
+        still_unread = 0
+        if up_to_id < thread['latest_message_id']:
+            still_unread = queryset.filter(receiver=user, id__gt=up_to_id).count()
+        return threads.mark_read(user.id, item_id, receiver_id, up_to_id, thread['unread_count'], still_unread)
+
 class MaskedItemDetailView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -517,16 +534,7 @@ class MaskedItemDetailView(APIView):
             if item.user == request.user:
                 serializer = ItemSerializer(item)
                 return Response(serializer.data, status=status.HTTP_200_OK)
-            masked_data = {
-                'id': item.id,
-                'title': mask_text(item.title),
-                'description': "Description is hidden for privacy. Please chat with the user for more details.",
-                'location': mask_text(item.location),
-                'status': item.status,
-                'category': item.category.name if item.category else 'N/A',
-                'image': item.image.url if item.image else None,
-                'user': item.user.id,
-            }
+            masked_data = masked_item(item)
             logger.debug(f"Fetched masked item {item_id} for user {request.user.username}")
             return Response(masked_data, status=status.HTTP_200_OK)
         except Item.DoesNotExist:
@@ -536,13 +544,93 @@ class MaskedItemDetailView(APIView):
             logger.error(f"Error fetching item {item_id}: {str(e)}")
             return Response({"error": "An error occurred while fetching the item."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class NotificationSummaryView(APIView):
-    permission_classes = [permissions.IsAuthenticated]
-
-    def get(self, request):
-        unread_count = Message.objects.filter(receiver=request.user, is_read=False).count()
-        logger.debug(f"Notification summary for {request.user.username}: {unread_count} unread messages")
-        return Response({'unread_messages': unread_count}, status=status.HTTP_200_OK)
+class JWTRequestMixin:
+    """
+    JWT authentication (Authorization header) for the plain async Django views,
+    which DRF cannot serve.
+    """
+
+    def authenticate(self, request):
+        auth = JWTAuthentication()
+        header = auth.get_header(request)
+        raw_token = auth.get_raw_token(header) if header else None
+        if not raw_token:
+            return None
+        try:
+            return auth.get_user(auth.get_validated_token(raw_token))
+        except (InvalidToken, AuthenticationFailed) as e:
+            logger.error(f"Rejected access token on {request.path}: {str(e)}")
+            return None
+
+    def unauthorized(self):
+        return JsonResponse({"detail": "Authentication credentials were not provided or are invalid."}, status=401)
+
+class NotificationSummaryView(JWTRequestMixin, View):
+    """
+    Unread message count with an ETag built from the user's notification
+    version. Both are maintained on the user row, which authentication loads
+    anyway, so neither a 200 nor a 304 (for a matching If-None-Match) touches
+    the Message table. With ?wait=N an unchanged request is held for up to N
+    seconds until the count changes.
+    """
+
+    async def get(self, request):
+        user = await sync_to_async(self.authenticate)(request)
+        if user is None:
+            return self.unauthorized()
+        if request.headers.get('If-None-Match') == self.etag(user.id, user.notification_version):
+            wait = self.wait_seconds(request)
+            summary = await self.wait_for_change(user, wait) if wait else None
+            if summary is None:
+                return self.with_cache_headers(HttpResponseNotModified(), self.etag(user.id, user.notification_version))
+            user.notification_version = summary['version']
+            user.unread_message_count = summary['unread_messages']
+
+        logger.debug(f"Notification summary for {user.username}: {user.unread_message_count} unread messages")
+        return self.summary_response(user, user.unread_message_count)
+
+    def summary_response(self, user, unread_count):
+        response = JsonResponse({'unread_messages': unread_count})
+        return self.with_cache_headers(response, self.etag(user.id, user.notification_version))
+
+    def etag(self, user_id, version):
+        return f'"{user_id}-{version}"'
+
+    def with_cache_headers(self, response, etag):
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        response['Vary'] = 'Authorization'
+        return response
+
+    def wait_seconds(self, request):
+        try:
+            return max(0.0, min(float(request.GET.get('wait', 0)), settings.NOTIFICATION_LONG_POLL_SECONDS))
+        except ValueError:
+            return 0.0
+
+    async def wait_for_change(self, user, timeout):
+        """
+        Waits up to ``timeout`` seconds for the user's notification version to
+        move on. Returns the new summary, or None on timeout.
+        """
+        subscription = await events.get_broker().subscribe(user.id)
+        try:
+            # A change between authenticating and subscribing is not pushed again.
+            state = await CustomUser.objects.filter(id=user.id).values('unread_message_count', 'notification_version').afirst()
+            if state['notification_version'] != user.notification_version:
+                return {'unread_messages': state['unread_message_count'], 'version': state['notification_version']}
+            deadline = time.monotonic() + timeout
+            while (remaining := deadline - time.monotonic()) > 0:
+                frame = await subscription.next(remaining)
+                if frame is None:
+                    return None
+                if frame.startswith('event: unread\n'):
+                    summary = json.loads(frame.split('data: ', 1)[1])
+                    if summary.get('version') != user.notification_version:
+                        return summary
+            return None
+        finally:
+            await subscription.close()
 
 class UnreadNotificationsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -552,16 +640,92 @@ class UnreadNotificationsView(APIView):
             include_read = request.query_params.get('include_read', 'false').lower() == 'true'
             mark_read = request.query_params.get('mark_read', 'true').lower() == 'true'
             logger.debug(f"Fetching notifications for {request.user.username}, include_read={include_read}, mark_read={mark_read}")
-            queryset = Message.objects.filter(receiver=request.user)
+            queryset = Message.objects.filter(receiver=request.user).with_read_state()
             if not include_read:
                 queryset = queryset.filter(is_read=False)
-            queryset = queryset.order_by('-timestamp')
-            notifications_to_send = list(queryset)
             if not include_read and mark_read:
-                queryset.update(is_read=True)
+                # Read state is a cursor per thread, so a feed that marks messages
+                # read is delivered oldest first: every page then holds the oldest
+                # unread messages of its threads and the cursors can move past them.
+                paginator = IdKeysetPagination()
+            else:
+                paginator = TimestampKeysetPagination()
+            notifications_to_send = paginator.paginate_queryset(queryset.select_related('sender'), request)
+            if not include_read and mark_read:
+                self.mark_delivered_threads_read(request.user, notifications_to_send)
             serializer = MessageSerializer(notifications_to_send, many=True)
             logger.debug(f"Notifications sent: {len(serializer.data)}")
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return paginator.get_paginated_response(serializer.data)
+        except ValidationError:
+            raise
         except Exception as e:
             logger.error(f"Error fetching notifications for {request.user.username}: {str(e)}")
-            return Response({"detail": "Failed to load notifications"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({"detail": "Failed to load notifications"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def mark_delivered_threads_read(self, user, messages):
+        # Each thread is read up to its newest delivered message; the messages
+        # after it stay unread for the next page.
+        delivered = {}
+        for message in messages:
+            count, newest = delivered.get((message.item_id, message.sender_id), (0, 0))
+            delivered[(message.item_id, message.sender_id)] = (count + 1, max(newest, message.id))
+        states = ThreadParticipant.objects.filter(
+            user=user, unread_count__gt=0, item_id__in={item_id for item_id, _ in delivered}
+        ).values_list('item_id', 'counterpart_id', 'unread_count')
+        for item_id, counterpart_id, unread_count in states:
+            if (item_id, counterpart_id) not in delivered:
+                continue
+            count, newest = delivered[(item_id, counterpart_id)]
+            threads.mark_read(user.id, item_id, counterpart_id, newest, unread_count, max(unread_count - count, 0))
+
+class EventStreamTicketView(APIView):
+    """
+    A ticket for opening the event stream, valid for PUSH_TICKET_MAX_AGE
+    seconds. Keeps the access token itself out of the stream URL.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        return Response({
+            'ticket': events.issue_ticket(request.user.id),
+            'expires_in': settings.PUSH_TICKET_MAX_AGE,
+        })
+
+class EventStreamView(JWTRequestMixin, View):
+    """
+    Server-sent events for the signed-in user: 'message' for every chat message
+    they send or receive, and 'unread' whenever their unread count changes.
+    Needs the ASGI entry point. EventSource cannot set headers, so instead of
+    the access token it passes a ticket from EventStreamTicketView as ?ticket=.
+    """
+
+    async def get(self, request):
+        user = await self.ticket_user(request) if 'ticket' in request.GET else await sync_to_async(self.authenticate)(request)
+        if user is None:
+            return self.unauthorized()
+        # Subscribe before counting so that no change can slip in between.
+        subscription = await events.get_broker().subscribe(user.id)
+        unread_count = await CustomUser.objects.filter(id=user.id).values_list('unread_message_count', flat=True).afirst()
+        logger.debug(f"Event stream opened for {user.username}")
+        response = StreamingHttpResponse(self.stream(subscription, unread_count), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def ticket_user(self, request):
+        user_id = events.ticket_user_id(request.GET['ticket'])
+        if user_id is None:
+            logger.error(f"Rejected stream ticket on {request.path}")
+            return None
+        return await CustomUser.objects.filter(id=user_id, is_active=True).afirst()
+
+    async def stream(self, subscription, unread_count):
+        try:
+            yield "retry: 5000\n\n"
+            yield events.sse_frame('unread', {'unread_messages': unread_count})
+            while True:
+                frame = await subscription.next(settings.PUSH_HEARTBEAT_SECONDS)
+                # Comments keep proxies from closing an idle connection.
+                yield frame if frame is not None else ": keepalive\n\n"
+        finally:
+            await subscription.close()
@@ -0,0 +1,482 @@
+import logging
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from api.models import Item
+from chatbot.embeddings import (
+    get_backend, get_corpus_matrix, get_item_embedding, has_current_embedding, unpack_embedding
+)
+from chatbot.bktree import BKTree
+from chatbot.lexical import BM25Index, item_document
+
+logger = logging.getLogger(__name__)
+
+def normalize(vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class IVFIndex:
+    """
+    Inverted-file index over unit vectors, so inner product equals cosine similarity.
+
+    Vectors are bucketed under their nearest k-means centroid and a search only
+    scans the ``nprobe`` buckets closest to the query. Below ``brute_force_limit``
+    vectors the index stays flat and every search is exact.
+    """
+
+    def __init__(self, nprobe=8, brute_force_limit=2048, seed=0):
+        self.nprobe = nprobe
+        self.brute_force_limit = brute_force_limit
+        self.rng = np.random.default_rng(seed)
+        self.centroids = None
+        self.trained_size = 0
+        self.lists = []       # per bucket: list of ids
+        self.vectors = []     # per bucket: list of vectors
+        self.stacked = []     # per bucket: cached np.ndarray, None when dirty
+        self.positions = {}   # id -> (bucket, offset)
+        self.max_id = 0
+        self.reset(1)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, item_id):
+        return item_id in self.positions
+
+    def reset(self, nlist):
+        self.lists = [[] for _ in range(nlist)]
+        self.vectors = [[] for _ in range(nlist)]
+        self.stacked = [None] * nlist
+        self.positions = {}
+
+    def build(self, ids, matrix):
+        matrix = normalize(matrix) if len(ids) else matrix
+        self.train(matrix)
+        self.reset(1 if self.centroids is None else len(self.centroids))
+        for bucket, item_id, vector in zip(self.assign(matrix), ids, matrix):
+            self.positions[item_id] = (bucket, len(self.lists[bucket]))
+            self.lists[bucket].append(item_id)
+            self.vectors[bucket].append(vector)
+        self.max_id = max(ids, default=0)
+
+    def assign(self, matrix, chunk_size=8192):
+        """Nearest-centroid bucket for every row, computed in chunks."""
+        if self.centroids is None:
+            return np.zeros(len(matrix), dtype=np.intp)
+        return np.concatenate([
+            np.argmax(matrix[start:start + chunk_size] @ self.centroids.T, axis=1)
+            for start in range(0, len(matrix), chunk_size)
+        ]) if len(matrix) else np.zeros(0, dtype=np.intp)
+
+    def train(self, matrix, iterations=10):
+        n = len(matrix)
+        self.trained_size = n
+        if n <= self.brute_force_limit:
+            self.centroids = None
+            return
+        nlist = max(1, int(np.sqrt(n)))
+        sample = matrix[self.rng.choice(n, size=min(n, nlist * 32), replace=False)]
+        centroids = sample[self.rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            self.centroids = centroids
+            assignment = self.assign(sample)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = np.bincount(assignment, minlength=nlist) == 0
+            sums[empty] = centroids[empty]
+            centroids = normalize(sums)
+        self.centroids = centroids
+
+    def needs_retrain(self):
+        size = len(self)
+        if self.centroids is None:
+            return size > self.brute_force_limit
+        return size > 4 * self.trained_size
+
+    def add(self, item_id, vector):
+        self.remove(item_id)
+        self._insert(item_id, normalize(vector))
+
+    def _insert(self, item_id, vector):
+        bucket = 0 if self.centroids is None else int(np.argmax(self.centroids @ vector))
+        self.positions[item_id] = (bucket, len(self.lists[bucket]))
+        self.lists[bucket].append(item_id)
+        self.vectors[bucket].append(vector)
+        self.stacked[bucket] = None
+        self.max_id = max(self.max_id, item_id)
+
+    def remove(self, item_id):
+        position = self.positions.pop(item_id, None)
+        if position is None:
+            return False
+        bucket, offset = position
+        ids, vectors = self.lists[bucket], self.vectors[bucket]
+        # Swap-remove keeps deletes O(1); the moved id gets its new offset.
+        last_id, last_vector = ids.pop(), vectors.pop()
+        if offset < len(ids):
+            ids[offset], vectors[offset] = last_id, last_vector
+            self.positions[last_id] = (bucket, offset)
+        self.stacked[bucket] = None
+        return True
+
+    def vector(self, item_id):
+        bucket, offset = self.positions[item_id]
+        return self.vectors[bucket][offset]
+
+    def copy(self, item_id, source):
+        """Takes ``item_id``'s entry from another index, or drops it if ``source`` has none."""
+        if item_id in source:
+            self.add(item_id, source.vector(item_id))
+        else:
+            self.remove(item_id)
+
+    def bucket_matrix(self, bucket):
+        if self.stacked[bucket] is None and self.vectors[bucket]:
+            self.stacked[bucket] = np.vstack(self.vectors[bucket])
+        return self.stacked[bucket]
+
+    def search(self, query, k):
+        """Returns ``(ids, scores)`` of the ``k`` nearest vectors, best first."""
+        if not self.positions:
+            return [], np.empty(0, dtype=np.float32)
+        query = normalize(query)
+        if self.centroids is None:
+            buckets = range(len(self.lists))
+        else:
+            centroid_scores = self.centroids @ query
+            nprobe = min(self.nprobe, len(self.centroids))
+            buckets = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        ids, scores = [], []
+        for bucket in buckets:
+            matrix = self.bucket_matrix(bucket)
+            if matrix is not None:
+                ids.extend(self.lists[bucket])
+                scores.append(matrix @ query)
+        if not ids:
+            return [], np.empty(0, dtype=np.float32)
+        scores = np.concatenate(scores)
+        if len(scores) > k:
+            best = np.argpartition(-scores, k - 1)[:k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [ids[i] for i in best], scores[best]
+
+
+def recall_at_k(index, ids, matrix, queries, k=5):
+    """Fraction of the exact top-``k`` neighbours that ``index`` also returns."""
+    matrix = normalize(matrix)
+    ids = np.asarray(ids)
+    hits = 0
+    for query in normalize(queries):
+        exact = set(ids[np.argsort(-(matrix @ query))[:k]].tolist())
+        found, _ = index.search(query, k)
+        hits += len(exact.intersection(found))
+    return hits / (k * len(queries))
+
+
+class IndexRegistry:
+    """
+    Process-local indexes for each open partition ('lost' and 'found'): an IVF
+    index over stored embeddings, a BM25 index over title, description and
+    location, and a BK-tree over photo hashes. They are built separately, so
+    lexical and photo search keep working when the embedding backend is down.
+
+    Indexes are built from the database on first use, pick up items created by
+    other workers on every search, and are rebuilt after ANN_REBUILD_SECONDS so
+    status changes made elsewhere are eventually seen. Rebuilds run in a
+    background thread while searches keep using the old index. Callers must
+    still re-check candidates against the database.
+
+    An index is named by its key: the status for the ANN index,
+    ``('lexical', status)`` and ``('images', status)`` for the others.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.indexes = {}
+        self.lexical = {}
+        self.images = {}
+        self.built_at = {}
+        self.rebuilding = {}  # key -> ids changed while that index is being rebuilt
+        self.build_locks = {}  # key -> lock held while its first index loads
+        self.watchers = {}  # id -> set of ids synced while a search reads newer items
+        self.generation = 0
+
+    def new_index(self):
+        return IVFIndex(nprobe=settings.ANN_NPROBE, brute_force_limit=settings.ANN_BRUTE_FORCE_LIMIT)
+
+    def open_items(self, status):
+        return Item.objects.filter(status=status, is_claimed=False)
+
+    def expired(self, key):
+        return time.monotonic() - self.built_at.get(key, 0) > settings.ANN_REBUILD_SECONDS
+
+    def partition(self, key):
+        """``(indexes, status)``: the dict holding the index named by ``key`` and its slot in it."""
+        if isinstance(key, tuple):
+            kind, status = key
+            return (self.lexical if kind == 'lexical' else self.images), status
+        return self.indexes, key
+
+    def load(self, status, encode=True):
+        """
+        A fresh ANN index of the partition. May encode missing embeddings, so
+        rebuilds call it without the lock. With ``encode=False`` items without
+        a stored vector are left out until a later rebuild, and the
+        backfill_embeddings job is queued to store theirs.
+        """
+        started = time.perf_counter()
+        items = list(
+            self.open_items(status).only('id', 'title', 'description', 'embedding', 'embedding_model').order_by('id')
+        )
+        max_id = max((item.id for item in items), default=0)
+        if not encode:
+            backend = get_backend()
+            stored = [item for item in items if has_current_embedding(item, backend)]
+            if len(stored) < len(items):
+                from api.jobs import enqueue
+
+                logger.warning(f"{len(items) - len(stored)} '{status}' items have no stored embedding, queued a backfill")
+                enqueue('backfill_embeddings')
+            items = stored
+        index = self.new_index()
+        index.build([item.id for item in items], get_corpus_matrix(items))
+        # Items left out are not "newer" either; the next rebuild adds them.
+        index.max_id = max_id
+        logger.info(f"Built '{status}' ANN index with {len(index)} items in {time.perf_counter() - started:.2f}s")
+        return index
+
+    def load_lexical(self, status):
+        started = time.perf_counter()
+        index = BM25Index()
+        for item in self.open_items(status).only('id', 'title', 'description', 'location').iterator():
+            index.add(item.id, item_document(item))
+        logger.info(f"Built '{status}' BM25 index with {len(index)} items in {time.perf_counter() - started:.2f}s")
+        return index
+
+    def load_images(self, status):
+        started = time.perf_counter()
+        index = BKTree()
+        for item_id, image_hash in self.open_items(status).exclude(image_hash=None).values_list('id', 'image_hash').iterator():
+            index.add(item_id, image_hash)
+        logger.info(f"Built '{status}' photo hash index with {len(index)} items in {time.perf_counter() - started:.2f}s")
+        return index
+
+    def load_key(self, key, encode=True):
+        if not isinstance(key, tuple):
+            return self.load(key, encode)
+        kind, status = key
+        return self.load_lexical(status) if kind == 'lexical' else self.load_images(status)
+
+    def build(self, key, encode=True):
+        """Loads an index without holding the lock, then installs it."""
+        index = self.load_key(key, encode)
+        indexes, status = self.partition(key)
+        with self.lock:
+            indexes[status] = index
+            self.built_at[key] = time.monotonic()
+        return index
+
+    def schedule_rebuild(self, key):
+        # Called with the lock held; one rebuild per index at a time.
+        if key not in self.rebuilding:
+            self.rebuilding[key] = set()
+            self.start_rebuild(key)
+
+    def start_rebuild(self, key):
+        generation = self.generation
+
+        def run():
+            try:
+                self.rebuild(key, generation)
+            finally:
+                connection.close()
+
+        threading.Thread(target=run, name=f'index-rebuild-{key}', daemon=True).start()
+
+    def rebuild(self, key, generation):
+        """
+        Builds a replacement index off the request path and swaps it in. Items
+        synced while it was built are copied over from the old index, which
+        saw those changes.
+        """
+        try:
+            index = self.load_key(key)
+        except Exception as e:
+            logger.error(f"Rebuilding the {key} index failed, keeping the old one: {str(e)}")
+            index = None
+        with self.lock:
+            if generation != self.generation:
+                return
+            changed = self.rebuilding.pop(key, set())
+            if index is None:
+                # Retried after another ANN_REBUILD_SECONDS rather than on every search.
+                self.built_at[key] = time.monotonic()
+                return
+            indexes, status = self.partition(key)
+            old = indexes.get(status)
+            if old is not None:
+                for item_id in changed:
+                    index.copy(item_id, old)
+            indexes[status] = index
+            self.built_at[key] = time.monotonic()
+
+    def get_index(self, key, read_newer):
+        """
+        The index named by ``key``, built on first use and rebuilt in the
+        background once expired. Items past its ``max_id`` are read (and
+        encoded) without the lock by ``read_newer(max_id)``, which returns
+        ``(id, value)`` pairs, and added under it.
+        """
+        indexes, status = self.partition(key)
+        with self.lock:
+            index = indexes.get(status)
+            if index is not None and (
+                self.expired(key) or (isinstance(index, IVFIndex) and index.needs_retrain())
+            ):
+                self.schedule_rebuild(key)
+            build_lock = self.build_locks.setdefault(key, threading.Lock())
+        if index is None:
+            # First use; worker warm-up normally builds it before any request.
+            with build_lock:
+                return indexes.get(status) or self.build(key)
+        # Items synced while the newer ones are read keep their synced state.
+        changed = set()
+        with self.lock:
+            self.watchers[id(changed)] = changed
+        try:
+            newer = read_newer(index.max_id)
+        finally:
+            with self.lock:
+                del self.watchers[id(changed)]
+        if newer:
+            with self.lock:
+                for item_id, value in newer:
+                    if item_id not in changed:
+                        index.add(item_id, value)
+        return index
+
+    def get(self, status):
+        def read_newer(max_id):
+            items = list(
+                self.open_items(status).filter(id__gt=max_id)
+                .only('id', 'title', 'description', 'embedding', 'embedding_model').order_by('id')
+            )
+            return list(zip([item.id for item in items], get_corpus_matrix(items))) if items else []
+
+        return self.get_index(status, read_newer)
+
+    def get_lexical(self, status):
+        def read_newer(max_id):
+            items = self.open_items(status).filter(id__gt=max_id).only('id', 'title', 'description', 'location')
+            return [(item.id, item_document(item)) for item in items]
+
+        return self.get_index(('lexical', status), read_newer)
+
+    def get_images(self, status):
+        def read_newer(max_id):
+            newer = self.open_items(status).filter(id__gt=max_id).exclude(image_hash=None)
+            return list(newer.values_list('id', 'image_hash'))
+
+        return self.get_index(('images', status), read_newer)
+
+    def search(self, status, query, k):
+        index = self.get(status)
+        with self.lock:
+            return index.search(query, k)
+
+    def lexical_search(self, status, text, k):
+        """BM25 top-``k`` with scores normalized to [0, 1]."""
+        index = self.get_lexical(status)
+        with self.lock:
+            return index.search(text, k, normalized=True)
+
+    def image_search(self, status, image_hash, radius):
+        """``(id, distance)`` pairs of photos within ``radius`` bits of ``image_hash``, closest first."""
+        index = self.get_images(status)
+        with self.lock:
+            return index.search(image_hash, radius)
+
+    def vectors(self, status, ids):
+        """Returns ``(ids, matrix)`` of the stored unit vectors for the ``ids`` present in the ANN index."""
+        index = self.get(status)
+        with self.lock:
+            present = [item_id for item_id in ids if item_id in index]
+            if not present:
+                return [], np.empty((0, 0), dtype=np.float32)
+            return present, np.vstack([index.vector(item_id) for item_id in present])
+
+    def sync_item(self, item):
+        """Moves an item into the partition matching its current status, or drops it."""
+        is_open = not item.is_claimed
+        with self.lock:
+            self.mark_changed(item.id)
+            for status in set(self.indexes) | set(self.lexical) | set(self.images):
+                if status != item.status or not is_open:
+                    self.remove_from(status, item.id)
+            if not is_open:
+                return
+            index = self.indexes.get(item.status)
+            if index is not None:
+                if has_current_embedding(item, get_backend()):
+                    index.add(item.id, unpack_embedding(item.embedding))
+                else:
+                    # The text changed and the old vector no longer describes it; reindex_item adds the new one.
+                    index.remove(item.id)
+            lexical = self.lexical.get(item.status)
+            if lexical is not None:
+                lexical.add(item.id, item_document(item))
+            images = self.images.get(item.status)
+            if images is not None:
+                if item.image_hash is None:
+                    images.remove(item.id)
+                else:
+                    images.add(item.id, item.image_hash)
+
+    def remove_from(self, status, item_id):
+        for indexes in (self.indexes, self.lexical, self.images):
+            if status in indexes:
+                indexes[status].remove(item_id)
+
+    def mark_changed(self, item_id):
+        for changed in (*self.rebuilding.values(), *self.watchers.values()):
+            changed.add(item_id)
+
+    def remove_item(self, item_id):
+        with self.lock:
+            self.mark_changed(item_id)
+            for status in set(self.indexes) | set(self.lexical) | set(self.images):
+                self.remove_from(status, item_id)
+
+    def clear(self):
+        with self.lock:
+            self.indexes.clear()
+            self.lexical.clear()
+            self.images.clear()
+            self.built_at.clear()
+            self.rebuilding.clear()
+            # Rebuilds still running finish without installing their index.
+            self.generation += 1
+
+
+registry = IndexRegistry()
+
+def reindex_item(item_id):
+    """Background entry point: refresh an item's embedding, then its index entry."""
+    try:
+        item = Item.objects.get(id=item_id)
+        get_item_embedding(item)
+        registry.sync_item(item)
+    except Item.DoesNotExist:
+        registry.remove_item(item_id)
+    except Exception as e:
+        logger.error(f"Failed to reindex item {item_id}: {str(e)}")
+        raise
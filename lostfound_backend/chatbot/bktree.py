@@ -0,0 +1,101 @@
+HASH_BITS = 64
+HASH_MASK = (1 << HASH_BITS) - 1
+
+
+def hamming(a, b) -> int:
+    # Hashes are stored as signed 64-bit integers, so mask before counting.
+    return ((a ^ b) & HASH_MASK).bit_count()
+
+
+class BKNode:
+    __slots__ = ('value', 'ids', 'children')
+
+    def __init__(self, value):
+        self.value = value
+        self.ids = set()
+        self.children = {}  # distance to this node -> child
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over 64-bit perceptual hashes with Hamming distance.
+
+    A radius query only descends into children whose edge distance is within
+    ``radius`` of the query's distance to the node (triangle inequality), so
+    small radii visit a small part of the tree. Items with identical hashes
+    share a node. Removed items leave their node behind as a routing node;
+    the tree is rebuilt once those outnumber the live ones.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.hashes = {}  # id -> hash
+        self.nodes = 0
+        self.max_id = 0
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def __contains__(self, item_id):
+        return item_id in self.hashes
+
+    def add(self, item_id, value):
+        self.remove(item_id)
+        self.hashes[item_id] = value
+        self.max_id = max(self.max_id, item_id)
+        self._insert(item_id, value)
+
+    def copy(self, item_id, source):
+        """Takes ``item_id``'s hash from another tree, or drops it if ``source`` has none."""
+        if item_id in source:
+            self.add(item_id, source.hashes[item_id])
+        else:
+            self.remove(item_id)
+
+    def _insert(self, item_id, value):
+        if self.root is None:
+            self.root = BKNode(value)
+            self.nodes = 1
+        node = self.root
+        while node.value != value:
+            distance = hamming(node.value, value)
+            child = node.children.get(distance)
+            if child is None:
+                child = node.children[distance] = BKNode(value)
+                self.nodes += 1
+            node = child
+        node.ids.add(item_id)
+
+    def _find(self, value):
+        node = self.root
+        while node is not None and node.value != value:
+            node = node.children.get(hamming(node.value, value))
+        return node
+
+    def remove(self, item_id):
+        value = self.hashes.pop(item_id, None)
+        if value is None:
+            return False
+        self._find(value).ids.discard(item_id)
+        if self.nodes > 2 * len(self.hashes) + 64:
+            self.rebuild()
+        return True
+
+    def rebuild(self):
+        self.root, self.nodes = None, 0
+        for item_id, value in self.hashes.items():
+            self._insert(item_id, value)
+
+    def search(self, value, radius):
+        """Returns ``(id, distance)`` pairs within ``radius`` bits of ``value``, closest first."""
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(node.value, value)
+            if distance <= radius:
+                found.extend((item_id, distance) for item_id in node.ids)
+            for edge, child in node.children.items():
+                if distance - radius <= edge <= distance + radius:
+                    stack.append(child)
+        return sorted(found, key=lambda pair: (pair[1], pair[0]))
@@ -0,0 +1,329 @@
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 384
+
+
+class EmbeddingError(Exception):
+    """Raised when the embedding backend cannot produce vectors."""
+
+
+class EmbeddingBackend:
+    """
+    Turns a batch of texts into a list of vectors. ``version`` is stored next to
+    every Item embedding, so switching backend or model invalidates old vectors.
+    """
+    name = ''
+
+    def __init__(self, model_name, batch_size=64):
+        self.model_name = model_name
+        self.batch_size = batch_size
+
+    @property
+    def version(self):
+        return f"{self.name}:{self.model_name}"
+
+    def encode(self, texts: list) -> list:
+        raise NotImplementedError
+
+    def encode_one(self, text: str) -> list:
+        return self.encode([text])[0]
+
+    def batches(self, texts):
+        for start in range(0, len(texts), self.batch_size):
+            yield texts[start:start + self.batch_size]
+
+
+class HuggingFaceBackend(EmbeddingBackend):
+    """Remote Hugging Face inference endpoint; sends one request per batch."""
+    name = 'hf'
+
+    def __init__(self, model_name, batch_size=64, api_token=None, timeout=30):
+        super().__init__(model_name, batch_size)
+        if not api_token:
+            raise EmbeddingError("Hugging Face API token not set.")
+        import requests
+
+        self.url = f"https://api-inference.huggingface.co/models/{model_name}"
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {api_token}"
+
+    def encode(self, texts: list) -> list:
+        vectors = []
+        for batch in self.batches(texts):
+            response = self.session.post(
+                self.url,
+                json={"inputs": batch, "options": {"wait_for_model": True}},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            vectors.extend(response.json())
+        return vectors
+
+
+class LocalBackend(EmbeddingBackend):
+    """
+    CPU sentence-transformers model loaded from a local path. Set
+    EMBEDDING_LOCAL_RUNTIME to 'onnx' to run the exported ONNX MiniLM instead of torch.
+    """
+    name = 'local'
+
+    def __init__(self, model_name, batch_size=64, model_path=None, runtime='torch'):
+        super().__init__(model_name, batch_size)
+        if not model_path:
+            raise EmbeddingError("EMBEDDING_MODEL_PATH must point to a local model directory.")
+        from sentence_transformers import SentenceTransformer
+
+        kwargs = {'device': 'cpu'}
+        if runtime != 'torch':
+            kwargs['backend'] = runtime
+        self.model = SentenceTransformer(model_path, **kwargs)
+
+    def encode(self, texts: list) -> list:
+        return self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True).tolist()
+
+
+class HashingBackend(EmbeddingBackend):
+    """
+    Deterministic feature-hashing stub for tests and offline runs. It needs no
+    model or network, and texts sharing words still score as similar.
+    """
+    name = 'hashing'
+    token_pattern = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, model_name='hashing', batch_size=64, dim=EMBEDDING_DIM):
+        super().__init__(f"{model_name}-{dim}", batch_size)
+        self.dim = dim
+
+    def encode(self, texts: list) -> list:
+        return [self.encode_text(text) for text in texts]
+
+    def encode_text(self, text):
+        vector = [0.0] * self.dim
+        for token in self.token_pattern.findall((text or '').lower()):
+            digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], 'little') % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(x * x for x in vector))
+        return [x / norm for x in vector] if norm else vector
+
+
+BACKENDS = {
+    'huggingface': HuggingFaceBackend,
+    'local': LocalBackend,
+    'hashing': HashingBackend,
+}
+
+@lru_cache(maxsize=None)
+def _build_backend(name, model_name, batch_size, options):
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise EmbeddingError(f"Unknown embedding backend '{name}'. Choose one of: {', '.join(BACKENDS)}")
+    backend = backend_class(model_name, batch_size, **dict(options))
+    logger.info(f"Loaded embedding backend {backend.version}")
+    if name == 'hashing' and not settings.EMBEDDING_BACKEND:
+        logger.warning("HF_API_TOKEN is not set; falling back to the offline hashing embedding backend.")
+    return backend
+
+def get_backend() -> EmbeddingBackend:
+    name = settings.EMBEDDING_BACKEND
+    if not name:
+        name = 'huggingface' if settings.HF_API_TOKEN else 'hashing'
+    options = {
+        'huggingface': {'api_token': settings.HF_API_TOKEN},
+        'local': {'model_path': settings.EMBEDDING_MODEL_PATH, 'runtime': settings.EMBEDDING_LOCAL_RUNTIME},
+    }.get(name, {})
+    model_name = 'hashing' if name == 'hashing' else settings.EMBEDDING_MODEL
+    return _build_backend(name, model_name, settings.EMBEDDING_BATCH_SIZE, tuple(sorted(options.items())))
+
+
+class QueryEmbeddingCache:
+    """
+    Two-tier cache for query embeddings, keyed by normalized query text and
+    backend version: a bounded in-process LRU with TTL in front of the shared
+    Django cache, so repeated searches skip the embedding call in every worker.
+    """
+
+    def __init__(self, max_size=1024, ttl=86400):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires_at, vector)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text):
+        return " ".join((text or '').lower().split())
+
+    def key(self, text, version):
+        digest = hashlib.sha1(f"{version}|{self.normalize(text)}".encode()).hexdigest()
+        return f"query-embedding:{digest}"
+
+    def get(self, text, version):
+        key = self.key(text, version)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self.entries[key]
+        blob = cache.get(key)
+        if blob is None:
+            with self.lock:
+                self.misses += 1
+            return None
+        vector = unpack_embedding(blob)
+        self.remember(key, vector)
+        with self.lock:
+            self.shared_hits += 1
+        return vector
+
+    def set(self, text, version, vector):
+        key = self.key(text, version)
+        cache.set(key, pack_embedding(vector), self.ttl)
+        self.remember(key, vector)
+
+    def remember(self, key, vector):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, vector)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_ratio': round((self.hits + self.shared_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.shared_hits = self.misses = 0
+
+
+query_cache = QueryEmbeddingCache(
+    max_size=settings.QUERY_EMBEDDING_CACHE_SIZE,
+    ttl=settings.QUERY_EMBEDDING_CACHE_TTL,
+)
+
+def encode_query(text) -> list:
+    """Encodes free-text search input, reusing cached vectors for repeated queries."""
+    backend = get_backend()
+    vector = query_cache.get(text, backend.version)
+    if vector is None:
+        vector = backend.encode_one(text)
+        query_cache.set(text, backend.version, vector)
+    return vector
+
+
+def item_text(item) -> str:
+    return f"{item.title} {item.description}"
+
+def pack_embedding(vector) -> bytes:
+    """Serializes a vector as raw float32 bytes for Item.embedding."""
+    return array('f', vector).tobytes()
+
+def unpack_embedding(blob) -> list:
+    vector = array('f')
+    vector.frombytes(bytes(blob))
+    return vector.tolist()
+
+def has_current_embedding(item, backend=None) -> bool:
+    backend = backend or get_backend()
+    return bool(item.embedding) and item.embedding_model == backend.version
+
+def get_item_embedding(item) -> list:
+    """
+    Returns the stored embedding for an item, encoding (and persisting it, for
+    saved items) only when it is missing or was produced by another model.
+    """
+    backend = get_backend()
+    if has_current_embedding(item, backend):
+        return unpack_embedding(item.embedding)
+    if not item.pk:
+        # Unsaved items are ad-hoc searches (AI Matches, match assistant).
+        return encode_query(item_text(item))
+    vector = backend.encode_one(item_text(item))
+    item.embedding = pack_embedding(vector)
+    item.embedding_model = backend.version
+    item.save(update_fields=['embedding', 'embedding_model'])
+    logger.debug(f"Stored embedding for item {item.pk} ({backend.version})")
+    return vector
+
+def get_corpus_matrix(items) -> np.ndarray:
+    """
+    Returns a contiguous float32 matrix with one row per item. Items without a
+    current embedding are encoded together in batched backend calls and written
+    back in a single bulk update.
+    """
+    from api.models import Item
+
+    backend = get_backend()
+    stale = [item for item in items if not has_current_embedding(item, backend)]
+    if stale:
+        for item, vector in zip(stale, backend.encode([item_text(item) for item in stale])):
+            item.embedding = pack_embedding(vector)
+            item.embedding_model = backend.version
+        Item.objects.bulk_update(stale, ['embedding', 'embedding_model'])
+        logger.info(f"Backfilled embeddings for {len(stale)} items ({backend.version})")
+    if not items:
+        return np.empty((0, 0), dtype=np.float32)
+    # Stored vectors are already float32 bytes, so the matrix is one buffer copy.
+    blob = b''.join(bytes(item.embedding) for item in items)
+    return np.frombuffer(blob, dtype=np.float32).reshape(len(items), -1)
+
+def encode_missing(batch_size=None) -> int:
+    """
+    Encodes and stores one batch of open items that have no current embedding;
+    returns how many were stored. Each batch is saved before the next starts.
+    """
+    from api.models import Item
+
+    backend = get_backend()
+    batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+    missing = list(
+        Item.objects.filter(status__in=('lost', 'found'), is_claimed=False)
+        .filter(Q(embedding=None) | ~Q(embedding_model=backend.version))
+        .only('id', 'title', 'description', 'embedding', 'embedding_model').order_by('id')[:batch_size]
+    )
+    if missing:
+        get_corpus_matrix(missing)
+    return len(missing)
+
+def backfill_embeddings(_item_id=None):
+    """
+    Job handler: stores the embeddings of items reported before the current
+    backend, one batch per run, so neither worker start-up nor a search pays
+    for encoding the whole corpus.
+    """
+    from api.jobs import enqueue
+
+    batch_size = settings.EMBEDDING_BATCH_SIZE
+    if encode_missing(batch_size) == batch_size:
+        enqueue('backfill_embeddings')
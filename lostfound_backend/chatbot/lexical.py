@@ -0,0 +1,114 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset(
+    "a an and are at for from has have i in is it its my of on or the this to was with".split()
+)
+
+
+def tokenize(text) -> list:
+    return [t for t in TOKEN_PATTERN.findall((text or '').lower()) if t not in STOP_WORDS]
+
+def item_document(item) -> str:
+    # The title is repeated so that it weighs more than a long description.
+    return f"{item.title} {item.title} {item.description} {item.location}"
+
+
+class BM25Index:
+    """
+    In-memory inverted index with Okapi BM25 ranking and incremental add/remove.
+    Normalized scores fall in [0, 1], which makes them usable as a fallback
+    similarity when embeddings are unavailable.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # term -> {doc_id: term frequency}
+        self.doc_terms = {}                # doc_id -> Counter of terms
+        self.doc_lengths = {}              # doc_id -> number of terms
+        self.total_length = 0
+        self.max_id = 0
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.doc_terms
+
+    def add(self, doc_id, text):
+        self.add_terms(doc_id, Counter(tokenize(text)))
+
+    def add_terms(self, doc_id, terms):
+        self.remove(doc_id)
+        self.doc_terms[doc_id] = terms
+        self.doc_lengths[doc_id] = sum(terms.values())
+        self.total_length += self.doc_lengths[doc_id]
+        for term, tf in terms.items():
+            self.postings[term][doc_id] = tf
+        self.max_id = max(self.max_id, doc_id)
+
+    def copy(self, doc_id, source):
+        """Takes ``doc_id``'s entry from another index, or drops it if ``source`` has none."""
+        if doc_id in source:
+            self.add_terms(doc_id, source.doc_terms[doc_id])
+        else:
+            self.remove(doc_id)
+
+    def remove(self, doc_id):
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return False
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        for term in terms:
+            docs = self.postings[term]
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[term]
+        return True
+
+    def idf(self, term):
+        n = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.doc_terms) - n + 0.5) / (n + 0.5))
+
+    def term_score(self, term, tf, length, avg_length):
+        norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+        return self.idf(term) * tf * (self.k1 + 1) / (tf + norm)
+
+    def search(self, query, k, normalized=False):
+        """
+        Returns ``(ids, scores)`` of the best ``k`` documents, best first. With
+        ``normalized`` the scores are divided by the score the query would get as
+        a document itself, so an identical item scores 1.0.
+        """
+        query_terms = Counter(tokenize(query))
+        if not query_terms or not self.doc_terms:
+            return [], np.empty(0, dtype=np.float32)
+
+        avg_length = self.total_length / len(self.doc_terms)
+        scores = defaultdict(float)
+        for term in query_terms:
+            for doc_id, tf in self.postings.get(term, {}).items():
+                scores[doc_id] += self.term_score(term, tf, self.doc_lengths[doc_id], avg_length)
+        if not scores:
+            return [], np.empty(0, dtype=np.float32)
+
+        ids = list(scores)
+        values = np.fromiter(scores.values(), dtype=np.float32, count=len(ids))
+        if len(values) > k:
+            best = np.argpartition(-values, k - 1)[:k]
+        else:
+            best = np.arange(len(values))
+        best = best[np.argsort(-values[best], kind='stable')]
+        values = values[best]
+        if normalized:
+            query_length = sum(query_terms.values())
+            self_score = sum(
+                self.term_score(term, tf, query_length, avg_length) for term, tf in query_terms.items()
+            )
+            values = np.minimum(values / self_score, 1.0)
+        return [ids[i] for i in best], values
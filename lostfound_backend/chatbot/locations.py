@@ -0,0 +1,103 @@
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SIMILARITY_THRESHOLD = 70  # token_set_ratio, same cut-off as before
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+ORDINAL_PATTERN = re.compile(r"^(\d+(st|nd|rd|th)?|ground|first|second|third|fourth|fifth|top|basement)$")
+# Words that describe where inside a place something was, not which place it was.
+NOISE_WORDS = frozenset(
+    "the a an near at in on inside outside behind beside next to by of floor level room rm "
+    "block bldg building area side corner entrance gate lobby hallway corridor".split()
+)
+
+
+def clean_location(text) -> str:
+    tokens = TOKEN_PATTERN.findall((text or '').lower())
+    return " ".join(t for t in tokens if t not in NOISE_WORDS and not ORDINAL_PATTERN.match(t))
+
+
+class LocationTable:
+    """
+    Maps free-text locations to canonical CampusLocation names via their aliases.
+    Unknown locations map to their cleaned text.
+    """
+
+    def __init__(self, locations):
+        self.names = set()
+        self.aliases = {}
+        for name, aliases in locations:
+            self.names.add(name)
+            for alias in [name, *aliases]:
+                key = clean_location(alias)
+                if key:
+                    self.aliases[key] = name
+        self.longest_alias = max((len(a.split()) for a in self.aliases), default=0)
+        self.canonical = lru_cache(maxsize=65536)(self._canonical)
+
+    def _canonical(self, text) -> str:
+        cleaned = clean_location(text)
+        if cleaned in self.aliases:
+            return self.aliases[cleaned]
+        # "library reading room" -> Library: try the longest alias phrases first.
+        tokens = cleaned.split()
+        for size in range(min(self.longest_alias, len(tokens)), 0, -1):
+            for start in range(len(tokens) - size + 1):
+                name = self.aliases.get(" ".join(tokens[start:start + size]))
+                if name:
+                    return name
+        return cleaned
+
+    def similar(self, location, candidates) -> np.ndarray:
+        """Boolean mask: which ``candidates`` are the same place as ``location``."""
+        mask = np.zeros(len(candidates), dtype=bool)
+        query = self.canonical(location)
+        if not query or not len(candidates):
+            return mask
+        keys = np.array([self.canonical(c) for c in candidates], dtype=object)
+        mask = keys == query
+        # Two different canonical places are never similar; fuzzy-match the rest in one batch.
+        unresolved = [
+            i for i, key in enumerate(keys)
+            if not mask[i] and key and not (query in self.names and key in self.names)
+        ]
+        if unresolved:
+            from rapidfuzz import fuzz, process
+
+            scores = process.cdist(
+                [query.lower()], [keys[i].lower() for i in unresolved], scorer=fuzz.token_set_ratio
+            )[0]
+            mask[np.asarray(unresolved)[scores > SIMILARITY_THRESHOLD]] = True
+        return mask
+
+
+_table = None
+_table_loaded_at = 0.0
+_table_lock = threading.Lock()
+
+def get_location_table() -> LocationTable:
+    """Process-wide table, reloaded from CampusLocation every LOCATION_TABLE_TTL seconds."""
+    global _table, _table_loaded_at
+    from api.models import CampusLocation
+
+    with _table_lock:
+        if _table is None or time.monotonic() - _table_loaded_at > settings.LOCATION_TABLE_TTL:
+            _table = LocationTable(CampusLocation.objects.values_list('name', 'aliases'))
+            _table_loaded_at = time.monotonic()
+            logger.debug(f"Loaded {len(_table.names)} campus locations")
+        return _table
+
+def reset_location_table():
+    global _table
+    with _table_lock:
+        _table = None
+
+def similar_locations(location, candidates) -> np.ndarray:
+    return get_location_table().similar(location, candidates)
@@ -1,13 +1,26 @@
 import logging
-import requests
+import numpy as np
 from api.models import Item
-from chatbot.nlp_utils import is_location_similar
-import os
+from chatbot.ann import registry
+from chatbot.embeddings import get_item_embedding
+from chatbot.lexical import item_document
+from chatbot.locations import similar_locations
 
 logger = logging.getLogger(__name__)
 
-HF_API_TOKEN = os.getenv("HF_API_TOKEN")
-HF_API_URL = "https://api-inference.huggingface.co/models/sentence-transformers/all-MiniLM-L6-v2"
+SEMANTIC_WEIGHT = 0.85
+LOCATION_BONUS = 0.15
+MATCH_THRESHOLD = 0.60
+TOP_K = 5
+# Nearest neighbours fetched from the ANN index before the location bonus is applied.
+CANDIDATE_POOL = 50
+# BM25 candidates that get an embedding similarity; bounds the per-match cost.
+LEXICAL_POOL = 300
+# Photos whose hashes differ in at most this many of 64 bits count as near-duplicates.
+IMAGE_RADIUS = 8
+# Added for an identical photo hash, falling off linearly to nothing just past IMAGE_RADIUS.
+# A (nearly) identical photo clears MATCH_THRESHOLD on its own; looser ones need the text to agree.
+IMAGE_BONUS = 0.70
 
 def mask_text(text: str, keep: int = 1) -> str:
     if not text or not text.strip():
@@ -17,69 +30,108 @@ def mask_text(text: str, keep: int = 1) -> str:
         return words[0] + " ***"
     return " ".join(words[:keep]) + " ***"
 
-def match_items(item: Item) -> list:
-    if not HF_API_TOKEN:
-        logger.error("Hugging Face API token not set.")
-        return []
+def thumbnail_url(item):
+    variants = item.image_variant_urls() or {}
+    return variants.get('thumb', {}).get('webp')
+
+def cosine_scores(query, matrix) -> np.ndarray:
+    """Cosine similarity of ``query`` against every row of ``matrix`` in one matrix-vector product."""
+    query = np.asarray(query, dtype=np.float32)
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    row_norms = np.linalg.norm(matrix, axis=1)
+    query_norm = np.linalg.norm(query)
+    if query_norm == 0 or matrix.shape[0] == 0:
+        return np.zeros(matrix.shape[0], dtype=np.float32)
+    row_norms[row_norms == 0] = np.inf
+    return (matrix @ query) / (row_norms * query_norm)
+
+def image_bonuses(distances) -> np.ndarray:
+    """Score bonus per candidate from its photo hash distance; NaN (no similar photo) gets none."""
+    distances = np.asarray(distances, dtype=np.float32)
+    return np.nan_to_num(IMAGE_BONUS * (1 - distances / (IMAGE_RADIUS + 1)), nan=0.0)
 
+def location_mask_for(location, items, base_scores) -> np.ndarray:
+    """
+    Marks candidates with a similar location. Only rows where the bonus could
+    still lift the score over the threshold are checked.
+    """
+    mask = np.zeros(len(items), dtype=bool)
+    reachable = np.flatnonzero(base_scores + LOCATION_BONUS >= MATCH_THRESHOLD)
+    if location and reachable.size:
+        mask[reachable] = similar_locations(location, [items[i].location for i in reachable])
+    return mask
+
+def top_k(final_scores, k=TOP_K, threshold=MATCH_THRESHOLD):
+    """Returns the indices of the best ``k`` scores over ``threshold``, best first."""
+    candidates = np.flatnonzero(final_scores >= threshold)
+    if candidates.size > k:
+        candidates = candidates[np.argpartition(-final_scores[candidates], k - 1)[:k]]
+    return candidates[np.argsort(-final_scores[candidates], kind='stable')]
+
+def match_items(item: Item) -> list:
     logger.info(f"Initiating semantic match for item ID: {item.id} ('{item.title}', Status: {item.status})")
     
     match_status = 'found' if item.status == 'lost' else 'lost'
-    item_text = f"{item.title} {item.description}"
-    all_items = Item.objects.exclude(id=item.id).filter(status=match_status, is_claimed=False)
-    
-    if not all_items.exists():
-        logger.info(f"No '{match_status}' items in the database to match against for item ID {item.id}.")
-        return []
 
+    # Stage 1: lexical candidates from the BM25 index, plus items with a near-identical photo.
+    lexical_ids, lexical_scores = registry.lexical_search(match_status, item_document(item), LEXICAL_POOL)
+    image_distances = {}
+    if getattr(item, 'image_hash', None) is not None:
+        image_distances = dict(registry.image_search(match_status, item.image_hash, IMAGE_RADIUS))
+    image_ids = list(image_distances)
+
+    # Stage 2: semantic rerank of the candidates plus the ANN neighbours,
+    # which catch paraphrases that share no words with the query.
     try:
-        match_item_texts = [f"{i.title} {i.description}" for i in all_items]
-        headers = {"Authorization": f"Bearer {HF_API_TOKEN}"}
-        
-        # Encode query
-        response = requests.post(HF_API_URL, headers=headers, json={"inputs": item_text})
-        response.raise_for_status()
-        query_embedding = response.json()
-        
-        # Encode corpus
-        corpus_embeddings = []
-        for text in match_item_texts:
-            response = requests.post(HF_API_URL, headers=headers, json={"inputs": text})
-            response.raise_for_status()
-            corpus_embeddings.append(response.json())
+        query_embedding = get_item_embedding(item)
+        ann_ids, _ = registry.search(match_status, query_embedding, CANDIDATE_POOL + 1)
+        candidate_ids, matrix = registry.vectors(match_status, list(dict.fromkeys(ann_ids + lexical_ids + image_ids)))
+        candidate_scores = cosine_scores(query_embedding, matrix)
+    except Exception as e:
+        logger.error(f"Semantic scoring failed for item {item.id}, falling back to lexical ranking: {e}")
+        candidate_ids, candidate_scores = lexical_ids, lexical_scores
+    # Photo matches without a stored embedding still compete on the photo alone.
+    scored = set(candidate_ids)
+    missing = [i for i in image_ids if i not in scored]
+    if missing:
+        candidate_ids = list(candidate_ids) + missing
+        candidate_scores = np.concatenate([np.asarray(candidate_scores, dtype=np.float32), np.zeros(len(missing))])
 
-        # Compute cosine similarities
-        semantic_scores = []
-        for emb in corpus_embeddings:
-            dot_product = sum(a * b for a, b in zip(query_embedding, emb))
-            norm_query = sum(x * x for x in query_embedding) ** 0.5
-            norm_emb = sum(x * x for x in emb) ** 0.5
-            score = dot_product / (norm_query * norm_emb) if norm_query * norm_emb != 0 else 0
-            semantic_scores.append(score)
+    # The indexes are process-local, so candidates are re-checked against the database.
+    open_items = Item.objects.filter(
+        id__in=[i for i in candidate_ids if i != item.id], status=match_status, is_claimed=False
+    ).only('id', 'title', 'location', 'image', 'image_variants', 'user_id').in_bulk()
+    all_items = [open_items[i] for i in candidate_ids if i in open_items]
 
-    except Exception as e:
-        logger.error(f"Error during semantic embedding/scoring for item {item.id}: {e}")
+    if not all_items:
+        logger.info(f"No '{match_status}' items in the database to match against for item ID {item.id}.")
         return []
+
+    semantic_scores = np.array(
+        [score for i, score in zip(candidate_ids, candidate_scores) if i in open_items], dtype=np.float32
+    )
+    base_scores = semantic_scores * SEMANTIC_WEIGHT + image_bonuses(
+        [image_distances.get(match_item.id, np.nan) for match_item in all_items]
+    )
+    location_mask = location_mask_for(item.location, all_items, base_scores)
+    final_scores = np.minimum(base_scores + np.where(location_mask, LOCATION_BONUS, 0.0), 1.0)
+    ranked_indices = top_k(final_scores)
     
-    matches = []
-    for i, match_item in enumerate(all_items):
-        semantic_score = semantic_scores[i]
-        location_score = 0.15 if is_location_similar(item.location, match_item.location) else 0.0
-        final_score = (semantic_score * 0.85) + location_score
-        
-        if final_score >= 0.60:
-            matches.append({
-                "item_id": match_item.id,
-                "score": round(final_score, 2),
-                "details": {
-                    "title_hint": mask_text(match_item.title),
-                    "location_hint": mask_text(match_item.location),
-                    "description_hint": "A potential match was found. Chat with the user to verify details.",
-                    "image": match_item.image.url if match_item.image else None,
-                    "owner_id": match_item.user.id
-                }
-            })
+    ranked_matches = []
+    for index in ranked_indices:
+        match_item = all_items[index]
+        ranked_matches.append({
+            "item_id": match_item.id,
+            "score": round(float(final_scores[index]), 2),
+            "details": {
+                "title_hint": mask_text(match_item.title),
+                "location_hint": mask_text(match_item.location),
+                "description_hint": "A potential match was found. Chat with the user to verify details.",
+                "image": match_item.image.url if match_item.image else None,
+                "thumbnail": thumbnail_url(match_item),
+                "owner_id": match_item.user_id
+            }
+        })
 
-    ranked_matches = sorted(matches, key=lambda x: x['score'], reverse=True)[:5]
     logger.info(f"Found {len(ranked_matches)} potential semantic matches for item ID: {item.id}")
-    return ranked_matches
\ No newline at end of file
+    return ranked_matches
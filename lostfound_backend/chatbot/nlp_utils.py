@@ -1,16 +1,25 @@
-import spacy
-from fuzzywuzzy import fuzz
+from functools import lru_cache
 
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    print("Downloading spaCy model 'en_core_web_sm'...")
-    from spacy.cli import download
-    download("en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
+SPACY_MODEL = "en_core_web_sm"
+
+@lru_cache(maxsize=None)
+def get_nlp():
+    """
+    Loads the spaCy pipeline on first use instead of at import time. The model
+    is installed at build time (python -m spacy download en_core_web_sm); it is
+    never downloaded from inside a web worker.
+    """
+    import spacy
+
+    try:
+        return spacy.load(SPACY_MODEL)
+    except OSError as e:
+        raise OSError(
+            f"spaCy model '{SPACY_MODEL}' is not installed. Run: python -m spacy download {SPACY_MODEL}"
+        ) from e
 
 def extract_keywords(text):
-    doc = nlp(text)
+    doc = get_nlp()(text)
     # This is still useful for other tasks, so we keep it
     return [token.lemma_ for token in doc if token.pos_ in ("NOUN", "PROPN") and not token.is_stop]
 
@@ -18,8 +27,10 @@ def is_location_similar(loc1, loc2):
     """
     Checks if two location strings are reasonably similar.
     e.g., "Main Library" and "Library" should be considered similar.
+    Locations are resolved through the campus location table first; see chatbot.locations.
     """
+    from chatbot.locations import similar_locations
+
     if not loc1 or not loc2:
         return False
-    # Use a fuzzy string matching ratio
-    return fuzz.token_set_ratio(loc1.lower(), loc2.lower()) > 70 # 70% similarity threshold
\ No newline at end of file
+    return bool(similar_locations(loc1, [loc2])[0])
\ No newline at end of file
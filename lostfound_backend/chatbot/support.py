@@ -0,0 +1,310 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from chatbot.embeddings import encode_query
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "You are 'Refind AI', the official support assistant for the Refind web application. "
+    "Your knowledge is STRICTLY limited to the features of the Refind app. Do NOT invent features like 'help desks', 'tickets', or 'premium plans'. "
+    "Your tone is helpful, professional, and very concise.\n\n"
+    "Here is the complete feature set of the Refind application:\n"
+    "1. Users can sign up and log in.\n"
+    "2. From their Dashboard, users can report a 'Lost Item' or a 'Found Item'.\n"
+    "3. The Dashboard shows statistics and a list of recently reported items.\n"
+    "4. The 'AI Matches' page allows users to manually search for items that match a description.\n"
+    "5. When a user reports a 'Lost Item', the system automatically searches for matches and sends an email if a high-confidence match is found.\n"
+    "6. Users can view the masked details of an item and initiate a private 'Chat' with the item's reporter to verify ownership.\n"
+    "7. For all other support, users must contact the team directly via email at refindaiapp@gmail.com. This is the ONLY contact method.\n\n"
+    "Based ONLY on this information, answer the user's query."
+)
+COMPLETION_OPTIONS = {
+    'temperature': 0.5,  # Slightly lower temperature for more factual answers
+    'max_tokens': 256,   # Reduced max tokens for conciseness
+    'top_p': 1,
+}
+
+
+class SupportUnavailable(Exception):
+    """Raised when the Groq API cannot answer."""
+
+
+def prompt_version():
+    """Identifies the prompt and model answers are generated with; part of every cache key."""
+    return hashlib.sha1(f"{settings.GROQ_MODEL}|{SYSTEM_PROMPT}".encode()).hexdigest()[:12]
+
+@lru_cache(maxsize=1)
+def get_client(api_key):
+    """
+    One Groq client per process, so its connection pool (and the TLS session
+    to the API) is reused across requests.
+    """
+    from groq import Groq
+
+    return Groq(api_key=api_key, base_url=settings.GROQ_BASE_URL, timeout=settings.GROQ_TIMEOUT, max_retries=1)
+
+# event loop -> AsyncGroq; an async connection pool cannot be shared between loops.
+async_clients = weakref.WeakKeyDictionary()
+
+def get_async_client(api_key):
+    """The streaming counterpart of get_client: one client per event loop."""
+    from groq import AsyncGroq
+
+    loop = asyncio.get_running_loop()
+    client = async_clients.get(loop)
+    if client is None or client.api_key != api_key:
+        client = async_clients[loop] = AsyncGroq(
+            api_key=api_key, base_url=settings.GROQ_BASE_URL, timeout=settings.GROQ_TIMEOUT, max_retries=1
+        )
+    return client
+
+def completion_messages(query):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": query},
+    ]
+
+def ask_groq(query) -> str:
+    api_key = settings.GROQ_API_KEY
+    if not api_key:
+        raise SupportUnavailable("GROQ_API_KEY is not configured.")
+    try:
+        completion = get_client(api_key).chat.completions.create(
+            model=settings.GROQ_MODEL, messages=completion_messages(query), stream=False, **COMPLETION_OPTIONS
+        )
+    except Exception as e:
+        raise SupportUnavailable(str(e)) from e
+    return completion.choices[0].message.content
+
+
+class SupportAnswerCache:
+    """
+    Cached chatbot answers, tagged with the prompt version they came from.
+
+    Exact tier: keyed by normalized question, a bounded in-process LRU in
+    front of the shared Django cache. Semantic tier: the embeddings of
+    recently answered questions in this process; a new question whose cosine
+    similarity to one of them reaches ``similarity`` gets its answer.
+    Entries expire after ``ttl`` seconds, and everything cached under another
+    prompt version is dropped on first sight.
+    """
+
+    def __init__(self, max_size=512, ttl=21600, similarity=0.92):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity = similarity
+        self.version = None
+        self.entries = OrderedDict()  # key -> (expires_at, answer)
+        self.questions = OrderedDict()  # key -> (expires_at, unit vector, answer)
+        self.matrix = None  # stacked vectors of ``questions``, None when dirty
+        self.answers = []
+        self.matrix_expires_at = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text):
+        return " ".join((text or '').lower().replace('?', ' ').split())
+
+    def key(self, text, version):
+        digest = hashlib.sha1(f"{version}|{self.normalize(text)}".encode()).hexdigest()
+        return f"support-answer:{digest}"
+
+    def check_version(self, version):
+        # Called with the lock held.
+        if version != self.version:
+            if self.version is not None:
+                logger.info(f"Support prompt changed ({self.version} -> {version}), dropping cached answers")
+            self.version = version
+            self.entries.clear()
+            self.questions.clear()
+            self.matrix = None
+
+    def get(self, text, version):
+        """The answer cached for exactly this (normalized) question, or None."""
+        key = self.key(text, version)
+        now = time.monotonic()
+        with self.lock:
+            self.check_version(version)
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self.entries[key]
+        answer = cache.get(key)
+        if answer is not None:
+            self.remember(key, answer)
+            with self.lock:
+                self.shared_hits += 1
+        return answer
+
+    def similar(self, vector, version):
+        """The answer to the most similar earlier question, if it is similar enough; None otherwise."""
+        with self.lock:
+            self.check_version(version)
+            answer = self.nearest(vector) if vector is not None else None
+            if answer is None:
+                self.misses += 1
+            else:
+                self.semantic_hits += 1
+            return answer
+
+    def nearest(self, vector):
+        # Called with the lock held.
+        if self.matrix is None:
+            now = time.monotonic()
+            for key in [key for key, entry in self.questions.items() if entry[0] <= now]:
+                del self.questions[key]
+            if not self.questions:
+                return None
+            self.matrix = np.vstack([entry[1] for entry in self.questions.values()])
+            self.answers = [entry[2] for entry in self.questions.values()]
+            self.matrix_expires_at = min(entry[0] for entry in self.questions.values())
+        scores = self.matrix @ unit(vector)
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity:
+            return None
+        answer = self.answers[best]
+        if self.matrix_expires_at <= time.monotonic():
+            # Something expired; rebuild without it and look again.
+            self.matrix = None
+            return self.nearest(vector)
+        return answer
+
+    def set(self, text, version, answer, vector=None):
+        key = self.key(text, version)
+        cache.set(key, answer, self.ttl)
+        self.remember(key, answer)
+        if vector is None:
+            return
+        with self.lock:
+            if version != self.version:
+                return
+            self.questions[key] = (time.monotonic() + self.ttl, unit(vector), answer)
+            self.questions.move_to_end(key)
+            while len(self.questions) > self.max_size:
+                self.questions.popitem(last=False)
+            self.matrix = None
+
+    def remember(self, key, answer):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, answer)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.shared_hits + self.semantic_hits + self.misses
+            return {
+                'size': len(self.entries),
+                'questions': len(self.questions),
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'semantic_hits': self.semantic_hits,
+                'misses': self.misses,
+                'hit_ratio': round((lookups - self.misses) / lookups, 3) if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self.lock:
+            self.version = None
+            self.entries.clear()
+            self.questions.clear()
+            self.matrix = None
+            self.hits = self.shared_hits = self.semantic_hits = self.misses = 0
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+answer_cache = SupportAnswerCache(
+    max_size=settings.SUPPORT_ANSWER_CACHE_SIZE,
+    ttl=settings.SUPPORT_ANSWER_CACHE_TTL,
+    similarity=settings.SUPPORT_ANSWER_SIMILARITY,
+)
+
+def question_vector(query):
+    # The semantic tier is an optimisation; without embeddings only exact repeats hit.
+    try:
+        return encode_query(query)
+    except Exception as e:
+        logger.warning(f"Could not embed support question, skipping the semantic cache: {str(e)}")
+        return None
+
+def cached_answer(query, version):
+    """Returns ``(answer, vector)``; ``answer`` is None on a cache miss, ``vector`` is the question's embedding if it was needed."""
+    cached = answer_cache.get(query, version)
+    if cached is not None:
+        return cached, None
+    vector = question_vector(query)
+    return answer_cache.similar(vector, version), vector
+
+def answer(query):
+    """
+    Returns ``(answer, cached)`` for a support question, calling Groq only
+    when no cached answer fits. Raises SupportUnavailable.
+    """
+    version = prompt_version()
+    cached, vector = cached_answer(query, version)
+    if cached is not None:
+        return cached, True
+    response_text = ask_groq(query)
+    answer_cache.set(query, version, response_text, vector)
+    return response_text, False
+
+async def stream_answer(query):
+    """
+    Yields the answer to a support question as it is generated: a cached
+    answer in one piece, otherwise Groq's completion chunk by chunk. The
+    complete answer is cached afterwards. Raises SupportUnavailable.
+    """
+    version = prompt_version()
+    cached, vector = await sync_to_async(cached_answer)(query, version)
+    if cached is not None:
+        yield cached
+        return
+    api_key = settings.GROQ_API_KEY
+    if not api_key:
+        raise SupportUnavailable("GROQ_API_KEY is not configured.")
+
+    parts = []
+    try:
+        stream = await get_async_client(api_key).chat.completions.create(
+            model=settings.GROQ_MODEL, messages=completion_messages(query), stream=True, **COMPLETION_OPTIONS
+        )
+    except Exception as e:
+        raise SupportUnavailable(str(e)) from e
+    try:
+        async for chunk in stream:
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                parts.append(text)
+                yield text
+    except Exception as e:
+        raise SupportUnavailable(str(e)) from e
+    finally:
+        # Also reached when the client disconnects; frees the upstream connection.
+        await stream.close()
+    if parts:
+        await sync_to_async(answer_cache.set)(query, version, "".join(parts), vector)
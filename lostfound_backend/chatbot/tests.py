@@ -1,3 +1,644 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api import jobs
+from api.models import BackgroundJob, CustomUser, Item
+from chatbot import embeddings, support
+from chatbot.ann import IVFIndex, recall_at_k, registry
+from chatbot.bktree import BKTree, hamming
+from chatbot.lexical import BM25Index
+from chatbot.locations import LocationTable, reset_location_table, similar_locations
+from chatbot.embeddings import HashingBackend
+from chatbot.matching import IMAGE_RADIUS, cosine_scores, match_items, top_k
+from chatbot.support import get_client
+from chatbot.warmup import build_indexes
+
+
+class EncodeCounter:
+    """Wraps HashingBackend.encode to count backend calls and encoded texts."""
+
+    def __init__(self):
+        self.calls = 0
+        self.texts = 0
+        self.original = HashingBackend.encode
+
+    def __call__(self, backend, texts):
+        self.calls += 1
+        self.texts += len(texts)
+        return self.original(backend, texts)
+
+    def reset(self):
+        self.calls = self.texts = 0
+
+
+@override_settings(EMBEDDING_BACKEND='hashing')
+class EmbeddingTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='owner@example.com', username='owner', name='Owner', student_id='S1', password='password123'
+        )
+        self.other = CustomUser.objects.create_user(
+            email='finder@example.com', username='finder', name='Finder', student_id='S2', password='password123'
+        )
+        registry.clear()
+        self.addCleanup(registry.clear)
+        embeddings.query_cache.clear()
+        cache.clear()
+        self.counter = EncodeCounter()
+        patcher = mock.patch.object(HashingBackend, 'encode', autospec=True, side_effect=self.counter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_item(self, **kwargs):
+        return Item.objects.create(user=kwargs.pop('user', self.user), **kwargs)
+
+
+class ItemEmbeddingTests(EmbeddingTestCase):
+    def test_corpus_is_encoded_once(self):
+        self.create_item(title='Black wallet', description='leather', status='found', user=self.other)
+        self.create_item(title='Blue umbrella', description='folding', status='found', user=self.other)
+        lost = self.create_item(title='Black wallet', description='leather', status='lost')
+
+        match_items(lost)
+        self.assertEqual(self.counter.texts, 3)
+
+        self.counter.reset()
+        match_items(Item.objects.get(id=lost.id))
+        self.assertEqual(self.counter.texts, 0)
+
+        self.counter.reset()
+        match_items(Item(title='wallet', description='wallet', status='lost', user=self.user))
+        self.assertEqual(self.counter.texts, 1)
+
+    def test_text_change_drops_embedding(self):
+        item = self.create_item(title='Keys', description='car keys', status='lost')
+        embeddings.get_item_embedding(item)
+
+        item = Item.objects.get(id=item.id)
+        self.assertTrue(embeddings.has_current_embedding(item))
+        item.location = 'Library'
+        item.save()
+        self.assertTrue(embeddings.has_current_embedding(Item.objects.get(id=item.id)))
+
+        item.description = 'house keys'
+        item.save()
+        self.assertFalse(embeddings.has_current_embedding(Item.objects.get(id=item.id)))
+
+    def test_other_model_version_is_reencoded(self):
+        item = self.create_item(title='Phone', description='cracked screen', status='found')
+        Item.objects.filter(id=item.id).update(
+            embedding=embeddings.pack_embedding([1.0] * 384), embedding_model='hf:old-model'
+        )
+        embeddings.get_item_embedding(Item.objects.get(id=item.id))
+        self.assertEqual(self.counter.texts, 1)
+        self.assertEqual(Item.objects.get(id=item.id).embedding_model, embeddings.get_backend().version)
+
+
+class EmbeddingBackendTests(EmbeddingTestCase):
+    def test_corpus_backfill_is_one_batched_call(self):
+        for n in range(10):
+            self.create_item(title=f'Umbrella {n}', description='black', status='found', user=self.other)
+        match_items(self.create_item(title='Black umbrella', description='', status='lost'))
+        # One call for the query, one for the whole corpus.
+        self.assertEqual(self.counter.calls, 2)
+        self.assertEqual(self.counter.texts, 11)
+
+    def test_hashing_backend_is_deterministic(self):
+        backend = embeddings.get_backend()
+        first, second = backend.encode(['black leather wallet', 'black leather wallet'])
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), embeddings.EMBEDDING_DIM)
+
+    @override_settings(EMBEDDING_BACKEND='huggingface', HF_API_TOKEN=None)
+    def test_missing_token_is_an_error(self):
+        with self.assertRaises(embeddings.EmbeddingError):
+            embeddings.get_backend()
+
+
+class VectorScoringTests(TestCase):
+    def test_cosine_scores_match_python_loop(self):
+        rng = np.random.default_rng(0)
+        matrix = rng.normal(size=(50, 384)).astype(np.float32)
+        query = rng.normal(size=384).astype(np.float32)
+        expected = [
+            float(np.dot(query, row) / (np.linalg.norm(query) * np.linalg.norm(row))) for row in matrix
+        ]
+        np.testing.assert_allclose(cosine_scores(query, matrix), expected, rtol=1e-5)
+
+    def test_zero_vectors_score_zero(self):
+        matrix = np.zeros((3, 4), dtype=np.float32)
+        self.assertEqual(cosine_scores([1, 0, 0, 0], matrix).tolist(), [0.0, 0.0, 0.0])
+        self.assertEqual(cosine_scores([0, 0, 0, 0], np.eye(4)).tolist(), [0.0] * 4)
+
+    def test_top_k_applies_threshold_and_order(self):
+        scores = np.array([0.1, 0.9, 0.65, 0.7, 0.59, 0.95, 0.61, 0.8], dtype=np.float32)
+        self.assertEqual(top_k(scores, k=3, threshold=0.6).tolist(), [5, 1, 7])
+        self.assertEqual(top_k(scores, k=10, threshold=0.9).tolist(), [5, 1])
+
+
+class IVFIndexTests(TestCase):
+    def clustered(self, n, dim=64, clusters=40, seed=0):
+        rng = np.random.default_rng(seed)
+        centers = rng.normal(size=(clusters, dim))
+        labels = rng.integers(0, clusters, size=n)
+        return (centers[labels] + 0.3 * rng.normal(size=(n, dim))).astype(np.float32)
+
+    def test_recall_at_5_against_brute_force(self):
+        matrix = self.clustered(6000)
+        queries = self.clustered(200, seed=1)
+        ids = list(range(1, len(matrix) + 1))
+        index = IVFIndex(nprobe=8, brute_force_limit=1000)
+        index.build(ids, matrix)
+        self.assertIsNotNone(index.centroids)
+        self.assertGreaterEqual(recall_at_k(index, ids, matrix, queries, k=5), 0.9)
+
+    def test_small_index_is_exact(self):
+        matrix = self.clustered(300)
+        ids = list(range(1, 301))
+        index = IVFIndex(brute_force_limit=1000)
+        index.build(ids, matrix)
+        self.assertEqual(recall_at_k(index, ids, matrix, matrix[:20], k=5), 1.0)
+
+    def test_incremental_add_and_remove(self):
+        matrix = self.clustered(3000)
+        index = IVFIndex(brute_force_limit=500)
+        index.build(list(range(1, 3001)), matrix)
+        target = matrix[42]
+        self.assertEqual(index.search(target, 1)[0], [43])
+
+        self.assertTrue(index.remove(43))
+        self.assertNotIn(43, index)
+        self.assertNotIn(43, index.search(target, 5)[0])
+        self.assertEqual(len(index), 2999)
+
+        index.add(9999, target)
+        self.assertEqual(index.search(target, 1)[0], [9999])
+
+
+class IndexRegistryTests(EmbeddingTestCase):
+    def test_claimed_and_flipped_items_leave_the_index(self):
+        wallet = self.create_item(title='Black wallet', description='leather', status='found', user=self.other)
+        query = Item(title='Black wallet', description='leather', status='lost', user=self.user)
+        self.assertEqual([m['item_id'] for m in match_items(query)], [wallet.id])
+
+        wallet.is_claimed = True
+        wallet.status = 'claimed'
+        wallet.save()
+        registry.sync_item(wallet)
+        self.assertNotIn(wallet.id, registry.get('found'))
+        self.assertEqual(match_items(query), [])
+
+    def test_edited_items_drop_their_stale_vector(self):
+        wallet = self.create_item(title='Black wallet', description='leather', status='found', user=self.other)
+        query = Item(title='Black wallet', description='leather', status='lost', user=self.user)
+        self.assertEqual([m['item_id'] for m in match_items(query)], [wallet.id])
+
+        api = APIClient()
+        api.force_authenticate(self.other)
+        response = api.patch(f'/api/items/{wallet.id}/', {'title': 'Red umbrella', 'description': 'folding'}, format='multipart')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertNotIn(wallet.id, registry.get('found'))
+        self.assertEqual(match_items(query), [])
+
+    def test_expired_index_is_rebuilt_off_the_request_path(self):
+        wallet = self.create_item(title='Black wallet', description='leather', status='found', user=self.other)
+        umbrella = self.create_item(title='Umbrella', description='black', status='found', user=self.other)
+        old = registry.get('found')
+        registry.built_at['found'] = 0  # expired
+
+        with mock.patch.object(registry, 'start_rebuild') as start_rebuild:
+            self.assertIs(registry.get('found'), old)
+            self.assertIs(registry.get('found'), old)
+        start_rebuild.assert_called_once_with('found')
+
+        # The replacement was loaded before the umbrella was claimed; the change survives the swap.
+        snapshot = registry.load('found')
+        umbrella.is_claimed = True
+        umbrella.save()
+        registry.sync_item(umbrella)
+        with mock.patch.object(registry, 'load_key', return_value=snapshot):
+            registry.rebuild('found', registry.generation)
+
+        new = registry.get('found')
+        self.assertIsNot(new, old)
+        self.assertIn(wallet.id, new)
+        self.assertNotIn(umbrella.id, new)
+        self.assertEqual(registry.rebuilding, {})
+        self.assertFalse(registry.expired('found'))
+
+    def test_expired_lexical_and_photo_indexes_are_rebuilt_off_the_request_path(self):
+        wallet = self.create_item(title='Black wallet', status='found', user=self.other, image_hash=0b1011)
+        umbrella = self.create_item(title='Umbrella', status='found', user=self.other, image_hash=0b1111)
+        for key, get in ((('lexical', 'found'), registry.get_lexical), (('images', 'found'), registry.get_images)):
+            with self.subTest(key=key):
+                old = get('found')
+                registry.built_at[key] = 0  # expired
+                with mock.patch.object(registry, 'start_rebuild') as start_rebuild:
+                    self.assertIs(get('found'), old)
+                start_rebuild.assert_called_once_with(key)
+
+                # Loaded before the umbrella was claimed; the change survives the swap.
+                snapshot = registry.load_key(key)
+                umbrella.is_claimed = True
+                umbrella.save()
+                registry.sync_item(umbrella)
+                with mock.patch.object(registry, 'load_key', return_value=snapshot):
+                    registry.rebuild(key, registry.generation)
+
+                new = get('found')
+                self.assertIsNot(new, old)
+                self.assertIn(wallet.id, new)
+                self.assertNotIn(umbrella.id, new)
+                self.assertFalse(registry.expired(key))
+                Item.objects.filter(id=umbrella.id).update(is_claimed=False)
+                umbrella.is_claimed = False
+        self.assertEqual(registry.rebuilding, {})
+
+    @override_settings(EMBEDDING_BATCH_SIZE=2)
+    def test_warmup_only_loads_stored_vectors(self):
+        wallet = self.create_item(title='Black wallet', description='leather', status='found', user=self.other)
+        embeddings.get_item_embedding(wallet)
+        others = [self.create_item(title=f'Umbrella {i}', status='found', user=self.other) for i in range(3)]
+        self.counter.reset()
+
+        build_indexes()
+        self.assertEqual(self.counter.texts, 0)
+        self.assertIn(wallet.id, registry.get('found'))
+        self.assertNotIn(others[0].id, registry.get('found'))
+        self.assertTrue(BackgroundJob.objects.filter(kind='backfill_embeddings', status='pending').exists())
+
+        # One batch per job run; it queues itself again until the corpus is done.
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(self.counter.calls, 1)
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(jobs.run_pending(), 0)
+        self.assertFalse(Item.objects.filter(embedding=None).exists())
+
+    def test_new_items_are_encoded_without_holding_the_lock(self):
+        self.create_item(title='Umbrella', description='black', status='found', user=self.other)
+        index = registry.get('found')
+        phone = self.create_item(title='Phone', description='cracked screen', status='found', user=self.other)
+        keys = self.create_item(title='Keys', description='red ring', status='found', user=self.other)
+        encode = embeddings.get_corpus_matrix
+        lock_free = []
+
+        def take_lock():
+            if registry.lock.acquire(timeout=1):
+                registry.lock.release()
+                lock_free.append(True)
+
+        def slow_encode(items):
+            # Another search thread could take the lock, and a claim synced meanwhile is kept.
+            probe = threading.Thread(target=take_lock)
+            probe.start()
+            probe.join()
+            keys.is_claimed = True
+            keys.save()
+            registry.sync_item(keys)
+            return encode(items)
+
+        with mock.patch('chatbot.ann.get_corpus_matrix', side_effect=slow_encode):
+            self.assertIs(registry.get('found'), index)
+        self.assertEqual(lock_free, [True])
+        self.assertIn(phone.id, index)
+        self.assertNotIn(keys.id, index)
+
+    def test_items_created_elsewhere_are_picked_up(self):
+        self.create_item(title='Umbrella', description='black', status='found', user=self.other)
+        registry.get('found')
+        # Simulates a report created by another worker process.
+        phone = self.create_item(title='Phone', description='cracked screen', status='found', user=self.other)
+        self.assertIn(phone.id, registry.get('found'))
+
+
+class BM25IndexTests(TestCase):
+    def setUp(self):
+        self.index = BM25Index()
+        self.index.add(1, 'Black leather wallet near the library')
+        self.index.add(2, 'Blue umbrella left in the cafeteria')
+        self.index.add(3, 'Student ID card and black lanyard')
+
+    def test_ranks_by_shared_terms(self):
+        ids, scores = self.index.search('black wallet', 3)
+        self.assertEqual(ids[0], 1)
+        self.assertNotIn(2, ids)
+        self.assertTrue(all(0 < s <= 1 for s in self.index.search('black wallet', 3, normalized=True)[1]))
+
+    def test_remove(self):
+        self.assertTrue(self.index.remove(1))
+        self.assertEqual(self.index.search('wallet', 3)[0], [])
+        self.assertEqual(self.index.search('black', 3)[0], [3])
+
+
+class TwoStageMatchingTests(EmbeddingTestCase):
+    def test_falls_back_to_lexical_ranking_when_embeddings_fail(self):
+        wallet = self.create_item(title='Black wallet', description='leather wallet', status='found', user=self.other)
+        self.create_item(title='Blue umbrella', description='folding', status='found', user=self.other)
+        query = Item(title='Black wallet', description='leather wallet', status='lost', user=self.user)
+        with mock.patch('chatbot.matching.get_item_embedding', side_effect=embeddings.EmbeddingError('down')):
+            matches = match_items(query)
+        self.assertEqual([m['item_id'] for m in matches], [wallet.id])
+
+
+class BKTreeTests(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        # Signed, like the values stored in Item.image_hash.
+        self.hashes = {i: int(h) for i, h in enumerate(rng.integers(-2**63, 2**63 - 1, size=500, dtype=np.int64), 1)}
+        self.tree = BKTree()
+        for item_id, value in self.hashes.items():
+            self.tree.add(item_id, value)
+
+    def brute_force(self, value, radius):
+        return sorted(
+            ((i, hamming(h, value)) for i, h in self.hashes.items() if hamming(h, value) <= radius),
+            key=lambda pair: (pair[1], pair[0]),
+        )
+
+    def test_radius_search_matches_brute_force(self):
+        for item_id in (1, 77, 400):
+            query = self.hashes[item_id] ^ 0b1011  # three bits flipped
+            self.assertEqual(self.tree.search(query, 12), self.brute_force(query, 12))
+            self.assertEqual(self.tree.search(query, 3)[0], (item_id, 3))
+
+    def test_remove_and_duplicates(self):
+        self.tree.add(501, self.hashes[1])
+        self.assertEqual(self.tree.search(self.hashes[1], 0), [(1, 0), (501, 0)])
+        for item_id in range(1, 400):
+            self.tree.remove(item_id)
+            del self.hashes[item_id]
+        self.hashes[501] = self.tree.hashes[501]
+        self.assertLess(self.tree.nodes, 2 * len(self.tree) + 65)
+        query = self.hashes[450]
+        self.assertEqual(self.tree.search(query, 20), self.brute_force(query, 20))
+
+
+class PhotoMatchingTests(EmbeddingTestCase):
+    def test_near_duplicate_photos_match_despite_different_text(self):
+        photo_hash = 0x5A5A_F0F0_1234_ABCD
+        found = self.create_item(
+            title='Gadget', description='left on a bench', status='found', user=self.other, image_hash=photo_hash ^ 0b1,
+        )
+        self.create_item(
+            title='Thing', description='by the door', status='found', user=self.other, image_hash=~photo_hash,
+        )
+        query = Item(title='Headphones', description='over-ear', status='lost', user=self.user, image_hash=photo_hash)
+        self.assertEqual(registry.image_search('found', photo_hash, IMAGE_RADIUS), [(found.id, 1)])
+        self.assertEqual([m['item_id'] for m in match_items(query)], [found.id])
+
+        found.image_hash = None
+        found.save()
+        registry.sync_item(found)
+        self.assertEqual(match_items(query), [])
+
+
+class QueryEmbeddingCacheTests(EmbeddingTestCase):
+    def test_repeated_queries_skip_the_backend(self):
+        embeddings.encode_query('Black  Wallet')
+        embeddings.encode_query('black wallet')
+        self.assertEqual(self.counter.texts, 1)
+        self.assertEqual(embeddings.query_cache.stats()['hits'], 1)
+
+    def test_shared_tier_serves_other_workers(self):
+        vector = embeddings.encode_query('airpods')
+        embeddings.query_cache.entries.clear()  # another worker has an empty LRU
+        self.assertEqual(embeddings.encode_query('airpods'), vector)
+        self.assertEqual(self.counter.texts, 1)
+        self.assertEqual(embeddings.query_cache.stats()['shared_hits'], 1)
+
+    def test_lru_is_bounded(self):
+        small = embeddings.QueryEmbeddingCache(max_size=2)
+        for text in ('a', 'b', 'c'):
+            small.set(text, 'v1', [1.0])
+        self.assertEqual(len(small.entries), 2)
+        self.assertNotIn(small.key('a', 'v1'), small.entries)
+
+    def test_model_version_is_part_of_the_key(self):
+        self.assertNotEqual(
+            embeddings.query_cache.key('wallet', 'hf:a'), embeddings.query_cache.key('wallet', 'hf:b')
+        )
+
+
+class LocationSimilarityTests(TestCase):
+    def setUp(self):
+        reset_location_table()
+        self.addCleanup(reset_location_table)
+        self.table = LocationTable([('Library', ['lib', 'main library']), ('Cafeteria', ['canteen'])])
+
+    def test_aliases_resolve_to_one_place(self):
+        for text in ('Main Library', 'library 2nd floor', 'lib', 'near the LIB entrance'):
+            self.assertEqual(self.table.canonical(text), 'Library', text)
+        self.assertEqual(self.table.canonical('Physics Lab 3'), 'physics lab')
+
+    def test_batched_mask(self):
+        mask = self.table.similar(
+            'lib', ['Main Library', 'Canteen', '', 'library ground floor', 'Physics Lab']
+        )
+        self.assertEqual(mask.tolist(), [True, False, False, True, False])
+
+    def test_unknown_places_use_fuzzy_matching(self):
+        mask = self.table.similar('Physics Lab', ['physics lab room 2', 'chemistry lab', 'Library'])
+        self.assertEqual(mask.tolist(), [True, False, False])
+
+    def test_table_is_loaded_from_campus_locations(self):
+        # Seeded by migration 0006.
+        self.assertEqual(similar_locations('canteen', ['food court', 'parking']).tolist(), [True, False])
+
+
+class FakeGroq:
+    """Stands in for the Groq client; answers with a counter so reused answers are visible."""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+        self.chat = mock.Mock()
+        self.chat.completions.create.side_effect = self.create
+
+    def create(self, **kwargs):
+        if self.fail:
+            raise ConnectionError('groq is down')
+        self.calls.append(kwargs)
+        message = mock.Mock(content=f"Answer {len(self.calls)}")
+        return mock.Mock(choices=[mock.Mock(message=message)])
+
+
+@override_settings(GROQ_API_KEY='test-key')
+class SupportAnswerCacheTests(EmbeddingTestCase):
+    def setUp(self):
+        super().setUp()
+        support.answer_cache.clear()
+        self.addCleanup(support.answer_cache.clear)
+        self.groq = FakeGroq()
+        patcher = mock.patch.object(support, 'get_client', return_value=self.groq)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.api = APIClient()
+
+    def ask(self, query):
+        return self.api.post('/api/chat/support/', {'query': query}, format='json')
+
+    def test_repeated_questions_skip_groq(self):
+        first = self.ask('How do I report a lost item?')
+        self.assertEqual(first.json(), {'message': 'Answer 1'})
+        self.assertEqual(self.groq.calls[0]['messages'][0]['content'], support.SYSTEM_PROMPT)
+
+        self.assertEqual(self.ask('how do i  report a lost item').json(), {'message': 'Answer 1'})
+        support.answer_cache.entries.clear()  # another worker only has the shared tier
+        self.assertEqual(self.ask('How do I report a lost item?').json(), {'message': 'Answer 1'})
+        self.assertEqual(len(self.groq.calls), 1)
+        stats = support.answer_cache.stats()
+        self.assertEqual((stats['hits'], stats['shared_hits']), (1, 1))
+
+    def test_similar_questions_share_an_answer(self):
+        with mock.patch.object(support.answer_cache, 'similarity', 0.7):
+            self.ask('How do I report a lost item?')
+            self.assertEqual(self.ask('How can I report my lost item?').json(), {'message': 'Answer 1'})
+            self.assertEqual(self.ask('How do I chat with the finder?').json(), {'message': 'Answer 2'})
+        self.assertEqual(support.answer_cache.stats()['semantic_hits'], 1)
+
+    def test_prompt_change_invalidates_answers(self):
+        self.ask('How do I report a lost item?')
+        with override_settings(GROQ_MODEL='another-model'):
+            self.assertEqual(self.ask('How do I report a lost item?').json(), {'message': 'Answer 2'})
+        self.assertEqual(len(support.answer_cache.entries), 1)
+
+    def test_failures_are_not_cached(self):
+        self.groq.fail = True
+        self.assertEqual(self.ask('How do I report a lost item?').status_code, 503)
+        self.groq.fail = False
+        self.assertEqual(self.ask('How do I report a lost item?').json(), {'message': 'Answer 1'})
+
+    def test_expired_answers_are_dropped(self):
+        expiring = support.SupportAnswerCache(ttl=0, similarity=0.5)
+        expiring.set('report a lost item', 'v1', 'Answer', vector=[1.0, 0.0])
+        self.assertIsNone(expiring.get('report a lost item', 'v1'))
+        self.assertIsNone(expiring.similar([1.0, 0.0], 'v1'))
+        self.assertEqual(expiring.stats()['questions'], 0)
+
+    def test_client_is_reused(self):
+        get_client.cache_clear()
+        self.addCleanup(get_client.cache_clear)
+        self.assertIs(get_client('test-key'), get_client('test-key'))
+
+
+class FakeGroqServer:
+    """
+    Local stand-in for the Groq API that streams a completion in chunks, with
+    a pause after each one so the test can see tokens arrive before the end.
+    """
+
+    def __init__(self, chunks, pause=0.2, status=200):
+        self.chunks = chunks
+        self.pause = pause
+        self.status = status
+        self.requests = []
+        self.finished = threading.Event()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != '/openai/v1/chat/completions':
+                    self.send_error(404)
+                    return
+                server.requests.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+                if server.status != 200:
+                    self.send_response(server.status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.end_headers()
+                    self.wfile.write(b'{"error": {"message": "overloaded"}}')
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                for text in server.chunks:
+                    chunk = {
+                        'id': 'chatcmpl-1', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'fake',
+                        'choices': [{'index': 0, 'delta': {'content': text}, 'finish_reason': None}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                    threading.Event().wait(server.pause)
+                self.wfile.write(b"data: [DONE]\n\n")
+                server.finished.set()
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@override_settings(GROQ_API_KEY='test-key')
+class SupportStreamTests(EmbeddingTestCase):
+    def setUp(self):
+        super().setUp()
+        support.answer_cache.clear()
+        self.addCleanup(support.answer_cache.clear)
+
+    def start_server(self, **kwargs):
+        server = FakeGroqServer(**kwargs)
+        self.addCleanup(server.stop)
+        settings_override = override_settings(GROQ_BASE_URL=server.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        return server
+
+    async def ask(self, query):
+        response = await AsyncClient().post('/api/chat/support/stream/', {'query': query}, content_type='application/json')
+        return response, aiter(response.streaming_content)
+
+    async def frames(self, stream):
+        frames = []
+        async for frame in stream:
+            event, data = frame.decode().split('\n', 1)
+            frames.append((event.removeprefix('event: '), json.loads(data.removeprefix('data: '))))
+        return frames
+
+    async def test_tokens_arrive_before_the_completion_ends(self):
+        server = self.start_server(chunks=['To report', ' a lost item,', ' use the Dashboard.'])
+        response, stream = await self.ask('How do I report a lost item?')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        first = (await asyncio.wait_for(anext(stream), 5)).decode()
+        self.assertEqual(first, 'event: token\ndata: {"text": "To report"}\n\n')
+        self.assertFalse(server.finished.is_set())
+        self.assertEqual(await self.frames(stream), [
+            ('token', {'text': ' a lost item,'}),
+            ('token', {'text': ' use the Dashboard.'}),
+            ('done', {'message': 'To report a lost item, use the Dashboard.'}),
+        ])
+        self.assertTrue(server.requests[0]['stream'])
+        self.assertEqual(server.requests[0]['messages'][0]['content'], support.SYSTEM_PROMPT)
+
+        # The streamed answer is cached like a regular one.
+        response, stream = await self.ask('how do I report a lost item')
+        self.assertEqual(await self.frames(stream), [
+            ('token', {'text': 'To report a lost item, use the Dashboard.'}),
+            ('done', {'message': 'To report a lost item, use the Dashboard.'}),
+        ])
+        self.assertEqual(len(server.requests), 1)
+
+    async def test_upstream_errors_end_the_stream(self):
+        self.start_server(chunks=[], status=503)
+        response, stream = await self.ask('How do I report a lost item?')
+        frames = await self.frames(stream)
+        self.assertEqual([event for event, _ in frames], ['error'])
+        self.assertEqual(len(support.answer_cache.entries), 0)
+
+    async def test_empty_questions_are_rejected(self):
+        response = await AsyncClient().post('/api/chat/support/stream/', {'query': ' '}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
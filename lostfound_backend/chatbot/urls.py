@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import MatchAssistantView, ChatBotSupportView
+from .views import MatchAssistantView, ChatBotSupportView, ChatBotSupportStreamView
 
 urlpatterns = [
     path('match/', MatchAssistantView.as_view(), name='match-assistant'),
     path('support/', ChatBotSupportView.as_view(), name='chat-support'),
+    path('support/stream/', ChatBotSupportStreamView.as_view(), name='chat-support-stream'),
 ]
\ No newline at end of file
@@ -1,12 +1,19 @@
-import os
+import json
 import logging
 import requests
 import time
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from groq import Groq
 from rest_framework.permissions import AllowAny
+from api.events import sse_frame
+from api.models import Item
+from . import support
+from .embeddings import query_cache
 from .matching import match_items
 
 logger = logging.getLogger(__name__)
@@ -25,9 +32,10 @@ class MatchAssistantView(APIView):
         if not query:
             return Response({"error": "Query cannot be empty"}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            # Assuming match_items is updated to handle a simple query string
-            # for a manual search feature.
-            matches = match_items(query) 
+            # Ad-hoc searches look for found items, the same way AIMatchesView does.
+            search_item = Item(title=query, description=query, location=request.data.get("location", ""), status='lost')
+            matches = match_items(search_item)
+            logger.debug(f"Query embedding cache: {query_cache.stats()}")
             return Response({"matches": matches}, status=status.HTTP_200_OK)
         except Exception as e:
             logger.error(f"Error processing query '{query}': {str(e)}")
@@ -36,7 +44,9 @@ class MatchAssistantView(APIView):
 class ChatBotSupportView(APIView):
     """
     Handles support queries for the Refind app using the Groq API.
-    The AI's knowledge and persona are strictly defined in the system prompt.
+    The AI's knowledge and persona are strictly defined in the system prompt
+    (see chatbot.support); repeated and near-duplicate questions are answered
+    from the cache.
     """
     permission_classes = [AllowAny]
 
@@ -46,70 +56,58 @@ class ChatBotSupportView(APIView):
             return Response({"message": "Please provide a question."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            response_data = self.call_groq_api(query)
-            if "message" in response_data:
-                logger.info(f"Groq response for '{query}': {response_data['message']}")
-                return Response(response_data, status=status.HTTP_200_OK)
-            else:
-                logger.error(f"Groq API call failed with error: {response_data.get('error')}")
-                return Response({
-                    "message": "Sorry, our AI assistant is currently experiencing issues. Please try again later."
-                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response_text, cached = support.answer(query)
+            logger.info(f"Groq response for '{query}' ({'cached' if cached else 'live'}): {response_text}")
+            logger.debug(f"Support answer cache: {support.answer_cache.stats()}")
+            return Response({"message": response_text}, status=status.HTTP_200_OK)
+        except support.SupportUnavailable as e:
+            logger.error(f"Groq API call failed with error: {str(e)}")
+            return Response({
+                "message": "Sorry, our AI assistant is currently experiencing issues. Please try again later."
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         except Exception as e:
             logger.error(f"An unexpected error occurred in the Groq API call for query '{query}': {e}")
             return Response({
                 "message": "An unexpected error occurred. Please contact support."
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    def call_groq_api(self, user_query):
-        """
-        Calls the Groq API with a highly specific, restrictive, and project-focused prompt.
-        """
-        try:
-            api_key = os.getenv('GROQ_API_KEY')
-            if not api_key:
-                logger.error("GROQ_API_KEY is not configured.")
-                return {"error": "API key not configured."}
-
-            client = Groq(api_key=api_key)
-            
-            # --- THIS IS THE NEW, WORLD-CLASS SYSTEM PROMPT ---
-            system_prompt = (
-                "You are 'Refind AI', the official support assistant for the Refind web application. "
-                "Your knowledge is STRICTLY limited to the features of the Refind app. Do NOT invent features like 'help desks', 'tickets', or 'premium plans'. "
-                "Your tone is helpful, professional, and very concise.\n\n"
-                "Here is the complete feature set of the Refind application:\n"
-                "1. Users can sign up and log in.\n"
-                "2. From their Dashboard, users can report a 'Lost Item' or a 'Found Item'.\n"
-                "3. The Dashboard shows statistics and a list of recently reported items.\n"
-                "4. The 'AI Matches' page allows users to manually search for items that match a description.\n"
-                "5. When a user reports a 'Lost Item', the system automatically searches for matches and sends an email if a high-confidence match is found.\n"
-                "6. Users can view the masked details of an item and initiate a private 'Chat' with the item's reporter to verify ownership.\n"
-                "7. For all other support, users must contact the team directly via email at refindaiapp@gmail.com. This is the ONLY contact method.\n\n"
-                "Based ONLY on this information, answer the user's query."
-            )
-
-            completion = client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": system_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": user_query
-                    }
-                ],
-                temperature=0.5, # Slightly lower temperature for more factual answers
-                max_tokens=256,  # Reduced max tokens for conciseness
-                top_p=1,
-                stream=False,
-            )
+@method_decorator(csrf_exempt, name='dispatch')
+class ChatBotSupportStreamView(View):
+    """
+    Streaming variant of ChatBotSupportView. Answers with server-sent events:
+    a 'token' event for each chunk of text as Groq produces it, then 'done'
+    with the whole message, or 'error'. Runs on the event loop under ASGI, so
+    a slow completion does not hold a worker thread.
+    """
 
-            response_text = completion.choices[0].message.content
-            return {"message": response_text}
+    async def post(self, request):
+        try:
+            query = str(json.loads(request.body or b'{}').get('query', '')).strip()
+        except (ValueError, AttributeError):
+            query = ''
+        if not query:
+            return JsonResponse({"message": "Please provide a question."}, status=400)
+        response = StreamingHttpResponse(self.stream(query), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
+    async def stream(self, query):
+        parts = []
+        try:
+            async for text in support.stream_answer(query):
+                parts.append(text)
+                yield sse_frame('token', {'text': text})
+        except support.SupportUnavailable as e:
+            logger.error(f"Groq API call failed with error: {str(e)}")
+            yield sse_frame('error', {
+                "message": "Sorry, our AI assistant is currently experiencing issues. Please try again later."
+            })
+            return
         except Exception as e:
-            logger.error(f"Groq API request failed: {str(e)}")
-            return {"error": str(e)}
\ No newline at end of file
+            logger.error(f"An unexpected error occurred in the Groq API call for query '{query}': {e}")
+            yield sse_frame('error', {"message": "An unexpected error occurred. Please contact support."})
+            return
+        message = "".join(parts)
+        logger.info(f"Groq response for '{query}' (streamed): {message}")
+        yield sse_frame('done', {'message': message})
@@ -0,0 +1,51 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def warmup():
+    """
+    Loads what the first match request would otherwise pay for: the URLconf and
+    views, the embedding backend, the campus location table and the lost/found
+    search indexes. Called from gunicorn's post_worker_init hook; failures are
+    logged and left for the first request to retry.
+    """
+    started = time.perf_counter()
+    steps = [
+        ('urls', load_urls),
+        ('embedding backend', load_embedding_backend),
+        ('location table', load_location_table),
+        ('search indexes', build_indexes),
+    ]
+    for name, step in steps:
+        try:
+            step()
+        except Exception as e:
+            logger.error(f"Warmup step '{name}' failed: {str(e)}")
+    logger.info(f"Worker warmup finished in {time.perf_counter() - started:.2f}s")
+
+def load_urls():
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+
+def load_embedding_backend():
+    from chatbot.embeddings import get_backend
+
+    get_backend()
+
+def load_location_table():
+    from chatbot.locations import get_location_table
+
+    get_location_table()
+
+def build_indexes():
+    from chatbot.ann import registry
+
+    for status in ('lost', 'found'):
+        registry.get_lexical(status)
+        registry.get_images(status)
+        # Stored vectors only: encoding a corpus here could outlast gunicorn's
+        # worker timeout. Items still without one are left to the job worker.
+        registry.build(status, encode=False)
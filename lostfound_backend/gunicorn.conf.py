@@ -0,0 +1,8 @@
+# Picked up automatically by gunicorn when started from this directory (see Procfile).
+
+
+def post_worker_init(worker):
+    # Heavy NLP/ML stacks load lazily; pay for them here rather than on the first request.
+    from chatbot.warmup import warmup
+
+    warmup()
@@ -135,6 +135,8 @@ else:
     CORS_ALLOWED_ORIGINS = [prod_origin] if prod_origin else []
 
 CORS_ALLOW_CREDENTIALS = True
+# List endpoints return the next page's cursor in these headers (see api.pagination).
+CORS_EXPOSE_HEADERS = ['Link', 'X-Next-Cursor']
 
 # --- Email Configuration ---
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -144,6 +146,52 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', '30'))
+# Match alerts are queued in an outbox and sent as one digest per user (see api.notifications).
+MATCH_EMAIL_DIGEST_DELAY = int(os.getenv('MATCH_EMAIL_DIGEST_DELAY', '60'))
+MATCH_EMAIL_BATCH_SIZE = int(os.getenv('MATCH_EMAIL_BATCH_SIZE', '100'))
+
+# --- Embedding Backend (see chatbot.embeddings) ---
+# 'huggingface', 'local' or 'hashing'. When unset, the Hugging Face endpoint is used
+# if HF_API_TOKEN is available and the offline hashing stub otherwise.
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', '')
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+EMBEDDING_MODEL_PATH = os.getenv('EMBEDDING_MODEL_PATH')
+EMBEDDING_LOCAL_RUNTIME = os.getenv('EMBEDDING_LOCAL_RUNTIME', 'torch')  # 'torch' or 'onnx'
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '64'))
+HF_API_TOKEN = os.getenv('HF_API_TOKEN')
+
+# Query embeddings are cached in-process (LRU) and in the shared Django cache.
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv('QUERY_EMBEDDING_CACHE_SIZE', '1024'))
+QUERY_EMBEDDING_CACHE_TTL = int(os.getenv('QUERY_EMBEDDING_CACHE_TTL', '86400'))
+
+# Seconds before the campus location alias table is reloaded (see chatbot.locations).
+LOCATION_TABLE_TTL = int(os.getenv('LOCATION_TABLE_TTL', '300'))
+
+# --- Support Chatbot (see chatbot.support) ---
+GROQ_API_KEY = os.getenv('GROQ_API_KEY')
+GROQ_MODEL = os.getenv('GROQ_MODEL', 'llama3-8b-8192')
+GROQ_TIMEOUT = float(os.getenv('GROQ_TIMEOUT', '20'))
+# Only set to point the client at a proxy or a stand-in server.
+GROQ_BASE_URL = os.getenv('GROQ_BASE_URL')
+# Answers are reused for repeated questions, and for questions whose embedding is at
+# least SUPPORT_ANSWER_SIMILARITY (cosine) close to an answered one.
+SUPPORT_ANSWER_CACHE_SIZE = int(os.getenv('SUPPORT_ANSWER_CACHE_SIZE', '512'))
+SUPPORT_ANSWER_CACHE_TTL = int(os.getenv('SUPPORT_ANSWER_CACHE_TTL', '21600'))
+SUPPORT_ANSWER_SIMILARITY = float(os.getenv('SUPPORT_ANSWER_SIMILARITY', '0.92'))
+
+# --- Approximate Nearest Neighbour Index (see chatbot.ann) ---
+ANN_NPROBE = int(os.getenv('ANN_NPROBE', '8'))
+ANN_BRUTE_FORCE_LIMIT = int(os.getenv('ANN_BRUTE_FORCE_LIMIT', '2048'))
+ANN_REBUILD_SECONDS = int(os.getenv('ANN_REBUILD_SECONDS', '600'))
+
+# --- Background Jobs (see api.jobs and `manage.py run_worker`) ---
+JOB_WORKER_CONCURRENCY = int(os.getenv('JOB_WORKER_CONCURRENCY', '4'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1.0'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))
+JOB_RETRY_BASE_SECONDS = int(os.getenv('JOB_RETRY_BASE_SECONDS', '30'))
+JOB_RETRY_MAX_SECONDS = int(os.getenv('JOB_RETRY_MAX_SECONDS', '3600'))
+JOB_LOCK_TIMEOUT = int(os.getenv('JOB_LOCK_TIMEOUT', '900'))
 
 # --- Site URL Configuration ---
 SITE_URL = os.getenv('SITE_URL', 'http://127.0.0.1:8000')
@@ -170,6 +218,10 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'rest_framework.views.exception_handler',
 }
 
+# Page size of the cursor-paginated list endpoints; clients may ask for up to API_MAX_PAGE_SIZE.
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', '50'))
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '200'))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=24),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
@@ -177,6 +229,35 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
 }
 
+# --- Cache ---
+# Set REDIS_URL so that cached data is shared across gunicorn workers.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# --- Push Events (see api.events; served over ASGI) ---
+# 'redis' fans events out to every worker; 'memory' only reaches clients of the same process.
+PUSH_BROKER = os.getenv('PUSH_BROKER', 'redis' if REDIS_URL else 'memory')
+PUSH_HEARTBEAT_SECONDS = float(os.getenv('PUSH_HEARTBEAT_SECONDS', '20'))
+# Seconds a stream ticket (POST /api/events/ticket/) stays valid; EventSource passes it in the URL, so it is short-lived.
+PUSH_TICKET_MAX_AGE = int(os.getenv('PUSH_TICKET_MAX_AGE', '30'))
+# Longest a notification summary long-poll (?wait=) is held open.
+NOTIFICATION_LONG_POLL_SECONDS = float(os.getenv('NOTIFICATION_LONG_POLL_SECONDS', '30'))
+
+# Seconds the dashboard's recent-item lists may be served from cache; writes invalidate them sooner.
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', '300'))
+
 # --- Default primary key field type ---
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useRef } from "react";
 import { useNavigate } from "react-router-dom";
-import { askChatbot } from "../services/api"; // Import our new API function
+import { streamChatbot } from "../services/api";
 
 const ChatAssistant = () => {
   const [messages, setMessages] = useState([
@@ -8,6 +8,7 @@ const ChatAssistant = () => {
   ]);
   const [input, setInput] = useState("");
   const [isTyping, setIsTyping] = useState(false);
+  const [isStreaming, setIsStreaming] = useState(false);
   const messagesEndRef = useRef(null);
   const navigate = useNavigate();
 
@@ -22,7 +23,7 @@ const ChatAssistant = () => {
   // This is the new, API-driven send handler
   const handleSend = async (optionalMessage) => {
     const userInput = optionalMessage || input.trim();
-    if (!userInput || isTyping) return; // Prevent sending while bot is typing
+    if (!userInput || isTyping || isStreaming) return; // Prevent sending while bot is typing
 
     // 1. Add the user's message to the chat immediately
     const userMessage = { text: userInput, sender: "user" };
@@ -31,19 +32,25 @@ const ChatAssistant = () => {
     
     // 2. Show a "typing" indicator while we wait for the API
     setIsTyping(true);
+    setIsStreaming(true);
 
     try {
-      // 3. Call the backend API
-      const response = await askChatbot(userInput);
-      
-      // 4. Create the bot's response message
-      const botMessage = {
-        text: response.message,
-        sender: "bot"
-      };
-      
-      // 5. Add the bot's message to the chat
-      setMessages(prev => [...prev, botMessage]);
+      // 3. Stream the answer into a new bot message as it is generated
+      let started = false;
+      const response = await streamChatbot(userInput, (token) => {
+        if (!started) {
+          started = true;
+          setIsTyping(false);
+          setMessages(prev => [...prev, { text: token, sender: "bot" }]);
+        } else {
+          setMessages(prev => [...prev.slice(0, -1), { ...prev[prev.length - 1], text: prev[prev.length - 1].text + token }]);
+        }
+      });
+
+      // 4. Errors arrive without tokens; show their message instead
+      if (!started) {
+        setMessages(prev => [...prev, { text: response.message, sender: "bot" }]);
+      }
     } catch (error) {
       // Handle potential errors from the API call
       const errorMessage = {
@@ -52,8 +59,9 @@ const ChatAssistant = () => {
       };
       setMessages(prev => [...prev, errorMessage]);
     } finally {
-      // 6. Hide the "typing" indicator
+      // 5. Hide the "typing" indicator
       setIsTyping(false);
+      setIsStreaming(false);
     }
   };
 
@@ -155,11 +163,11 @@ const ChatAssistant = () => {
                 value={input}
                 onChange={(e) => setInput(e.target.value)}
                 onKeyDown={(e) => { if (e.key === "Enter") handleSend(); }}
-                disabled={isTyping} // Disable input while bot is typing
+                disabled={isTyping || isStreaming} // Disable input while bot is typing
               />
               <button
                 onClick={() => handleSend()}
-                disabled={isTyping}
+                disabled={isTyping || isStreaming}
                 className="bg-gradient-to-r from-cyan-500 to-fuchsia-500 hover:from-cyan-600 hover:to-fuchsia-600 text-white px-6 py-3 rounded-xl font-medium transition-all duration-200 transform hover:scale-105 active:scale-95 shadow-lg hover:shadow-cyan-500/25 disabled:opacity-50 disabled:cursor-not-allowed"
               >
                 Send
@@ -1,13 +1,15 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { useSearchParams, useNavigate } from 'react-router-dom'; // Changed to useSearchParams
 import { useAuth } from '../context/AuthContext';
-import { getChatMessages, sendChatMessage, getItemDetails } from '../services/api';
+import { useNotifications } from '../context/NotificationContext';
+import { getChatMessages, getChatHistory, sendChatMessage, getItemDetails } from '../services/api';
 import { ArrowLeft, Send, RefreshCw } from 'lucide-react';
 
 const ChatPage = () => {
   const navigate = useNavigate();
   const [searchParams] = useSearchParams(); // Changed to useSearchParams
   const { currentUser } = useAuth();
+  const { subscribeToMessages } = useNotifications();
 
   const itemId = searchParams.get('item_id'); // Get item_id from query params
   const receiverId = searchParams.get('receiver_id'); // Get receiver_id from query params
@@ -18,13 +20,25 @@ const ChatPage = () => {
   const [isSending, setIsSending] = useState(false);
   const [error, setError] = useState('');
   const [item, setItem] = useState(null);
+  const [olderCursor, setOlderCursor] = useState(null);
+  const [isLoadingOlder, setIsLoadingOlder] = useState(false);
 
   const messagesEndRef = useRef(null);
+  const latestMessageId = useRef(null);
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   };
 
+  // Scroll down only when a newer message arrives, not when older history is prepended.
+  useEffect(() => {
+    const latest = messages.length ? Math.max(...messages.map((m) => m.id)) : null;
+    if (latest !== latestMessageId.current) {
+      latestMessageId.current = latest;
+      scrollToBottom();
+    }
+  }, [messages]);
+
   useEffect(() => {
     console.log('Search params:', Object.fromEntries(searchParams)); // Debug query params
     if (!currentUser) {
@@ -45,11 +59,12 @@ const ChatPage = () => {
 
     const fetchData = async () => {
       try {
-        const [chatHistory, itemData] = await Promise.all([
-          getChatMessages(itemId, receiverId),
+        const [{ rows: chatHistory, nextCursor }, itemData] = await Promise.all([
+          getChatHistory(itemId, receiverId),
           getItemDetails(itemId),
         ]);
         if (isMounted) {
+          setOlderCursor(nextCursor);
           setMessages(currentMessages => {
             if (JSON.stringify(currentMessages) !== JSON.stringify(chatHistory)) {
               return chatHistory;
@@ -83,22 +98,63 @@ const ChatPage = () => {
       }
     };
 
+    // Appends only the messages newer than the last one shown; this also marks them read.
+    const fetchNewMessages = async () => {
+      try {
+        const lastId = latestMessageId.current;
+        if (lastId === null) return fetchData();
+        const newMessages = await getChatMessages(itemId, receiverId, lastId);
+        if (isMounted && newMessages.length) {
+          setMessages((current) => {
+            const known = new Set(current.map((m) => m.id));
+            return [...current, ...newMessages.filter((m) => !known.has(m.id))];
+          });
+        }
+      } catch (err) {
+        console.error('Error syncing chat:', { message: err.message, itemId, receiverId });
+      }
+    };
+
     fetchData();
+    // New messages arrive over the event stream.
+    const unsubscribe = subscribeToMessages((message) => {
+      const participants = [message.sender, message.receiver].map(String);
+      if (isMounted && String(message.item) === itemId && participants.includes(receiverId)) {
+        fetchNewMessages();
+      }
+    });
+    // Slow safety net in case the stream is down.
     const interval = setInterval(() => {
       if (isMounted && itemId && receiverId && !isNaN(itemId) && !isNaN(receiverId)) {
-        fetchData();
+        fetchNewMessages();
       }
-    }, 3000);
+    }, 30000);
 
     return () => {
       isMounted = false;
+      unsubscribe();
       clearInterval(interval);
     };
-  }, [itemId, receiverId, currentUser, navigate, searchParams]);
+  }, [itemId, receiverId, currentUser, navigate, searchParams, subscribeToMessages]);
 
-  useEffect(() => {
-    scrollToBottom();
-  }, [messages]);
+  // Prepends the page of history before the oldest message shown.
+  const loadOlderMessages = async () => {
+    if (!olderCursor || isLoadingOlder) return;
+    setIsLoadingOlder(true);
+    try {
+      const { rows, nextCursor } = await getChatHistory(itemId, receiverId, olderCursor);
+      setMessages((current) => {
+        const known = new Set(current.map((m) => m.id));
+        return [...rows.filter((m) => !known.has(m.id)), ...current];
+      });
+      setOlderCursor(nextCursor);
+    } catch (err) {
+      setError('Could not load older messages.');
+      console.error('Error loading older messages:', { message: err.message, itemId, receiverId });
+    } finally {
+      setIsLoadingOlder(false);
+    }
+  };
 
   const handleSend = async () => {
     if (!input.trim() || !itemId || !receiverId || isNaN(itemId) || isNaN(receiverId) || isSending) return;
@@ -161,6 +217,17 @@ const ChatPage = () => {
         )}
 
         <div className="flex-grow h-96 overflow-y-auto p-4 space-y-4 bg-slate-900/30">
+          {!isLoading && olderCursor && (
+            <div className="text-center">
+              <button
+                onClick={loadOlderMessages}
+                disabled={isLoadingOlder}
+                className="text-sm text-cyan-400 hover:text-cyan-300 disabled:opacity-50"
+              >
+                {isLoadingOlder ? 'Loading...' : 'Load older messages'}
+              </button>
+            </div>
+          )}
           {isLoading ? (
             <div className="text-center text-white pt-16">Loading Chat...</div>
           ) : messages.length > 0 ? (
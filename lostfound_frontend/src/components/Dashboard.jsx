@@ -106,6 +106,8 @@ const Dashboard = () => {
   const [stats, setStats] = useState([]);
   const [recentGlobalItems, setRecentGlobalItems] = useState({ lost: [], found: [] });
   const [myReportedItems, setMyReportedItems] = useState([]);
+  const [myItemsCursor, setMyItemsCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState('');
   const [itemStatus, setItemStatus] = useState({});
@@ -132,7 +134,8 @@ const Dashboard = () => {
         lost: (dashboardData.lost_items || []).filter(i => !i.is_claimed && i.status !== 'claimed'),
         found: (dashboardData.found_items || []).filter(i => !i.is_claimed && i.status !== 'claimed'),
       });
-      setMyReportedItems(myItemsData.filter(i => !i.is_claimed && i.status !== 'claimed') || []);
+      setMyReportedItems(myItemsData.rows.filter(i => !i.is_claimed && i.status !== 'claimed'));
+      setMyItemsCursor(myItemsData.nextCursor);
     } catch (err) {
       setError(err.message || 'Failed to load dashboard data');
     } finally {
@@ -140,6 +143,26 @@ const Dashboard = () => {
     }
   };
 
+  // Fetches the next page of the user's items once they scroll to the end of the list.
+  const loadMoreItems = async () => {
+    if (!myItemsCursor || isLoadingMore) return;
+    try {
+      setIsLoadingMore(true);
+      const { rows, nextCursor } = await getMyItems(myItemsCursor);
+      setMyReportedItems(prev => [...prev, ...rows.filter(i => !i.is_claimed && i.status !== 'claimed')]);
+      setMyItemsCursor(nextCursor);
+    } catch (err) {
+      setError(err.message || 'Failed to load more items');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
+  const handleItemsScroll = e => {
+    const { scrollTop, scrollHeight, clientHeight } = e.currentTarget;
+    if (scrollHeight - scrollTop - clientHeight < 100) loadMoreItems();
+  };
+
   useEffect(() => { setMounted(true); fetchAllData(); }, []);
 
   const handleApproveClaim = async id => {
@@ -273,11 +296,17 @@ const Dashboard = () => {
               <Clock className="w-6 h-6 text-cyan-400 mr-3 animate-pulse" />
               <h2 className="font-semibold text-white text-lg">Your Recent Activity</h2>
             </div>
-            <div className="grid grid-cols-1 sm:grid-cols-2 gap-4 max-h-[600px] overflow-y-auto custom-scrollbar">
+            <div onScroll={handleItemsScroll} className="grid grid-cols-1 sm:grid-cols-2 gap-4 max-h-[600px] overflow-y-auto custom-scrollbar">
               {myReportedItems.length ? myReportedItems.map(i => (
                 <ItemCard key={i.id} item={i} colorClass={i.status === 'lost' ? 'red' : 'green'} onNavigate={() => navigate(`/items/${i.id}`)}
                           showClaimInfo onApproveClaim={handleApproveClaim} onUpdateStatus={handleUpdateStatus} loading={loading} itemStatus={itemStatus} />
-              )) : <p className="sm:col-span-2 text-center py-8 text-gray-300">No items yet.</p>}
+              )) : !myItemsCursor && <p className="sm:col-span-2 text-center py-8 text-gray-300">No items yet.</p>}
+              {myItemsCursor && (
+                <button onClick={loadMoreItems} disabled={isLoadingMore}
+                        className="sm:col-span-2 py-2 text-sm text-cyan-300 hover:text-cyan-200 transition-colors duration-300 disabled:opacity-50">
+                  {isLoadingMore ? 'Loading...' : 'Load more'}
+                </button>
+              )}
             </div>
           </div>
         </div>
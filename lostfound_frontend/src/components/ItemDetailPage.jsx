@@ -51,7 +51,18 @@ const ItemDetailPage = () => {
 
                 <div className="grid md:grid-cols-2 gap-8">
                     <div>
-                        {item.image ? (
+                        {item.image_variants ? (
+                            // Resized WebP copies; the original upload is only used until they exist.
+                            <img
+                                src={item.image_variants.medium.webp}
+                                srcSet={`${item.image_variants.medium.webp} ${item.image_variants.medium.width}w, ${item.image_variants.large.webp} ${item.image_variants.large.width}w`}
+                                sizes="(min-width: 768px) 28rem, 100vw"
+                                width={item.image_variants.medium.width}
+                                height={item.image_variants.medium.height}
+                                alt={item.title}
+                                className="w-full h-auto object-cover rounded-2xl shadow-2xl shadow-purple-500/20"
+                            />
+                        ) : item.image ? (
                             <img src={item.image} alt={item.title} className="w-full h-auto object-cover rounded-2xl shadow-2xl shadow-purple-500/20" />
                         ) : (
                             <div className="w-full h-96 bg-slate-800 rounded-2xl flex items-center justify-center text-slate-500">No Image Provided</div>
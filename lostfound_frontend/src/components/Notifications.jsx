@@ -8,9 +8,11 @@ import { Search, Bell, ChevronLeft, Sparkles, Clock, MessageSquare, RefreshCw }
 const Notifications = () => {
   const navigate = useNavigate();
   const { currentUser } = useAuth();
-  const { unreadCount, setUnreadCount } = useNotifications();
+  const { unreadCount } = useNotifications();
   const [notifications, setNotifications] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const [showAll, setShowAll] = useState(() => {
     return localStorage.getItem('notificationsShowAll') === 'true';
@@ -21,11 +23,11 @@ const Notifications = () => {
     setError('');
     try {
       console.log('Fetching notifications for user:', currentUser?.username);
-      const data = await getNotifications(showAll, false); // mark_read=false
-      console.log('Notifications data:', data);
-      const validNotifications = Array.isArray(data) ? data : [];
-      setNotifications(validNotifications);
-      setUnreadCount(showAll ? validNotifications.length : validNotifications.filter(n => !n.is_read).length);
+      const { rows, nextCursor } = await getNotifications(showAll, false); // mark_read=false
+      console.log('Notifications data:', rows);
+      // The unread badge comes from the notification stream, not from the loaded page.
+      setNotifications(rows);
+      setNextCursor(nextCursor);
     } catch (err) {
       console.error('Error fetching notifications:', {
         message: err.message,
@@ -45,6 +47,21 @@ const Notifications = () => {
     }
   };
 
+  const loadMoreNotifications = async () => {
+    if (!nextCursor || isLoadingMore) return;
+    setIsLoadingMore(true);
+    try {
+      const page = await getNotifications(showAll, false, nextCursor);
+      setNotifications(prev => [...prev, ...page.rows]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.error('Error fetching more notifications:', err.message);
+      setError(err.response?.data?.detail || "Failed to load notifications. Please try again.");
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     if (!currentUser) {
       setError("Please log in to view notifications.");
@@ -189,6 +206,15 @@ const Notifications = () => {
                     )}
                   </div>
                 ))}
+                {nextCursor && (
+                  <button
+                    onClick={loadMoreNotifications}
+                    disabled={isLoadingMore}
+                    className="w-full py-2 rounded-lg bg-slate-800/60 hover:bg-slate-700/60 text-gray-300 hover:text-cyan-400 transition-all duration-300 text-xs sm:text-sm disabled:opacity-50"
+                  >
+                    {isLoadingMore ? 'Loading...' : 'Load more'}
+                  </button>
+                )}
               </div>
             )}
           </div>
@@ -1,13 +1,22 @@
 
-import React, { createContext, useContext, useState, useEffect } from 'react';
+import React, { createContext, useCallback, useContext, useEffect, useRef, useState } from 'react';
 import { useAuth } from './AuthContext';
-import { getNotificationSummary } from '../services/api';
+import { getNotificationSummary, openEventStream } from '../services/api';
 
 const NotificationContext = createContext(null);
 
+// Polling is only a fallback for when the event stream is unavailable.
+const FALLBACK_POLL_MS = 15000;
+
 export const NotificationProvider = ({ children }) => {
   const { currentUser } = useAuth();
   const [unreadCount, setUnreadCount] = useState(0);
+  const messageListeners = useRef(new Set());
+
+  const subscribeToMessages = useCallback((listener) => {
+    messageListeners.current.add(listener);
+    return () => messageListeners.current.delete(listener);
+  }, []);
 
   useEffect(() => {
     if (currentUser) {
@@ -25,16 +34,75 @@ export const NotificationProvider = ({ children }) => {
           });
         }
       };
-      fetchSummary();
-      const interval = setInterval(fetchSummary, 15000);
-      return () => clearInterval(interval);
+
+      let interval = null;
+      const startPolling = () => {
+        if (!interval) {
+          fetchSummary();
+          interval = setInterval(fetchSummary, FALLBACK_POLL_MS);
+        }
+      };
+      const stopPolling = () => {
+        clearInterval(interval);
+        interval = null;
+      };
+
+      let stream = null;
+      let reconnect = null;
+      let closed = false;
+      const scheduleReconnect = () => {
+        if (!reconnect) {
+          reconnect = setTimeout(() => {
+            reconnect = null;
+            connect();
+          }, FALLBACK_POLL_MS);
+        }
+      };
+      const connect = async () => {
+        try {
+          stream = await openEventStream();
+        } catch (error) {
+          console.error('Failed to open the event stream:', error.message);
+          stream = null;
+          if (!closed) scheduleReconnect();
+        }
+        if (closed) {
+          stream?.close();
+          return;
+        }
+        if (!stream) {
+          startPolling();
+          return;
+        }
+        stream.addEventListener('unread', (event) => {
+          setUnreadCount(JSON.parse(event.data).unread_messages || 0);
+        });
+        stream.addEventListener('message', (event) => {
+          const message = JSON.parse(event.data);
+          messageListeners.current.forEach((listener) => listener(message));
+        });
+        stream.onopen = stopPolling;
+        stream.onerror = () => {
+          // EventSource retries by itself, but its ticket expires; once it
+          // gives up, reconnect with a fresh one. Poll in the meantime.
+          startPolling();
+          if (stream.readyState === EventSource.CLOSED) scheduleReconnect();
+        };
+      };
+      connect();
+      return () => {
+        closed = true;
+        clearTimeout(reconnect);
+        stopPolling();
+        stream?.close();
+      };
     } else {
       setUnreadCount(0);
     }
   }, [currentUser]);
 
   return (
-    <NotificationContext.Provider value={{ unreadCount, setUnreadCount }}>
+    <NotificationContext.Provider value={{ unreadCount, setUnreadCount, subscribeToMessages }}>
       {children}
     </NotificationContext.Provider>
   );
@@ -58,11 +58,21 @@ export const getProfile = async () => {
   }
 };
 
-export const getMyItems = async () => {
+// List endpoints return one page at a time and send the cursor of the next one in X-Next-Cursor.
+// Resolves with { rows, nextCursor }; pass nextCursor back to load the following page, so only
+// what the user actually scrolls to is fetched. nextCursor is null on the last page.
+export const getPage = async (path, params = {}, cursor = null) => {
+  const response = await api.get(path, { params: cursor ? { ...params, cursor } : params });
+  return {
+    rows: Array.isArray(response.data) ? response.data : [],
+    nextCursor: response.headers['x-next-cursor'] || null,
+  };
+};
+
+export const getMyItems = async (cursor = null) => {
   console.log('Fetching my items');
   try {
-    const response = await api.get('my-items/');
-    return response.data;
+    return await getPage('my-items/', {}, cursor);
   } catch (error) {
     console.error('Error fetching my items:', error.response?.data || error.message);
     throw new Error(error.response?.data?.detail || 'Failed to fetch items');
@@ -157,16 +167,19 @@ export const updateItemStatus = async (itemId, status) => {
   }
 };
 
-export const getChatMessages = async (itemId, receiverId) => {
+// With sinceId only the messages after that id are returned (incremental sync).
+export const getChatMessages = async (itemId, receiverId, sinceId = null) => {
   console.log('Fetching chat messages for item:', itemId, 'receiver:', receiverId);
   if (!itemId || !receiverId || isNaN(itemId) || isNaN(receiverId)) {
     console.error('Invalid parameters:', { itemId, receiverId });
     throw new Error('Missing or invalid itemId or receiverId');
   }
   try {
-    const response = await api.get('chat/', {
-      params: { item_id: itemId, receiver_id: receiverId },
-    });
+    const params = { item_id: itemId, receiver_id: receiverId };
+    if (sinceId !== null) {
+      params.since_id = sinceId;
+    }
+    const response = await api.get('chat/', { params });
     return response.data;
   } catch (error) {
     console.error('Error fetching chat messages:', error.response?.data || error.message);
@@ -174,6 +187,17 @@ export const getChatMessages = async (itemId, receiverId) => {
   }
 };
 
+// One page of chat history in reading order; pages walk back from the newest message, so
+// nextCursor loads the messages before these.
+export const getChatHistory = async (itemId, receiverId, cursor = null) => {
+  try {
+    return await getPage('chat/', { item_id: itemId, receiver_id: receiverId }, cursor);
+  } catch (error) {
+    console.error('Error fetching chat history:', error.response?.data || error.message);
+    throw new Error(error.response?.data?.error || 'Failed to fetch chat messages');
+  }
+};
+
 export const sendChatMessage = async (itemId, receiverId, message) => {
   console.log('Sending message for item:', itemId, 'to receiver:', receiverId, 'message:', message);
   const parsedItemId = parseInt(itemId);
@@ -218,11 +242,18 @@ export const getNotificationSummary = async () => {
   }
 };
 
-export const getNotifications = async (includeRead = false) => {
-  console.log('Fetching notifications, includeRead:', includeRead);
+// Server-sent events for the signed-in user ('message' and 'unread'). EventSource cannot send
+// headers, so the stream is opened with a short-lived ticket rather than the access token.
+export const openEventStream = async () => {
+  if (!localStorage.getItem('token') || typeof EventSource === 'undefined') return null;
+  const response = await api.post('events/ticket/');
+  return new EventSource(`${api.defaults.baseURL}events/?ticket=${encodeURIComponent(response.data.ticket)}`);
+};
+
+export const getNotifications = async (includeRead = false, markRead = true, cursor = null) => {
+  console.log('Fetching notifications, includeRead:', includeRead, 'markRead:', markRead);
   try {
-    const response = await api.get(`notifications/?include_read=${includeRead}`);
-    return Array.isArray(response.data) ? response.data : [];
+    return await getPage('notifications/', { include_read: includeRead, mark_read: markRead }, cursor);
   } catch (error) {
     console.error('Error fetching notifications:', error.response?.data || error.message);
     throw new Error(error.response?.data?.detail || 'Failed to fetch notifications');
@@ -240,6 +271,49 @@ export const askChatbot = async (query) => {
   }
 };
 
+// Streams the support answer as server-sent events: calls onToken for each chunk of text and
+// resolves with the whole answer. Falls back to the plain endpoint if streaming is unavailable.
+export const streamChatbot = async (query, onToken) => {
+  let received = false;
+  try {
+    const response = await fetch(`${api.defaults.baseURL}chat/support/stream/`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ query }),
+    });
+    if (!response.ok || !response.body) throw new Error(`Streaming failed with status ${response.status}`);
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += value;
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const frame = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        const event = frame.match(/^event: (.*)$/m)?.[1];
+        const data = JSON.parse(frame.match(/^data: (.*)$/m)?.[1] || '{}');
+        if (event === 'token') {
+          received = true;
+          onToken(data.text);
+        }
+        if (event === 'done' || event === 'error') return data;
+      }
+    }
+    throw new Error('Stream ended early');
+  } catch (error) {
+    if (received) {
+      console.error('Chatbot stream broke off:', error);
+      return { message: 'Sorry, the AI assistant is currently unavailable.' };
+    }
+    console.error('Error streaming chatbot answer, retrying without streaming:', error);
+    const data = await askChatbot(query);
+    onToken(data.message);
+    return data;
+  }
+};
+
 export const getAIMatches = async ({ query, location }) => {
   console.log('Fetching AI matches for query:', query, 'location:', location);
   try {